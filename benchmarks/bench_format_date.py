@@ -0,0 +1,89 @@
+"""
+Throughput of common_function.format_date (fixed-format fast paths + LRU cache) and of
+the column API format_dates, against the previous implementation (fromisoformat /
+strptime + strftime on every call).
+
+The input mimics a get-whats-news page: each record carries createdAt, updatedAt and
+timestamp, and the same values repeat across the records of a batch:
+
+    python benchmarks/bench_format_date.py --records 50000 --distinct 500
+
+No database or config.json is needed.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "push_data"))
+
+from common_function import _cached_parse_date, format_date, format_dates
+
+
+def previous_format_date(date_str):
+    """format_date as it was before the fast paths and the cache"""
+    if not date_str:
+        return None
+    try:
+        if 'T' in date_str:
+            return datetime.fromisoformat(date_str.replace('Z', '+00:00')).strftime("%Y-%m-%d %H:%M:%S")
+        else:
+            return datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
+    except (ValueError, TypeError):
+        return None
+
+
+def make_values(records, distinct, seed=1):
+    """records * 3 date strings drawn from `distinct` ISO and MySQL datetimes"""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    pool = []
+    for i in range(distinct):
+        moment = start + timedelta(seconds=rng.randrange(365 * 86400))
+        if i % 3 == 0:
+            pool.append(moment.strftime("%Y-%m-%d %H:%M:%S"))
+        elif i % 3 == 1:
+            pool.append(moment.strftime("%Y-%m-%dT%H:%M:%S+00:00"))
+        else:
+            pool.append(moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{rng.randrange(1000):03d}Z")
+    return [rng.choice(pool) for _ in range(records * 3)]
+
+
+def timed(label, fn, values, baseline=None):
+    started = time.perf_counter()
+    fn(values)
+    elapsed = time.perf_counter() - started
+    rate = len(values) / elapsed if elapsed > 0 else 0
+    speedup = f"{baseline / elapsed:>7.1f}x" if baseline else f"{'':>8}"
+    print(f"{label:<34} {elapsed * 1000:>9.1f} ms {rate:>12.0f} values/s {speedup}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=50000)
+    parser.add_argument("--distinct", type=int, default=500, help="distinct date strings in the batch")
+    args = parser.parse_args()
+
+    values = make_values(args.records, args.distinct)
+    expected = [previous_format_date(v) for v in values]
+    if [format_date(v) for v in values] != expected or format_dates(values) != expected:
+        sys.exit("format_date and the previous implementation disagree")
+
+    print(f"{len(values)} values, {args.distinct} distinct")
+    baseline = timed("previous format_date", lambda vs: [previous_format_date(v) for v in vs], values)
+    _cached_parse_date.cache_clear()
+    timed("format_date (cold cache)", lambda vs: [format_date(v) for v in vs], values, baseline)
+    timed("format_date (warm cache)", lambda vs: [format_date(v) for v in vs], values, baseline)
+    _cached_parse_date.cache_clear()
+    timed("format_dates (column, cold cache)", format_dates, values, baseline)
+    unique = list(dict.fromkeys(values))
+    _cached_parse_date.cache_clear()
+    base_unique = timed("previous, distinct values only", lambda vs: [previous_format_date(v) for v in vs], unique)
+    timed("fast paths only (no repeats)", lambda vs: [format_date(v) for v in vs], unique, base_unique)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Per-statement cost of plain cursors vs the prepared-statement cache (push_data/statement_cache.py).
+
+Runs the hot statements of the ingestion path and of the audit pusher N times each,
+once with a plain cursor (the text is parsed by the server every time) and once
+through a StatementCache (prepared once, then only the parameters are sent):
+
+    python benchmarks/bench_prepared_statements.py --iterations 2000
+
+Run it from the project root (it reads config.json). It only writes to a temporary
+copy of the attendance table and runs a no-op UPDATE on attendance_audit, so the
+data of the local database is left untouched.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "push_data"))
+
+import mysql.connector
+
+from batch_writer import build_update_sql, build_upsert_sql
+from entity_registry import get_entity
+from statement_cache import StatementCache, config
+
+BENCH_TABLE = "_bench_attendance"
+
+
+def attendance_row(i):
+    return (i, 1, 1, 1, 1, i % 2, "2024-05-01 00:00:00", f"note {i}", 1, 1,
+            "2024-05-01 08:00:00", "2024-05-01 09:00:00", "2024-05-01 09:00:00", 0, None, 1, 0)
+
+
+def statements(batch_size):
+    """(name, sql, params for iteration i) of the statements the sync runs the most"""
+    attendance = get_entity("attendance")
+    ids_sql = (f"SELECT `id` FROM `{BENCH_TABLE}` WHERE `id` IN ("
+               + ", ".join(["%s"] * batch_size) + ")")
+    upsert_sql = build_upsert_sql(BENCH_TABLE, attendance.columns, attendance.update_columns, 1)
+    batch_upsert_sql = build_upsert_sql(BENCH_TABLE, attendance.columns, attendance.update_columns, batch_size)
+    update_sql = build_update_sql(BENCH_TABLE, ("note", "is_present"), 1)
+    return [
+        ("SELECT ids IN (batch)", ids_sql,
+         lambda i: list(range(i, i + batch_size))),
+        ("single-row upsert", upsert_sql,
+         lambda i: attendance_row(i % 1000)),
+        (f"{batch_size}-row upsert", batch_upsert_sql,
+         lambda i: [v for n in range(batch_size) for v in attendance_row((i * batch_size + n) % 5000)]),
+        ("changed-columns UPDATE", update_sql,
+         lambda i: [f"edited {i}", i % 2, i % 1000]),
+        ("audit keyset SELECT", "SELECT audit_id, action_type, old_data, new_data, changed_at, is_synced, "
+         "id_attendance FROM attendance_audit WHERE is_synced = 0 AND audit_id > %s ORDER BY audit_id LIMIT %s",
+         lambda i: [i % 1000, batch_size]),
+        ("audit acknowledgement", "UPDATE attendance_audit SET is_synced = is_synced WHERE audit_id = %s",
+         lambda i: [-1 - i]),
+    ]
+
+
+def run(execute, sql, params, iterations):
+    started = time.perf_counter()
+    for i in range(iterations):
+        cursor = execute(sql, params(i))
+        if getattr(cursor, "with_rows", False):
+            cursor.fetchall()
+    return (time.perf_counter() - started) / iterations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=50)
+    args = parser.parse_args()
+
+    conn = mysql.connector.connect(**config["databaseConfig"])
+    setup = conn.cursor()
+    setup.execute(f"CREATE TEMPORARY TABLE `{BENCH_TABLE}` LIKE `attendance`")
+
+    plain = conn.cursor()
+
+    def plain_execute(sql, params):
+        plain.execute(sql, params)
+        return plain
+
+    cache = StatementCache(conn, enabled=True)
+
+    print(f"{'statement':<26} {'plain (µs)':>11} {'prepared (µs)':>14} {'saving':>8}")
+    try:
+        for name, sql, params in statements(args.batch_size):
+            # One warm-up round each so both sides run against warm buffers
+            run(plain_execute, sql, params, min(50, args.iterations))
+            run(cache.execute, sql, params, min(50, args.iterations))
+            plain_cost = run(plain_execute, sql, params, args.iterations)
+            prepared_cost = run(cache.execute, sql, params, args.iterations)
+            saving = (1 - prepared_cost / plain_cost) * 100 if plain_cost else 0
+            print(f"{name:<26} {plain_cost * 1e6:>11.1f} {prepared_cost * 1e6:>14.1f} {saving:>7.1f}%")
+    finally:
+        cache.close_statements()
+        plain.close()
+        setup.execute(f"DROP TEMPORARY TABLE IF EXISTS `{BENCH_TABLE}`")
+        setup.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
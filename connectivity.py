@@ -0,0 +1,84 @@
+import json
+import logging
+import threading
+import time
+
+
+#file of the configuration
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+server_config = config["serverConfig"]
+INTERNET_CHECK_URL = server_config["INTERNET_CHECK_URL"]
+INTERNET_CHECK_TIMEOUT = server_config["INTERNET_CHECK_TIMEOUT"]
+
+log = logging.getLogger(__name__)
+# Wait before the first probe after a failure, doubled after each failed probe up to the max
+PROBE_BACKOFF_SECONDS = server_config.get("PROBE_BACKOFF_SECONDS", 30)
+PROBE_BACKOFF_MAX_SECONDS = server_config.get("PROBE_BACKOFF_MAX_SECONDS", 600)
+
+
+class ConnectivityTracker:
+    """
+    Reachability of the remote server inferred from the outcome of real calls.
+
+    Every request made through http_client reports success (any HTTP response) or
+    failure (connection error / timeout). While the last outcome was a success no
+    probe is made at all; after a failure INTERNET_CHECK_URL is probed, at most once
+    per backoff period, until a call succeeds again.
+    """
+
+    def __init__(self, probe_url, probe_timeout, backoff_seconds, backoff_max_seconds):
+        self.probe_url = probe_url
+        self.probe_timeout = probe_timeout
+        self.backoff_seconds = backoff_seconds
+        self.backoff_max_seconds = backoff_max_seconds
+        self.online = True
+        self._backoff = backoff_seconds
+        self._next_probe = 0.0
+        self._lock = threading.Lock()
+
+    def record_success(self):
+        with self._lock:
+            if not self.online:
+                log.info("Connection to remote server restored")
+            self.online = True
+            self._backoff = self.backoff_seconds
+
+    def record_failure(self):
+        with self._lock:
+            if self.online:
+                log.warning("Remote server unreachable, next probe in %ss", self._backoff)
+                self.online = False
+                self._next_probe = time.monotonic() + self._backoff
+
+    def _probe_failed(self):
+        with self._lock:
+            self._backoff = min(self._backoff * 2, self.backoff_max_seconds)
+            self._next_probe = time.monotonic() + self._backoff
+            log.warning("No internet connection available, next probe in %ss", self._backoff)
+
+    def is_online(self):
+        """True if the last call succeeded, otherwise probe when the backoff period is over"""
+        if self.online:
+            return True
+        if time.monotonic() < self._next_probe:
+            return False
+        return self.probe()
+
+    def probe(self):
+        # Imported here: http_client reports to this tracker
+        import http_client
+
+        log.debug("checking internet connection...")
+        try:
+            # Any HTTP answer means the network is back (http_client records the success)
+            http_client.probe(self.probe_url, self.probe_timeout)
+            return True
+        except http_client.CONNECTION_ERRORS:
+            self._probe_failed()
+            return False
+
+
+tracker = ConnectivityTracker(INTERNET_CHECK_URL, INTERNET_CHECK_TIMEOUT,
+                              PROBE_BACKOFF_SECONDS, PROBE_BACKOFF_MAX_SECONDS)
@@ -0,0 +1,144 @@
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+
+from sync_watermarks import WATERMARK_FORMAT, record_timestamp
+
+log = logging.getLogger(__name__)
+
+
+def fingerprint(value):
+    """Short stable digest of a decoded JSON value (key order and spacing do not matter)"""
+    canonical = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def record_key(record):
+    """Remote id of a record ('userId' for users, 'id' everywhere else)"""
+    if not isinstance(record, dict):
+        return None
+    key = record.get("id", record.get("userId"))
+    return str(key) if key is not None else None
+
+
+class FingerprintStore:
+    """
+    Fingerprints of the last applied version of the remote records that can still be
+    pulled again, and of whole created/updated lists, persisted between cycles.
+    Records (and sections) whose fingerprint did not change are not handed to the
+    handlers again, so the DB only sees real changes.
+
+    The store stays about the size of one pull window: prune() drops the records older
+    than their section's watermark minus the overlap (the watermark filter drops them
+    before they are fingerprinted), and each section keeps at most max_per_section
+    records, least recently applied first out.
+    """
+
+    def __init__(self, file_path, max_per_section=50000):
+        self.file_path = file_path
+        self.max_per_section = max_per_section
+        # section -> {record key: [digest, last-change time or None]}, least recently applied first
+        self.records = {}
+        self.sections = {}
+        self._pending_sections = {}
+        self._dirty = False
+        self.skipped = {}
+        self._load()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.file_path):
+                with open(self.file_path, "r") as f:
+                    data = json.load(f)
+                self.records = {
+                    section: {key: entry if isinstance(entry, list) else [entry, None]
+                              for key, entry in known.items()}
+                    for section, known in (data.get("records") or {}).items()
+                }
+                self.sections = data.get("sections") or {}
+        except (json.JSONDecodeError, ValueError, OSError) as err:
+            log.warning("Error reading fingerprint file, starting empty: %s", err)
+            self.records, self.sections = {}, {}
+
+    def save(self):
+        if not self._dirty:
+            return
+        tmp_path = f"{self.file_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"records": self.records, "sections": self.sections}, f, separators=(",", ":"))
+        os.replace(tmp_path, self.file_path)
+        self._dirty = False
+
+    def reset(self):
+        """Forget everything (full sync: the local DB may not match what we applied before)"""
+        self.records, self.sections, self._pending_sections = {}, {}, {}
+        self._dirty = True
+
+    def check(self, section, record):
+        """Return (unchanged, key, entry) for a record; entry is what remember() stores"""
+        key = record_key(record)
+        entry = [fingerprint(record), record_timestamp(record)]
+        stored = self.records.get(section, {}).get(key)
+        unchanged = key is not None and stored is not None and stored[0] == entry[0]
+        if unchanged:
+            self.skipped[section] = self.skipped.get(section, 0) + 1
+        return unchanged, key, entry
+
+    def remember(self, section, keys_digests):
+        """Store the fingerprints of records that were applied without error"""
+        known = self.records.setdefault(section, {})
+        for key, entry in keys_digests:
+            if key is not None and known.get(key) != entry:
+                # Re-inserted at the end: the least recently applied records are evicted first
+                known.pop(key, None)
+                known[key] = entry
+                self._dirty = True
+        while len(known) > self.max_per_section:
+            del known[next(iter(known))]
+
+    def prune(self, watermarks, overlap_seconds):
+        """
+        Drop the records older than their section's watermark minus the overlap: such a
+        record is only pulled again once it changed, and then its fingerprint differs anyway.
+        """
+        overlap = timedelta(seconds=overlap_seconds)
+        for section, mark in watermarks.items():
+            known = self.records.get(section)
+            if not known:
+                continue
+            try:
+                cutoff = (datetime.strptime(mark, WATERMARK_FORMAT) - overlap).strftime(WATERMARK_FORMAT)
+            except (TypeError, ValueError):
+                continue
+            stale = [key for key, (_digest, stamp) in known.items() if stamp and stamp < cutoff]
+            for key in stale:
+                del known[key]
+            if stale:
+                self._dirty = True
+
+    def forget(self, section, keys_digests):
+        """Drop fingerprints of records that failed, so they are applied again next time"""
+        known = self.records.get(section, {})
+        for key, _digest in keys_digests:
+            if known.pop(key, None) is not None:
+                self._dirty = True
+
+    def section_unchanged(self, section, kind, records):
+        """True when a whole created/updated list is identical to the last applied one"""
+        section_key = f"{section}/{kind}"
+        digest = fingerprint(records)
+        if self.sections.get(section_key) == digest:
+            self.skipped[section] = self.skipped.get(section, 0) + len(records)
+            return True
+        self._pending_sections[section_key] = digest
+        return False
+
+    def commit_sections(self, failed_sections):
+        """Keep the fingerprints of the lists whose section was applied without error"""
+        for section_key, digest in self._pending_sections.items():
+            if section_key.split("/", 1)[0] not in failed_sections:
+                self.sections[section_key] = digest
+                self._dirty = True
+        self._pending_sections = {}
@@ -0,0 +1,153 @@
+import json
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import connectivity
+
+
+#file of the configuration
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+http_config = config.get("httpConfig", {})
+
+# Number of per-host pools kept alive, and connections kept per host
+POOL_CONNECTIONS = http_config.get("POOL_CONNECTIONS", 4)
+POOL_MAXSIZE = http_config.get("POOL_MAXSIZE", 8)
+# (connect, read) timeout used when a call site does not pass its own
+DEFAULT_TIMEOUT = (http_config.get("CONNECT_TIMEOUT", 5), http_config.get("READ_TIMEOUT", 60))
+RETRY_TOTAL = http_config.get("RETRY_TOTAL", 3)
+RETRY_BACKOFF = http_config.get("RETRY_BACKOFF", 0.5)
+RETRY_STATUS = tuple(http_config.get("RETRY_STATUS", [429, 500, 502, 503, 504]))
+
+# Errors meaning the server could not be reached or the connection dropped, also while a
+# streamed body is read (a cut-off body surfaces as ChunkedEncodingError)
+CONNECTION_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError)
+
+# Retry policy -> keep-alive session using it
+_sessions = {}
+_session_lock = threading.Lock()
+
+
+def _build_accept_encoding():
+    """
+    Preferred content codings, best ratio first, limited to what urllib3 can decode here.
+    brotli/zstd are optional: `pip install brotli zstandard` to enable them.
+    """
+    codings = []
+    try:
+        import zstandard  # noqa: F401
+        codings.append("zstd")
+    except ImportError:
+        pass
+    try:
+        import brotli  # noqa: F401
+        codings.append("br;q=0.9")
+    except ImportError:
+        try:
+            import brotlicffi  # noqa: F401
+            codings.append("br;q=0.9")
+        except ImportError:
+            pass
+    codings += ["gzip;q=0.8", "deflate;q=0.5"]
+    return ", ".join(codings)
+
+
+ACCEPT_ENCODING = _build_accept_encoding()
+
+
+def _build_retry(policy):
+    """
+    - "default": connection errors are retried for every method, read errors and RETRY_STATUS
+      answers only for GET and DELETE: a note or presence POST resent after a read timeout
+      may already have been applied by the server
+    - "idempotent": POST is retried like GET (read-only POSTs: the pull, image downloads)
+    - "none": a single attempt (connectivity probe)
+    """
+    if policy == "none":
+        return Retry(0, read=False)
+    methods = ["GET", "DELETE"] + (["POST"] if policy == "idempotent" else [])
+    return Retry(
+        total=RETRY_TOTAL,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=frozenset(methods),
+        # Give the caller the last response so raise_for_status() keeps working
+        raise_on_status=False,
+    )
+
+
+def _build_session(policy):
+    adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+                          max_retries=_build_retry(policy), pool_block=False)
+    session = requests.Session()
+    session.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session(policy="default"):
+    """Return the process-wide keep-alive session of a retry policy (created on first use)"""
+    session = _sessions.get(policy)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(policy)
+            if session is None:
+                session = _sessions[policy] = _build_session(policy)
+    return session
+
+
+def request(method, url, idempotent=False, retry=True, **kwargs):
+    """
+    Send a request over the shared connection pool, with the default timeout if none is given.
+    The outcome is reported to the connectivity tracker.
+    - idempotent=True: the call is safe to repeat, a POST is retried after a read error too
+    - retry=False: one attempt only
+    """
+    kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+    policy = "none" if not retry else "idempotent" if idempotent else "default"
+    try:
+        response = get_session(policy).request(method, url, **kwargs)
+    except CONNECTION_ERRORS:
+        connectivity.tracker.record_failure()
+        raise
+    connectivity.tracker.record_success()
+    return response
+
+
+def iter_content(response, chunk_size):
+    """response.iter_content of a streamed response, reporting a connection dropped mid-body like request() does"""
+    try:
+        yield from response.iter_content(chunk_size=chunk_size)
+    except CONNECTION_ERRORS:
+        connectivity.tracker.record_failure()
+        raise
+
+
+def get(url, **kwargs):
+    return request("GET", url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request("POST", url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request("DELETE", url, **kwargs)
+
+
+def probe(url, timeout):
+    """Single GET without retries or backoff, for the connectivity probe"""
+    return request("GET", url, retry=False, timeout=timeout)
+
+
+def close():
+    """Close every pooled connection (the next call opens a fresh session)"""
+    with _session_lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
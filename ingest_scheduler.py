@@ -0,0 +1,102 @@
+import queue
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+
+import mysql.connector
+
+
+class ConnectionPool:
+    """
+    Fixed set of database connections shared by the ingestion workers.
+    Connections are opened on first use and kept for the whole sync cycle, so each one
+    keeps its prepared statements between pages.
+    """
+
+    def __init__(self, db_config, size):
+        self.db_config = db_config
+        self.size = size
+        self._idle = queue.LifoQueue()
+        self._opened = []
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def _open(self):
+        """Open a new connection if the pool is not full yet, else return None"""
+        with self._lock:
+            if self._count >= self.size:
+                return None
+            self._count += 1
+        try:
+            conn = mysql.connector.connect(**self.db_config)
+        except Exception:
+            with self._lock:
+                self._count -= 1
+            raise
+        with self._lock:
+            self._opened.append(conn)
+        return conn
+
+    @contextmanager
+    def connection(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open() or self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        with self._lock:
+            for conn in self._opened:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+            self._opened = []
+            self._count = 0
+        self._idle = queue.LifoQueue()
+
+
+def run_dag(tasks, dependencies, max_workers):
+    """
+    Run tasks ({name: callable}) on a thread pool, each one as soon as every task it
+    depends on (dependencies: {name: set of names}) has finished; dependencies on names
+    that are not in tasks are ignored. A task still runs when one of its parents failed.
+    Yields (name, result) in completion order, in the calling thread. If a task raised,
+    the first exception is raised once every started task has finished.
+    """
+    waiting = {name: {d for d in dependencies.get(name, ()) if d in tasks and d != name} for name in tasks}
+    done = set()
+    first_error = None
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest") as executor:
+        running = {}
+
+        def submit_ready():
+            for name in [n for n, deps in waiting.items() if deps <= done]:
+                del waiting[name]
+                running[executor.submit(tasks[name])] = name
+
+        submit_ready()
+        if waiting and not running:
+            raise ValueError(f"Dependency cycle between {sorted(waiting)}")
+        while running:
+            finished, _pending = wait(list(running), return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                done.add(name)
+                try:
+                    result = future.result()
+                except Exception as err:
+                    first_error = first_error or err
+                    continue
+                yield name, result
+            submit_ready()
+            if waiting and not running:
+                raise ValueError(f"Dependency cycle between {sorted(waiting)}")
+
+    if first_error is not None:
+        raise first_error
@@ -0,0 +1,148 @@
+import codecs
+import json
+
+
+# Size of the text window we try to keep decoded ahead of the parser
+READ_AHEAD_CHARS = 64 * 1024
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _StreamReader:
+    """
+    Incremental text buffer over an iterator of byte chunks.
+    Only the part of the body that has not been consumed yet is kept in memory.
+    """
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self, min_chars=READ_AHEAD_CHARS):
+        """Read chunks until at least min_chars unread characters are buffered (or EOF)"""
+        if self.pos:
+            # Drop what was already consumed
+            self.buf = self.buf[self.pos:]
+            self.pos = 0
+
+        while not self.eof and len(self.buf) < min_chars:
+            try:
+                chunk = next(self._chunks)
+            except StopIteration:
+                self.buf += self._utf8.decode(b"", final=True)
+                self.eof = True
+                break
+            if chunk:
+                self.buf += self._utf8.decode(chunk)
+        return len(self.buf) - self.pos
+
+    def peek(self):
+        """Return the next non-whitespace character without consuming it ('' at EOF)"""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buf):
+                return self.buf[self.pos]
+            if self.eof or not self.fill():
+                return ""
+
+    def expect(self, char):
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Malformed JSON stream: expected '{char}', got '{found or 'EOF'}'")
+        self.pos += 1
+
+    def read_value(self):
+        """Decode one complete JSON value (object, array, string, number, literal)"""
+        self.peek()
+        want = max(READ_AHEAD_CHARS, len(self.buf) - self.pos)
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buf, self.pos)
+                # A value that ends exactly at the buffer edge might be a truncated number
+                if end < len(self.buf) or self.eof:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            want *= 2
+            self.fill(want)
+
+
+def _read_key(reader):
+    key = reader.read_value()
+    if not isinstance(key, str):
+        raise ValueError("Malformed JSON stream: object key is not a string")
+    reader.expect(":")
+    return key
+
+
+def _iter_array(reader):
+    """Yield the elements of the array at the reader position one by one"""
+    reader.expect("[")
+    if reader.peek() == "]":
+        reader.pos += 1
+        return
+    while True:
+        yield reader.read_value()
+        sep = reader.peek()
+        reader.pos += 1
+        if sep == "]":
+            return
+        if sep != ",":
+            raise ValueError(f"Malformed JSON stream: expected ',' or ']' in array, got '{sep or 'EOF'}'")
+
+
+def _iter_object(reader):
+    """Yield the keys of the object at the reader position; the caller must consume each value"""
+    reader.expect("{")
+    if reader.peek() == "}":
+        reader.pos += 1
+        return
+    while True:
+        yield _read_key(reader)
+        sep = reader.peek()
+        reader.pos += 1
+        if sep == "}":
+            return
+        if sep != ",":
+            raise ValueError(f"Malformed JSON stream: expected ',' or '}}' in object, got '{sep or 'EOF'}'")
+
+
+def iter_section_records(chunks, meta=None):
+    """
+    Stream-parse a get-whats-news body and yield (section, kind, record) tuples.
+
+    The payload looks like {"user": {"created": [...], "updated": [...]}, "attendance": [...], ...}.
+    - kind is the sub-key ("created", "updated", ...) or None when the section is a plain list.
+    - Only one record is decoded at a time, so memory does not grow with the payload size.
+    - Top-level scalar values (e.g. "nextCursor") are stored in meta when a dict is given;
+      other values that are not lists of records are read and ignored.
+    """
+    reader = _StreamReader(chunks)
+    reader.fill()
+
+    for section in _iter_object(reader):
+        head = reader.peek()
+        if head == "[":
+            for record in _iter_array(reader):
+                yield section, None, record
+        elif head == "{":
+            for kind in _iter_object(reader):
+                if reader.peek() == "[":
+                    for record in _iter_array(reader):
+                        yield section, kind, record
+                else:
+                    reader.read_value()
+        else:
+            value = reader.read_value()
+            if meta is not None:
+                meta[section] = value
+
+    if reader.peek():
+        raise ValueError("Malformed JSON stream: trailing data after payload")
@@ -1,10 +1,30 @@
 import mysql.connector
+from mysql.connector.constants import ClientFlag
 import requests
 import time
 import json
+import logging
 import os
+import importlib
+import itertools
 from datetime import datetime, timedelta
 import push_data
+from json_stream import iter_section_records
+from sync_watermarks import WatermarkTracker
+from snapshot_cache import SnapshotCache
+from fingerprints import FingerprintStore
+from sync_journal import SyncJournal, iter_journal_lines
+import http_client
+import connectivity
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "push_data"))
+import batch_writer
+import id_index
+from bulk_loader import BulkLoader
+from transactions import current_transaction, ingest_transaction
+from entity_registry import ENTITIES, reapply_orphans, section_dependencies
+from ingest_scheduler import ConnectionPool, run_dag
+import sync_logging
 
 
 #file of the configuration
@@ -14,36 +34,91 @@ with open("config.json","r") as f:
 
 # Extract server and database configurations
 server_config = config["serverConfig"]
-database_config = config["databaseConfig"]
+# Ingestion counts upserted rows from the affected-row count (batch_writer.upsert_rows),
+# which needs the server to report 0 rows, not 1, for an unchanged duplicate
+database_config = {**config["databaseConfig"], "client_flags": [-ClientFlag.FOUND_ROWS]}
+push_config = config.get("pushConfig", {})
 
 # Set configuration variables
 TOKEN = server_config["TOKEN"]
 SYNC_INTERVAL_MINUTES = server_config["SYNC_INTERVAL_MINUTES"]
 SYNC_STATUS_FILE = server_config["SYNC_STATUS_FILE"]
-INTERNET_CHECK_TIMEOUT = server_config["INTERNET_CHECK_TIMEOUT"]
-INTERNET_CHECK_URL = server_config["INTERNET_CHECK_URL"]
+WHATS_NEWS_URL = server_config.get("WHATS_NEWS_URL", "https://unistudious.com/slc/get-whats-news")
+# Streaming mode: parse the get-whats-news body incrementally and apply it in chunks
+STREAM_SYNC = server_config.get("STREAM_SYNC", True)
+STREAM_CHUNK_SIZE = server_config.get("STREAM_CHUNK_SIZE", 500)
+STREAM_READ_SIZE = server_config.get("STREAM_READ_SIZE", 64 * 1024)
+# Re-pull window kept below each section watermark to catch late commits on the server
+WATERMARK_OVERLAP_SECONDS = server_config.get("WATERMARK_OVERLAP_SECONDS", 120)
+# Records per page requested with the cursor protocol (0 = let the server decide)
+PULL_PAGE_SIZE = server_config.get("PULL_PAGE_SIZE", 5000)
+# Fingerprints of applied records, to skip records that did not change since they were applied
+FINGERPRINT_FILE = server_config.get("FINGERPRINT_FILE", "sync_fingerprints.json")
+# Records kept per section in the fingerprint file (least recently applied evicted first)
+FINGERPRINT_MAX_PER_SECTION = server_config.get("FINGERPRINT_MAX_PER_SECTION", 50000)
+# Journal of every pulled page, replayable offline with --replay
+SYNC_JOURNAL_FILE = server_config.get("SYNC_JOURNAL_FILE", "sync_journal.jsonl")
+JOURNAL = SyncJournal(SYNC_JOURNAL_FILE) if server_config.get("SYNC_JOURNAL", False) else None
+# Compressed copies of downloaded pages, reapplied instead of re-downloaded after a failed apply
+SNAPSHOTS = SnapshotCache(server_config.get("SNAPSHOT_DIR", "snapshots"),
+                          server_config.get("SNAPSHOT_MAX_AGE_SECONDS", 3600),
+                          server_config.get("SNAPSHOT_COMPRESSLEVEL", 5))
+# First sync of a new box: spool every entity and bulk load it instead of writing row by row
+BULK_BOOTSTRAP = push_config.get("BULK_BOOTSTRAP", True)
+BULK_SPOOL_DIR = push_config.get("BULK_SPOOL_DIR", "bulk_spool")
+# Sections applied concurrently (each on its own connection) once their parent sections are done; 1 = one by one
+PARALLEL_WORKERS = push_config.get("PARALLEL_WORKERS", 4)
+# Largest page applied concurrently (it is read into memory first); a larger page, e.g. from a
+# server that ignores `limit`, is applied section by section while it streams
+PARALLEL_MAX_RECORDS = push_config.get("PARALLEL_MAX_RECORDS", PULL_PAGE_SIZE or 5000)
+
+
+# Sections of the get-whats-news payload, in the order they are applied:
+# (payload key, label, handler module, handler for "created", handler for "updated")
+SYNC_SECTIONS = [
+    ("user", "User", "push_data.handle_user_data", "upsert_users"),
+    ("slcTablet", "Tablet", "push_data.handle_tablet_data", "upsert_tablets"),
+    ("subject", "Subject", "push_data.handle_SubjectConfig_data", "upsert_subjects"),
+    ("slcLocal", "Local SLC", "push_data.handle_LocalSlc_data", "upsert_slc_local"),
+    ("slc", "Slc", "push_data.handle_slc_data", "upsert_slc_data"),
+    ("session", "Session", "push_data.handle_session_data", "upsert_session_data"),
+    ("local_with_room", "Local with Room", "push_data.handle_room_data", "upsert_room_data"),
+    ("relationUserSession", "Relation User Session", "push_data.handle_relationUserSession_data",
+     "upsert_relation_user_sessions"),
+    ("relationTeacherAndSubjectData", "Teacher-subject Relation", "push_data.handle_relationTeacherSubject_data",
+     "upsert_relation_teacher_subject"),
+    ("group", "Group", "push_data.handle_GroupLocalSession_data", "upsert_groups"),
+    ("calendar", "Calendar", "push_data.handle_calander", "upsert_calendar_data"),
+    ("slcCamera", "Camera", "push_data.handle_camera_data", "upsert_cameras"),
+    ("attendance", "Attendance", "push_data.handle_attendance_data", "upsert_attendance"),
+    ("accountSubject", "Account Subject", "push_data.handle_accountSubject_data", "upsert_account_subject"),
+    ("account", "Account", "push_data.handle_account_data", "upsert_account"),
+]
+# Created, updated and plain-list records all go through the section's upsert
+UPSERT_KINDS = (None, "created", "updated")
+SECTION_LABELS = {key: label for key, label, *_ in SYNC_SECTIONS}
+
+log = logging.getLogger("main_system")
 
 
 
 def check_internet_connection():
-    try:
-        print("checking internet connection...")
-        response = requests.get(INTERNET_CHECK_URL,timeout=INTERNET_CHECK_TIMEOUT)
-        return response.status_code == 200
-    except (requests.ConnectionError,requests.Timeout):
-        print("No internet connection availble")
-        return False
+    """
+    Reachability inferred from the outcome of the last real calls (pull, pushes, images).
+    INTERNET_CHECK_URL is only probed after a failure, with backoff.
+    """
+    return connectivity.tracker.is_online()
 
 
 #function to conncect to database
 def create_db_connection(db_config):
     try:
-        print(f"Attempting to connect to MariaDB at {db_config['host']}:{db_config['port']}")
+        log.debug("Attempting to connect to MariaDB at %s:%s", db_config['host'], db_config['port'])
         conn = mysql.connector.connect(**db_config)
-        print("MairaDB connection established successfully")
+        log.debug("MariaDB connection established successfully")
         return conn
     except mysql.connector.Error as e:
-        print(f"Failed to connect to MariaDB: {e}")
+        log.error("Failed to connect to MariaDB: %s", e)
         raise
 
 
@@ -58,95 +133,501 @@ def get_last_sync_time():
                 last_sync_str = data.get('last_sync_time')
                 if last_sync_str:
                     last_sync_time = datetime.fromisoformat(last_sync_str)
-                    print(f"Last sync time from file: {last_sync_time}")
+                    log.info("Last sync time from file: %s", last_sync_time)
                     return last_sync_time
                 else:
-                    print("No valid sync time found in file ")
+                    log.info("No valid sync time found in file")
                     return None
         else:
-            print("Sync status file does not exist")
+            log.info("Sync status file does not exist")
             return None
 
     except (json.JSONDecodeError,ValueError,FileNotFoundError) as err:
-        print(f"Error reading sync status file: {err}")
-        print("Will perform full sync")
+        log.warning("Error reading sync status file: %s. Will perform full sync", err)
         return None
 
 
 
+def read_sync_status():
+    """Return the whole content of the sync status file ({} if missing or unreadable)"""
+    try:
+        if os.path.exists(SYNC_STATUS_FILE):
+            with open(SYNC_STATUS_FILE,'r') as f:
+                data = json.load(f)
+                return data if isinstance(data, dict) else {}
+    except (json.JSONDecodeError,ValueError) as err:
+        log.warning("Error reading sync status file: %s", err)
+    return {}
+
+
+def write_sync_status(updates):
+    """Merge updates into the sync status file, keeping a backup of the previous version"""
+    sync_data = read_sync_status()
+    sync_data.update(updates)
+    sync_data['updated_at'] = datetime.now().isoformat()
+
+    if os.path.exists(SYNC_STATUS_FILE):
+        backup_file = f"{SYNC_STATUS_FILE}.backup"
+        with open(SYNC_STATUS_FILE, 'r') as original:
+            with open(backup_file, 'w') as backup:
+                backup.write(original.read())
+
+    with open(SYNC_STATUS_FILE,'w') as f:
+        json.dump(sync_data,f,indent=2)
+
+
 #function to save the function tha save the date of last synchronisation
 def save_last_sync_time(sync_time):
 
     try:
-        sync_data = {
-            'last_sync_time':sync_time.isoformat(),
-            'updated_at':datetime.now().isoformat()
-        }
+        #Write new sync time
+        write_sync_status({'last_sync_time':sync_time.isoformat()})
 
-        if os.path.exists(SYNC_STATUS_FILE):
-            backup_file = f"{SYNC_STATUS_FILE}.backup"
-            with open(SYNC_STATUS_FILE, 'r') as original:
-                with open(backup_file, 'w') as backup:
-                    backup.write(original.read())
+        log.info("Sync time saved to file: %s", sync_time)
 
-        #Write new sync time
-        with open(SYNC_STATUS_FILE,'w') as f:
-            json.dump(sync_data,f,indent=2)
 
-        print(f"Sync time saved to file: {sync_time}")
+    except Exception as err:
+        log.error("Error saving sync time to file: %s", err)
+
 
+def get_sync_watermarks():
+    """Per-section watermarks (newest applied updatedAt/timestamp) from the sync status file"""
+    watermarks = read_sync_status().get('watermarks') or {}
+    return watermarks if isinstance(watermarks, dict) else {}
 
+
+def save_sync_watermarks(watermarks):
+    try:
+        write_sync_status({'watermarks':watermarks})
     except Exception as err:
-        print(f"Error saving sync time to file: {err}")
+        log.error("Error saving sync watermarks to file: %s", err)
+
+
+def get_pull_since(tracker):
+    """
+    Date to pull changes from: the oldest section watermark minus the overlap window.
+    Falls back to the legacy last_sync_time minus one hour until watermarks exist.
+    """
+    since = tracker.pull_since(SECTION_LABELS)
+    if since is not None:
+        return since
+
+    last_sync = get_last_sync_time()
+    if last_sync is None:
+        return None
+    return last_sync - timedelta(hours=1)
+
+
+def build_pull_payload(since_date=None, cursor=None):
+    payload={}
+    if since_date:
+        # Format date without seconds (YYYY-MM-DD HH:MM), rounding down
+        payload['date'] = since_date.strftime("%Y-%m-%d %H:%M")
+        log.info("Fetching data since: %s", payload['date'])
+
+    else:
+        log.info("Fetching full data (initial sync)")
+
+    # Cursor protocol: servers that do not page ignore these and send everything at once
+    if PULL_PAGE_SIZE:
+        payload['limit'] = PULL_PAGE_SIZE
+    if cursor:
+        payload['cursor'] = cursor
+        log.info("Fetching page at cursor: %s", cursor)
+    return payload
 
 
 #funtion to fetch data from the remote server
-def fetch_data(tkoen, since_date=None):
+def fetch_data(tkoen, since_date=None, cursor=None, attempt=None, resume=False):
+    """
+    attempt: id of the pull the page belongs to, under which it is cached (SNAPSHOTS)
+    resume: the page may have been downloaded by this attempt before it was interrupted
+    """
     try:
-        url = "https://unistudious.com/slc/get-whats-news"
-        headers= {"Authorization": f"Bearer {tkoen}"}
-        payload={}
-        if since_date:
-            # Subtract 1 hour from the provided date
-            adjusted_date = since_date - timedelta(hours=1)
-            # Format date without seconds (YYYY-MM-DD HH:MM)
-            payload['date'] = adjusted_date.strftime("%Y-%m-%d %H:%M")
-            print(f"Fetching data since (adjusted -1 hour): {payload['date']}")
+        cached = SNAPSHOTS.read_chunks(attempt, cursor) if resume and attempt else None
+        if cached is not None:
+            return json.loads(b"".join(cached))
 
-        else:
-            print("Fetching full data(intial sync)")
+        headers= {"Authorization": f"Bearer {tkoen}"}
+        payload = build_pull_payload(since_date, cursor)
 
-        response = requests.post(url,headers=headers,data=payload)
+        response = http_client.post(WHATS_NEWS_URL,headers=headers,data=payload,idempotent=True)
         response.raise_for_status()
+        if attempt:
+            SNAPSHOTS.store(response.content, attempt, cursor)
+        if JOURNAL:
+            JOURNAL.append_body(response.content, since_date, cursor)
         return response.json()
 
     except requests.RequestException as err:
-        print(f"API request failed: {err}")
+        log.error("API request failed: %s", err)
+        raise
+
+
+def fetch_data_stream(tkoen, since_date=None, cursor=None, meta=None, attempt=None, resume=False):
+    """
+    Same request as fetch_data, but the body is parsed while it is downloaded.
+    Yields (section, kind, record) tuples; the full payload is never held in memory.
+    Top-level scalars of the page (e.g. nextCursor) are stored in meta.
+    """
+    try:
+        cached = SNAPSHOTS.read_chunks(attempt, cursor, STREAM_READ_SIZE) if resume and attempt else None
+        if cached is not None:
+            yield from iter_section_records(cached, meta)
+            return
+
+        headers= {"Authorization": f"Bearer {tkoen}"}
+        payload = build_pull_payload(since_date, cursor)
+
+        with http_client.post(WHATS_NEWS_URL,headers=headers,data=payload,stream=True,idempotent=True) as response:
+            response.raise_for_status()
+            chunks = http_client.iter_content(response, STREAM_READ_SIZE)
+            if attempt:
+                # Keep a compressed copy of the page while it is parsed
+                chunks = SNAPSHOTS.tee(chunks, attempt, cursor)
+            if JOURNAL:
+                chunks = JOURNAL.tee(chunks, since_date, cursor)
+            yield from iter_section_records(chunks, meta)
+
+    except requests.RequestException as err:
+        log.error("API request failed: %s", err)
         raise
 
 
+def get_section_handler(section, kind):
+    """Return a callable handler(conn, records) for a payload section, or None if it is not synced"""
+    if kind not in UPSERT_KINDS:
+        return None
+    for key, _label, module_name, fn_name in SYNC_SECTIONS:
+        if key != section:
+            continue
+        fn = getattr(importlib.import_module(module_name), fn_name)
+        if fn_name == "upsert_account":
+            # New accounts get their images downloaded, which needs the API token
+            return lambda conn, records: fn(conn, TOKEN, {"created": records})
+        return lambda conn, records: fn(conn, {"created": records})
+    return None
+
+
+def iter_payload_records(data, fingerprints=None):
+    """
+    Turn an already decoded payload into the same (section, kind, record) stream fetch_data_stream yields.
+    - With a FingerprintStore, created/updated lists identical to the last applied ones are skipped whole.
+    """
+    for section, *_ in SYNC_SECTIONS:
+        section_data = data.get(section, {})
+        if isinstance(section_data, dict):
+            for kind in ("created", "updated"):
+                records = section_data.get(kind) or []
+                if records and fingerprints and fingerprints.section_unchanged(section, kind, records):
+                    continue
+                for record in records:
+                    yield section, kind, record
+        elif isinstance(section_data, list):
+            if section_data and fingerprints and fingerprints.section_unchanged(section, None, section_data):
+                continue
+            for record in section_data:
+                yield section, None, record
+
+
+def get_pull_checkpoint():
+    checkpoint = read_sync_status().get('pull_checkpoint')
+    if not isinstance(checkpoint, dict):
+        return None
+    return checkpoint if checkpoint.get('cursor') or checkpoint.get('attempt') else None
+
+
+def save_pull_checkpoint(since, cursor, page, tracker, attempt=None):
+    """
+    Record that every page before cursor has been applied (cursor=None: the attempt starts
+    at its first page). tracker=None: the pages are applied again from scratch.
+    """
+    write_sync_status({'pull_checkpoint': {
+        'attempt': attempt,
+        'since': since.isoformat() if since else None,
+        'cursor': cursor,
+        'page': page,
+        'tracker': tracker.state() if tracker else None,
+    }})
+
+
+def clear_pull_checkpoint():
+    write_sync_status({'pull_checkpoint': None})
+
+
+def pull_and_apply(conn, tracker, since, fingerprints=None, checkpoints=True, pool=None):
+    """
+    Pull get-whats-news page by page (cursor protocol) and apply each page before
+    requesting the next one. A checkpoint is written after every page, so a crash or
+    timeout resumes from the last applied page instead of refetching everything.
+    - checkpoints=False: no checkpoint is read or written (pages are not durably applied yet)
+    - With a ConnectionPool, the sections of a page are applied concurrently (apply_sections_parallel)
+    - Once a page is applied, the queued records whose parents it brought are written again (orphan queue)
+    - Pages are cached under the id of the attempt, which is recorded before its first page
+      is applied; only a resumed attempt reads its pages back from the cache, a new attempt
+      always downloads fresh data
+    - When a section failed, the attempt is recorded again from its first page: the next run
+      reapplies the cached pages instead of downloading them (see sync_data_once)
+    """
+    cursor = None
+    page = 0
+    # Pages downloaded by an earlier attempt are never reused by this one (no cache without checkpoints)
+    attempt = datetime.now().strftime("%Y%m%d%H%M%S%f") if checkpoints else None
+    checkpoint = get_pull_checkpoint() if checkpoints else None
+    resume = checkpoint is not None
+    if checkpoint:
+        since = datetime.fromisoformat(checkpoint['since']) if checkpoint.get('since') else None
+        cursor = checkpoint['cursor']
+        page = checkpoint.get('page', 0)
+        attempt = checkpoint.get('attempt') or attempt
+        tracker.restore(checkpoint.get('tracker'))
+        log.info("Resuming interrupted pull after page %d", page)
+    elif checkpoints:
+        save_pull_checkpoint(since, None, page, tracker, attempt)
+
+    while True:
+        meta = {}
+        try:
+            if STREAM_SYNC:
+                # Parse the body as it arrives and apply each section chunk by chunk
+                events = fetch_data_stream(TOKEN, since, cursor, meta, attempt, resume)
+                apply_events(conn, pool, events, STREAM_CHUNK_SIZE, tracker, fingerprints)
+            else:
+                data = fetch_data(TOKEN, since, cursor, attempt, resume)
+
+                #check if there's any new data
+                if not data or not has_new_data(data):
+                    log.info("No new data available.")
+                else:
+                    log.info("New data found, processing...")
+                    apply_events(conn, pool, iter_payload_records(data, fingerprints), STREAM_CHUNK_SIZE,
+                                 tracker, fingerprints)
+                if isinstance(data, dict):
+                    meta = {k: v for k, v in data.items() if not isinstance(v, (dict, list))}
+        except requests.HTTPError as err:
+            # The server no longer knows this cursor: start the pull over next cycle
+            if cursor and err.response is not None and err.response.status_code in (400, 404, 410):
+                log.warning("Cursor %s rejected by server, dropping checkpoint", cursor)
+                clear_pull_checkpoint()
+            raise
+
+        reapply_orphans(conn)
+        page += 1
+        cursor = meta.get('nextCursor')
+        if not cursor:
+            log.info("Pull complete (%d page(s))", page)
+            if checkpoints and tracker.state()["failed"]:
+                save_pull_checkpoint(since, None, 0, None, attempt)
+            return
+        if checkpoints:
+            # The checkpoint must not get ahead of what is committed
+            tx = current_transaction(conn)
+            if tx:
+                tx.commit()
+            save_pull_checkpoint(since, cursor, page, tracker, attempt)
+
+
+def bootstrap_pull(conn, tracker, fingerprints):
+    """
+    Full sync in bulk-load mode: the whole pull is spooled to TSV files by the push_data
+    handlers, then loaded through staging tables (see push_data/bulk_loader.py).
+    Nothing is written before the pull is complete, so no pull checkpoint is kept.
+    """
+    started = time.perf_counter()
+    bulk_conn = create_db_connection({**database_config, "allow_local_infile": True, "autocommit": False})
+    loader = BulkLoader(bulk_conn, BULK_SPOOL_DIR)
+    try:
+        with batch_writer.spool_to(loader):
+            pull_and_apply(conn, tracker, None, fingerprints, checkpoints=False)
+        merged = loader.merge()
+    finally:
+        # The loaded rows bypassed the writers: the id index reloads what it holds
+        id_index.invalidate()
+        loader.discard()
+        bulk_conn.close()
+    total = sum(merged.values())
+    log.info("Bulk load done: %d row(s) into %d table(s) in %.2fs", total, len(merged), time.perf_counter() - started)
+
+
+def apply_section_events(conn, events, chunk_size, tracker=None, fingerprints=None):
+    """
+    Group consecutive (section, kind, record) events into chunks of at most chunk_size
+    records and hand each chunk to the section's push_data handler.
+    - Sections are applied as they are read, in payload order: a record whose parent row has
+      not been written yet (its section comes later, or is not in this payload) is written
+      and queued by the orphan queue; reapply_orphans writes it again once the parent lands.
+    - With a WatermarkTracker, records already applied in a previous cycle are dropped
+      and the tracker learns which sections were applied without error.
+    - With a FingerprintStore, records identical to their last applied version are dropped.
+    """
+    current = None
+    chunk = []
+    chunk_digests = []
+
+    def flush():
+        if not chunk:
+            return
+        section, kind = current
+        name = section if kind is None else f"{section}/{kind}"
+        handler = get_section_handler(section, kind)
+        if handler is None:
+            log.info("No handler for %s — %d record(s) ignored", name, len(chunk))
+        else:
+            try:
+                result = handler(conn, list(chunk))
+                failed = isinstance(result, dict) and result.get("error_count")
+            except Exception as err:
+                log.exception("Unexpected error while processing %s: %s", name, err)
+                failed = True
+
+            if tracker:
+                if failed:
+                    tracker.mark_failed(section)
+                else:
+                    tracker.observe(section, chunk)
+            if fingerprints:
+                if failed:
+                    fingerprints.forget(section, chunk_digests)
+                else:
+                    fingerprints.remember(section, chunk_digests)
+        chunk.clear()
+        chunk_digests.clear()
+
+    for section, kind, record in events:
+        # Created and updated records of a section share chunks: both are upserted
+        key = (section, None if kind in UPSERT_KINDS else kind)
+        if key != current:
+            flush()
+            current = key
+            log.debug("--- Processing %s records ---", SECTION_LABELS.get(section, section))
+        if tracker and tracker.is_already_applied(section, record):
+            continue
+        if fingerprints:
+            unchanged, record_id, digest = fingerprints.check(section, record)
+            if unchanged:
+                continue
+            chunk_digests.append((record_id, digest))
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            flush()
+    flush()
+
+
+def apply_events(conn, pool, events, chunk_size, tracker=None, fingerprints=None):
+    """
+    Apply the events of one page: concurrently with a pool, as long as the page has at most
+    PARALLEL_MAX_RECORDS records, otherwise on conn while the page streams.
+    """
+    if pool is None:
+        apply_section_events(conn, events, chunk_size, tracker, fingerprints)
+        return
+    events = iter(events)
+    head = list(itertools.islice(events, PARALLEL_MAX_RECORDS + 1))
+    if len(head) > PARALLEL_MAX_RECORDS:
+        log.info("Page of more than %d records: applying it section by section as it streams",
+                 PARALLEL_MAX_RECORDS)
+        apply_section_events(conn, itertools.chain(head, events), chunk_size, tracker, fingerprints)
+    else:
+        apply_sections_parallel(pool, head, chunk_size, tracker, fingerprints)
+
+
+def apply_sections_parallel(pool, events, chunk_size, tracker=None, fingerprints=None):
+    """
+    Same filtering and bookkeeping as apply_section_events, but the records of a page are
+    first grouped per section, then the sections are applied concurrently on the pool's
+    connections: a section starts once the sections holding its parent entities are done
+    (entity_registry.section_dependencies), so the cycle takes about its critical path.
+    A section whose parent section failed is not applied: it is marked failed, so its
+    records are pulled again next cycle.
+    Watermarks and fingerprints are only updated from this thread.
+    """
+    dependencies = section_dependencies()
+    # Sections with a failed chunk; a child task only starts once its parents are done
+    broken = set()
+    buffers = {}
+    ignored = {}
+    for section, kind, record in events:
+        if get_section_handler(section, kind) is None:
+            name = section if kind is None else f"{section}/{kind}"
+            ignored[name] = ignored.get(name, 0) + 1
+            continue
+        if tracker and tracker.is_already_applied(section, record):
+            continue
+        records, digests = buffers.setdefault(section, ([], []))
+        if fingerprints:
+            unchanged, record_id, digest = fingerprints.check(section, record)
+            if unchanged:
+                continue
+            digests.append((record_id, digest))
+        records.append(record)
+    for name, count in ignored.items():
+        log.info("No handler for %s — %d record(s) ignored", name, count)
+
+    def ingest(section, records, digests):
+        failed_parents = dependencies.get(section, set()) & broken
+        if failed_parents:
+            log.warning("⏭️ %s not applied: parent section(s) %s failed", SECTION_LABELS.get(section, section),
+                        ", ".join(sorted(failed_parents)))
+            broken.add(section)
+            return [(True, records, digests)]
+        handler = get_section_handler(section, None)
+        outcomes = []
+        try:
+            with pool.connection() as conn, ingest_transaction(conn):
+                log.debug("--- Processing %s records ---", SECTION_LABELS.get(section, section))
+                for start in range(0, len(records), chunk_size):
+                    chunk = records[start:start + chunk_size]
+                    try:
+                        result = handler(conn, chunk)
+                        failed = isinstance(result, dict) and result.get("error_count")
+                    except Exception as err:
+                        log.exception("Unexpected error while processing %s: %s", section, err)
+                        failed = True
+                    if failed:
+                        broken.add(section)
+                    outcomes.append((failed, chunk, digests[start:start + chunk_size]))
+        except Exception:
+            broken.add(section)
+            raise
+        return outcomes
+
+    tasks = {section: (lambda s=section, b=buffer: ingest(s, *b)) for section, buffer in buffers.items()}
+    for section, outcomes in run_dag(tasks, dependencies, PARALLEL_WORKERS):
+        for failed, chunk, chunk_digests in outcomes:
+            if tracker:
+                if failed:
+                    tracker.mark_failed(section)
+                else:
+                    tracker.observe(section, chunk)
+            if fingerprints:
+                if failed:
+                    fingerprints.forget(section, chunk_digests)
+                else:
+                    fingerprints.remember(section, chunk_digests)
+
+
 def process_created_updated(conn, label, data, push_fn):
 
     try:
         #Case 1: API returns a dict with created/updated
         if isinstance(data,dict):
             if "created" in data and data["created"]:
-                print(f"\n ---Processing New {label} ---")
+                log.debug("--- Processing New %s ---", label)
                 push_fn(conn,data["created"])
             if "updated" in data and data["updated"]:
-                print(f"\n ---Processing Updated {label} ---")
+                log.debug("--- Processing Updated %s ---", label)
                 push_fn(conn,data["updated"])
             if "updated" in data and data["updated"]:
-                print(f"\n ---Processing Deleted {label} ---")
+                log.debug("--- Processing Deleted %s ---", label)
                 push_fn(conn,data["updated"])
 
         # Case 2: API returns a plain list
         elif isinstance(data,list) and data:
-            print(f"\n--- Processing{label} list ({len(data)} records) ---")
+            log.debug("--- Processing %s list (%d records) ---", label, len(data))
             push_fn(conn, data)
 
     except Exception as err:
-        print(f"Unexpected error while processing {label: {err}}")
+        log.exception("Unexpected error while processing %s: %s", label, err)
 
 
 
@@ -165,330 +646,154 @@ def has_new_data(data):
 
 
 def sync_data_once():
-    #first check for internet connection
+    #first check for internet connection (no network round trip unless the last call failed)
     if not check_internet_connection():
-        print("No internet connection availble.Cannot sync with remote server. ")
-        print("Please check you internet connection and try again.")
+        log.warning("No internet connection available. Cannot sync with remote server. "
+                    "Please check your internet connection and try again.")
         return False
 
     conn = None
     try:
-        print(f"\n == Starting sync at {datetime.now()} ===")
+        log.info("=== Starting sync at %s ===", datetime.now())
         conn = create_db_connection(database_config)
 
-        # Get last sync time from JSON file
-        # Get last sync time from JSON file
-        last_sync = get_last_sync_time()
+        # Get the per-section watermarks from JSON file
+        tracker = WatermarkTracker(get_sync_watermarks(), WATERMARK_OVERLAP_SECONDS)
+        since = get_pull_since(tracker)
 
         # Prepare request - store current time before API call
         now_for_next_sync = datetime.now()
 
-        # Use the fetch_data funtion which handles time adjustmenet
-        data = fetch_data(TOKEN, last_sync)
-
-        #check if there's any new data
-        if not data or not has_new_data(data):
-            print("No new data available. Skipping sync.")
-            return True
-
-        print("New data founc, procesing...")
-
-        # User - Handle both created and updated
-        user_data = data.get("user",{})
-        if user_data:
-            from push_data.handle_user_data import push_users ,update_user
-            print("\n --- Processing User Data ---")
-
-            # Process created records using the existing push function
-            if user_data.get("created"):
-                print("Processing new user records...")
-                push_users(conn,{"created":user_data["created"]})
-
-            # Process updated records using the new update function
-            if user_data.get("updated"):
-                print("Processing updated user records...")
-                update_user(conn,{"updated":user_data["updated"]})
-
-        # Tablet - Handle both created and updated
-
-        tablet_data = data.get("slcTablet", {})
-        if tablet_data:
-            print("\n--- Processing Tablet Data ---")
-
-            # Process created records using the existing push function
-            if tablet_data.get("created"):
-                from push_data.handle_tablet_data import insert_tablets
-                print("Processing new tablet records...")
-                insert_tablets(conn,{"created": tablet_data["created"]})
-
-            # Process updated records using the new update function
-            if tablet_data.get("updated"):
-                from push_data.handle_tablet_data import update_tablets
-                print("Processing updated tablet records...")
-                update_tablets(conn,{"updated": tablet_data["updated"]})
-
-        # Subject - Handle both created and updated
-        subject_data = data.get("subject", {})
-        if subject_data:
-            print("\n--- Processing Subject Data ---")
-
-            #process created records using the existing push function
-            if subject_data.get("created"):
-                from push_data.handle_SubjectConfig_data import push_subjects
-                print("Processing new subject records...")
-                push_subjects(conn,{"created": subject_data["created"]})
-
-            #process updated rcords using the new update function
-            if subject_data.get("updated"):
-                from push_data.handle_SubjectConfig_data import update_subjects
-                print("Processing updated subject records...")
-                update_subjects(conn,{"updated": subject_data["updated"]})
-
-        # Slc_local - Handl both created and updated
-        local_slc_data = data.get("slcLocal",{})
-        if local_slc_data:
-            print("\n--- Processing local SLC Data ---")
-
-            # Process created records using the existing push function
-            if local_slc_data.get("created"):
-                from push_data.handle_LocalSlc_data import insert_slc_local
-                print("Processing new local_slc records...")
-                insert_slc_local(conn,{"created": local_slc_data["created"]})
-
-
-            # Process updated records using the new update function
-            if local_slc_data.get("updated"):
-                from push_data.handle_LocalSlc_data import update_slc_local
-                print("Processing updated local SLC records")
-                update_slc_local(conn,{"updated": local_slc_data["updated"]})
-
-
-        # Slc - Handle both created and updated
-        slc_data = data.get("slc", {})
-        if( slc_data):
-            print("\n--- Processing Slc Data ---\n")
-            if (slc_data.get("created")):
-                print("\n--- Processing new slc Data ---")
-                from push_data.handle_slc_data import insert_slc_data
-                insert_slc_data(conn,{"created": slc_data["created"]})
-
-            if (slc_data.get("updated")):
-                print("\n--- Processing updated slc data ---")
-                from push_data.handle_slc_data import updated_slc_data
-                updated_slc_data(conn,{"updated": slc_data["updated"]})
-
-
-        # Session - Handle both created and updated
-        session_data= data.get("session", {})
-        if (session_data):
-            print("\n ---Processing Session Data ---")
-
-            # Process created recordsusing he existing push function
-            if session_data.get("created"):
-                print("Processing new session records...")
-                from push_data.handle_session_data import insert_session_data
-                insert_session_data(conn,{"created": session_data["created"]})
-
-            # Process updated records using the new update function
-            if session_data.get("updated"):
-                print("Processing updated session records...")
-                from push_data.handle_session_data import update_session_data
-                update_session_data(conn,{"updated": session_data["updated"]})
-
-
-        # Local|Room - Handle both created and updated
-        local_with_room_data=data.get("local_with_room", {})
-        if local_with_room_data:
-            print("\n--- Processing Local with Room Data ---")
-
-            # Process created records using the existing push functon
-            if local_with_room_data.get("created"):
-                print("\n--- Processing new local with room records ---")
-                from push_data.handle_room_data import insert_room_data
-                insert_room_data(conn,{"created": local_with_room_data["created"]})
-
-            # Process updated records using the new update function
-            if local_with_room_data.get("updated"):
-                print("\n--- Processing updated local with room records ---")
-                from push_data.handle_room_data import update_room_data
-                update_room_data(conn,{"updated": local_with_room_data["updated"]})
-
-        # Relation User Session - Handle both created and updated
-        relationsession = data.get("relationUserSession", {})
-        if relationsession:
-            print("\n--- Processing Relation User Session Data ---")
-
-            # Process created records using the existing push function
-            if relationsession.get("created"):
-                print("\n---processing new relation user session records---")
-                from push_data.handle_relationUserSession_data import push_relation_user_sessions
-                push_relation_user_sessions(conn,{"created": relationsession["created"]})
-
-
-            if relationsession.get("updated"):
-                print("\n--- Procesing update user sesion records ---")
-                from push_data.handle_relationUserSession_data import update_relation_user_session
-                update_relation_user_session(conn,{"updated": relationsession["updated"]})
-
-
-        # teacher_subjet - handle both created and updated
-        teacher_subject_data = data.get("relationTeacherAndSubjectData", {})
-        if teacher_subject_data:
-            print("\n--- Processing Teacher-subject Relation Data ---")
-
-            # Process created records using the existing push function
-            if teacher_subject_data.get("created"):
-                print("Processing new teacher-subject relation records...")
-                from push_data.handle_relationTeacherSubject_data import push_relation_teacher_subject
-                push_relation_teacher_subject(conn,{"created":teacher_subject_data["created"]})
-
-            if teacher_subject_data.get("updated"):
-                print("Processing updating teacher-subject relation records...")
-                from push_data.handle_relationTeacherSubject_data import update_relation_teacher_subject
-                update_relation_teacher_subject(conn,{"updated":teacher_subject_data["updated"]})
-
-
-        # Group - handle both created and updated
-        group_data = data.get("group", {})
-        if group_data:
-            print("\n--- Processing Group Data ---")
-
-            # Process created records using the existing push function
-            if group_data.get("created"):
-                print("Processing new group relation records...")
-                from push_data.handle_GroupLocalSession_data import insert_groups
-                insert_groups(conn,{"created":group_data["created"]})
-
-            # Process updated records using the existing updating function
-            if group_data.get("updated"):
-                print("Processing updated group relation records...")
-                from push_data.handle_GroupLocalSession_data import update_groups
-                update_groups(conn,{"updated":group_data["updated"]})
-
-        # Calander - handle both created and updated
-        calander_data = data.get("calendar",{})
-        if calander_data:
-            print("n processing Attendance Data ---")
-
-            #process created records using the existing push function
-            if calander_data.get("created"):
-                print("Processing new calander records...")
-                from push_data.handle_calander import insert_calendar_data
-                insert_calendar_data(conn,{"created":calander_data["created"]})
-
-
-            if calander_data.get("updated"):
-                print("Processing updated calander records...")
-                from push_data.handle_calander import update_calendar_data
-                update_calendar_data(conn,{"updated":calander_data["updated"]})
-
-
-        # Camera - handle both created and updated
-        camera_data = data.get("slcCamera",{})
-        if camera_data:
-            print("\n---processing Camera Data ---")
-
-            # Process created records using the existing push function
-            if camera_data.get("created"):
-                from push_data.handle_camera_data import insert_cameras
-                insert_cameras(conn,{"created":camera_data["created"]})
-
-            # Process updated records using the existing updating function
-            if camera_data.get("updated"):
-                from push_data.handle_camera_data import update_cameras
-                update_cameras(conn,{"updated":camera_data["updated"]})
-        # Attandance - handle both created and updated
-        attendance_data = data.get("attendance",{})
-        if attendance_data:
-            print("\n--- Processing Attendance Data...")
-
-            # Process created records using existing push function
-            if attendance_data.get("created"):
-                from push_data.handle_attendance_data import insert_attendance
-                print("Processing new attendance records...")
-                insert_attendance(conn,{"created":attendance_data["created"]})
-
-            # Process updated records using existing updating function
-            if attendance_data.get("updated"):
-                from push_data.handle_attendance_data import update_attendance_data
-                print("Processing updated attendance records...")
-                update_attendance_data(conn,{"updated":attendance_data["updated"]})
-
-        # Account Subject - handle both created and updated
-        account_subject_data = data.get("accountSubject", {})
-        if account_subject_data:
-            print("\n--- Processing Account Subject Data ---")
-
-            # Process created records using the existing push function
-            if account_subject_data["created"]:
-                print("Processing new account_subject records...")
-                from push_data.handle_accountSubject_data import insert_account_subject
-                insert_account_subject(conn,{"created":account_subject_data["created"]})
-
-            # Process updated records using the existing update function
-            if account_subject_data["updated"]:
-                print("Processing updated account_subject records...")
-                from push_data.handle_accountSubject_data import update_account_subject
-                update_account_subject(conn,{"updated":account_subject_data["updated "]})
-
-
-        # Account - handle both created and updated
-
-        account_data = data.get("account", {})
-        if account_data:
-            print("\n--- Processing Account Data")
-
-            # Process created records using thee existing push function
-            if account_data["created"]:
-                print("Processing new accounut records...")
-                from push_data.handle_account_data import insert_account
-                insert_account(conn,TOKEN,{"created":account_data["created"]})
-
-            # Process updated records using the existing update function
-            if account_data["updated"]:
-                print("Processing update records...")
-                from push_data.handle_account_data import update_account
-                update_account(conn,{"updated":account_data["updated"]})
-
-        # Save the new sync time
+        fingerprints = FingerprintStore(FINGERPRINT_FILE, FINGERPRINT_MAX_PER_SECTION)
+        if since is None and get_pull_checkpoint() is None:
+            # Full sync: the local DB may not hold what the fingerprints say was applied
+            fingerprints.reset()
+
+        SNAPSHOTS.prune()
+        if since is None and get_pull_checkpoint() is None and BULK_BOOTSTRAP:
+            try:
+                bootstrap_pull(conn, tracker, fingerprints)
+            except Exception as err:
+                # e.g. local_infile disabled on the server: do the full sync row by row
+                log.warning("Bulk load failed (%s), falling back to a regular full sync", err)
+                tracker = WatermarkTracker(get_sync_watermarks(), WATERMARK_OVERLAP_SECONDS)
+                fingerprints.reset()
+                with ingest_transaction(conn):
+                    pull_and_apply(conn, tracker, since, fingerprints)
+        else:
+            # Writes are committed in groups of TRANSACTION_RECORDS records
+            pool = ConnectionPool(database_config, PARALLEL_WORKERS) if PARALLEL_WORKERS > 1 else None
+            try:
+                with ingest_transaction(conn):
+                    pull_and_apply(conn, tracker, since, fingerprints, pool=pool)
+            finally:
+                if pool:
+                    pool.close()
+
+        for section, count in tracker.skipped.items():
+            log.info("⏭️ %d %s record(s) already applied (watermark)", count, SECTION_LABELS.get(section, section))
+        for section, count in fingerprints.skipped.items():
+            log.info("⏭️ %d %s record(s) unchanged (fingerprint)", count, SECTION_LABELS.get(section, section))
+
+        watermarks = tracker.advanced(SECTION_LABELS)
+        fingerprints.commit_sections(tracker.state()["failed"])
+        # Records below the new watermarks are filtered before they are fingerprinted
+        fingerprints.prune(watermarks, WATERMARK_OVERLAP_SECONDS)
+        fingerprints.save()
+
+        # Save the new watermarks and sync time
+        save_sync_watermarks(watermarks)
+        if tracker.state()["failed"]:
+            # The pull checkpoint points at the start of this attempt: the next run
+            # reapplies its cached pages (e.g. after a DB error) without downloading them
+            log.warning("⚠️ Section(s) failed: keeping the cached pages of this pull for the next run")
+        else:
+            clear_pull_checkpoint()
+            # Cached pages are only read back when their attempt resumes, and this one is over
+            SNAPSHOTS.clear()
         save_last_sync_time(now_for_next_sync)
 
     except Exception as e:
-        print(f"DEBUG:Error {e}")
+        log.exception("Sync failed: %s", e)
+
+
 
 
+def replay_journal(journal_file):
+    """
+    Feed every payload recorded in a sync journal through the ingestion path
+    (apply_section_events and the push_data handlers) against the local DB, with no
+    network and no watermark/fingerprint filtering, and report the throughput.
+    """
+    log.info("Replaying sync journal %s", journal_file)
+    conn = create_db_connection(database_config)
+    total_records = 0
+    started = time.perf_counter()
+
+    def counted(events, counter):
+        for event in events:
+            counter[0] += 1
+            yield event
+
+    try:
+        with ingest_transaction(conn):
+            for number, line in enumerate(iter_journal_lines(journal_file, STREAM_READ_SIZE), 1):
+                meta = {}
+                counter = [0]
+                line_started = time.perf_counter()
+                apply_section_events(conn, counted(iter_section_records(line, meta), counter), STREAM_CHUNK_SIZE)
+                reapply_orphans(conn)
+                elapsed = time.perf_counter() - line_started
+                total_records += counter[0]
+                rate = counter[0] / elapsed if elapsed > 0 else 0
+                log.info("Replayed payload %d (fetched %s): %d record(s) in %.2fs (%.0f records/s)",
+                         number, meta.get('_fetched_at'), counter[0], elapsed, rate)
+    finally:
+        conn.close()
+
+    elapsed = time.perf_counter() - started
+    rate = total_records / elapsed if elapsed > 0 else 0
+    log.info("Replay done: %d record(s) in %.2fs (%.0f records/s)", total_records, elapsed, rate)
 
 
 def run_continuous_sync():
     """Run sync continuously every X minutes"""
-    print(f"Starting automatic sync every {SYNC_INTERVAL_MINUTES} minute(s)")
-    print("Press Ctrl+C to stop")
+    log.info("Starting automatic sync every %s minute(s) (Ctrl+C to stop)", SYNC_INTERVAL_MINUTES)
+
+    # Existence checks of the handlers are answered from memory while the daemon runs
+    try:
+        conn = create_db_connection(database_config)
+        try:
+            id_index.warm(conn, sorted({entity.table for entity in ENTITIES.values()}))
+        finally:
+            conn.close()
+    except Exception as err:
+        log.warning("Id index not loaded, existence checks go to the database: %s", err)
 
     try:
         while True:
-            if check_internet_connection():
-                sync_data_once()
-                print(f"Waiting {SYNC_INTERVAL_MINUTES} minute(s) for next sync...")
+            # sync_data_once checks connectivity itself
+            if sync_data_once() is not False:
+                log.info("Waiting %s minute(s) for next sync...", SYNC_INTERVAL_MINUTES)
             else:
-                print("No internet connection. Waiting 1 minute before checking again...")
+                log.info("No internet connection. Waiting %s minute(s) before checking again...", SYNC_INTERVAL_MINUTES)
             time.sleep(SYNC_INTERVAL_MINUTES * 60)
     except KeyboardInterrupt:
-        print("\nSync stopped by user")
+        log.info("Sync stopped by user")
     except Exception as err:
-        print(f"Continuous sync error: {err}")
+        log.exception("Continuous sync error: %s", err)
 
 
 def main():
     import sys
+    sync_logging.configure()
     if len(sys.argv) > 1 and sys.argv[1] == "--continuous":
         run_continuous_sync()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--replay":
+        replay_journal(sys.argv[2] if len(sys.argv) > 2 else SYNC_JOURNAL_FILE)
     else:
-        print("Running single sync...")
-        print("Use 'python main.py --continuous' for automatic sync")
-        if check_internet_connection():
-            sync_data_once()
-        else:
-            print("Cannot sync: No internet connection available")
+        log.info("Running single sync... (use 'python main_system.py --continuous' for automatic sync)")
+        sync_data_once()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,427 @@
+import hashlib
+import json
+import logging
+from contextlib import contextmanager
+from functools import lru_cache
+
+from column_types import get_column_types, values_differ
+from common_function import fetch_existing_rows, padded
+import id_index
+from statement_cache import statement_cache
+from transactions import abort_write, begin_write, end_write
+
+#file of the configuration
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+push_config = config.get("pushConfig", {})
+# Rows per multi-row INSERT ... ON DUPLICATE KEY UPDATE statement
+INSERT_CHUNK_SIZE = push_config.get("INSERT_CHUNK_SIZE", 500)
+# Rows per grouped UPDATE (rows sharing the same set of changed columns)
+UPDATE_CHUNK_SIZE = push_config.get("UPDATE_CHUNK_SIZE", 200)
+# Digest of the last applied remote version of a row (added by the migration in sql_code.sql)
+DIGEST_COLUMN = "sync_digest"
+
+log = logging.getLogger(__name__)
+
+# BulkLoader the handlers' rows go to instead of the database (see spool_to)
+_spool = None
+
+
+@contextmanager
+def spool_to(loader):
+    """Within this block write_upserts hands its rows to `loader` (a bulk_loader.BulkLoader)"""
+    global _spool
+    previous, _spool = _spool, loader
+    try:
+        yield loader
+    finally:
+        _spool = previous
+
+
+def spooling():
+    """True while the rows are spooled for a bulk load instead of being written"""
+    return _spool is not None
+
+
+def build_insert_sql(table, columns, row_count, suffix=""):
+    """INSERT statement with `row_count` VALUES tuples"""
+    column_list = ", ".join(f"`{c}`" for c in columns)
+    row_placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+    values = ", ".join([row_placeholders] * row_count)
+    return f"INSERT INTO `{table}` ({column_list}) VALUES {values} {suffix}".rstrip()
+
+
+def upsert_assignments(update_columns, flag_columns=None):
+    """
+    ON DUPLICATE KEY UPDATE assignments of update_columns.
+    flag_columns ({column: int}) are only set when one of update_columns really changes
+    (e.g. is_sync=1); they come first so they compare against the old values.
+    """
+    assignments = []
+    if flag_columns:
+        unchanged = " AND ".join(f"`{c}` <=> VALUES(`{c}`)" for c in update_columns)
+        for column, value in flag_columns.items():
+            assignments.append(f"`{column}` = IF({unchanged}, `{column}`, {int(value)})")
+    assignments += [f"`{c}` = VALUES(`{c}`)" for c in update_columns]
+    return ", ".join(assignments)
+
+
+def build_upsert_sql(table, columns, update_columns, row_count, flag_columns=None):
+    """INSERT ... ON DUPLICATE KEY UPDATE of update_columns with `row_count` VALUES tuples"""
+    return build_insert_sql(table, columns, row_count,
+                            "ON DUPLICATE KEY UPDATE " + upsert_assignments(update_columns, flag_columns))
+
+
+@lru_cache(maxsize=512)
+def _cached_upsert_sql(table, columns, update_columns, row_count, flags):
+    return build_upsert_sql(table, columns, update_columns, row_count, dict(flags))
+
+
+def upsert_sql(table, columns, update_columns, row_count, flag_columns=None):
+    """build_upsert_sql, cached: every entity reuses the same few statement shapes"""
+    return _cached_upsert_sql(table, tuple(columns), tuple(update_columns), row_count,
+                              tuple((flag_columns or {}).items()))
+
+
+def upsert_rows(cursor, table, columns, update_columns, rows, chunk_size=None, flag_columns=None):
+    """
+    Upsert rows with one multi-row INSERT ... ON DUPLICATE KEY UPDATE per chunk.
+    write_upserts only sends it the rows it expects to be new (not found by the diff, or not
+    in the id index); the ON DUPLICATE KEY part covers a row that exists after all.
+    rows: list of (key, values) where key[0] is the record id.
+    The server reports 1 affected row per insert, 2 per changed duplicate and 0 per unchanged
+    duplicate, so rows found to exist are counted from the difference with one per row
+    (a chunk with both changed and unchanged duplicates counts them as inserted).
+    The connection must be opened without CLIENT_FOUND_ROWS (main_system.database_config),
+    otherwise an unchanged duplicate reports 1 and is counted as inserted.
+    A chunk that fails is retried row by row.
+    Returns (counts, failures): counts has inserted/updated/unchanged, failures is a list of (key, error).
+    """
+    chunk_size = chunk_size or INSERT_CHUNK_SIZE
+    counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+    failures = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        params = [value for _key, values in chunk for value in values]
+        try:
+            cursor.execute(upsert_sql(table, columns, update_columns, len(chunk), flag_columns), params)
+            updated = max(0, cursor.rowcount - len(chunk))
+            unchanged = max(0, len(chunk) - cursor.rowcount)
+            counts["inserted"] += len(chunk) - updated - unchanged
+            counts["updated"] += updated
+            counts["unchanged"] += unchanged
+            continue
+        except Exception as err:
+            if len(chunk) > 1:
+                log.warning("⚠️ Batch upsert into %s failed (%s), retrying %d row(s) one by one", table, err, len(chunk))
+
+        single_sql = upsert_sql(table, columns, update_columns, 1, flag_columns)
+        for key, values in chunk:
+            try:
+                cursor.execute(single_sql, values)
+                counts[{1: "inserted", 2: "updated"}.get(cursor.rowcount, "unchanged")] += 1
+            except Exception as err:
+                failures.append((key, err))
+    return counts, failures
+
+
+def build_update_sql(table, changed_columns, row_count, flag_columns=None):
+    """
+    UPDATE of changed_columns only, for `row_count` rows matched by id.
+    Several rows are updated in one statement with a CASE per column; flag_columns
+    ({column: int}) are set on every row of the statement.
+    """
+    if row_count == 1:
+        assignments = [f"`{c}` = %s" for c in changed_columns]
+        where = "`id` = %s"
+    else:
+        cases = " ".join(["WHEN %s THEN %s"] * row_count)
+        assignments = [f"`{c}` = CASE `id` {cases} END" for c in changed_columns]
+        where = "`id` IN (" + ", ".join(["%s"] * row_count) + ")"
+    assignments += [f"`{c}` = {int(v)}" for c, v in (flag_columns or {}).items()]
+    return f"UPDATE `{table}` SET {', '.join(assignments)} WHERE {where}"
+
+
+def build_update_params(changed_columns, rows):
+    """Parameters of build_update_sql; rows: list of (record_id, {column: value})"""
+    if len(rows) == 1:
+        record_id, values = rows[0]
+        return [values[c] for c in changed_columns] + [record_id]
+    params = []
+    for column in changed_columns:
+        for record_id, values in rows:
+            params += [record_id, values[column]]
+    return params + [record_id for record_id, _values in rows]
+
+
+@lru_cache(maxsize=512)
+def _cached_update_sql(table, changed_columns, row_count, flags):
+    return build_update_sql(table, changed_columns, row_count, dict(flags))
+
+
+def update_sql(table, changed_columns, row_count, flag_columns=None):
+    """build_update_sql, cached"""
+    return _cached_update_sql(table, tuple(changed_columns), row_count, tuple((flag_columns or {}).items()))
+
+
+def update_rows(cursor, table, changed_columns, rows, chunk_size=None, flag_columns=None):
+    """
+    Update the changed columns of rows that all changed the same columns, one statement per chunk.
+    rows: list of (key, {column: value}) where key[0] is the record id.
+    A chunk that fails is retried row by row.
+    Returns (updated, failures): failures is a list of (key, error).
+    """
+    chunk_size = chunk_size or UPDATE_CHUNK_SIZE
+    updated = 0
+    failures = []
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        # Padded with the last row (a repeated WHEN/IN id changes nothing) so the statement stays prepared
+        by_id = padded((key[0], values) for key, values in chunk)
+        try:
+            cursor.execute(update_sql(table, changed_columns, len(by_id), flag_columns),
+                           build_update_params(changed_columns, by_id))
+            updated += len(chunk)
+            continue
+        except Exception as err:
+            if len(chunk) > 1:
+                log.warning("⚠️ Batch update of %s failed (%s), retrying %d row(s) one by one", table, err, len(chunk))
+
+        single_sql = update_sql(table, changed_columns, 1, flag_columns)
+        for key, values in chunk:
+            try:
+                cursor.execute(single_sql, build_update_params(changed_columns, [(key[0], values)]))
+                updated += 1
+            except Exception as err:
+                failures.append((key, err))
+    return updated, failures
+
+
+def diff_rows(columns, update_columns, rows, existing_rows, column_types=None):
+    """
+    Sort rows into new rows and groups of changed rows.
+    Values are compared as the column stores them (see column_types), so e.g. a stored
+    datetime and the same date as a string, or 1 and True, are not a change.
+    Returns (new_rows, changed, unchanged): new_rows keeps the (key, values) tuples,
+    changed maps a tuple of changed columns to its list of (key, {column: value}).
+    """
+    column_types = column_types or {}
+    positions = {c: i for i, c in enumerate(columns)}
+    new_rows, changed, unchanged = [], {}, 0
+    for key, values in rows:
+        current = existing_rows.get(str(key[0]))
+        if current is None:
+            new_rows.append((key, values))
+            continue
+        changed_columns = tuple(c for c in update_columns
+                                if values_differ(column_types.get(c), current.get(c), values[positions[c]]))
+        if not changed_columns:
+            unchanged += 1
+            continue
+        changed.setdefault(changed_columns, []).append(
+            (key, {c: values[positions[c]] for c in changed_columns}))
+    return new_rows, changed, unchanged
+
+
+def row_digest(values):
+    """Short stable digest of the values a remote change may overwrite"""
+    canonical = json.dumps(list(values), separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.blake2b(canonical.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def diff_by_digest(cursor, table, columns, update_columns, rows, column_types):
+    """
+    Diff rows of a table that has a DIGEST_COLUMN.
+    Only `id, sync_digest` is read for the whole batch; rows whose digest matches are unchanged
+    without looking at their columns. The other existing rows (changed, or written before the
+    digest existed) are read and diffed column by column, and get their new digest written.
+    rows must already end with their digest, columns and update_columns with DIGEST_COLUMN.
+    Returns the same as diff_rows.
+    """
+    digests = fetch_existing_rows(cursor, table, [key[0] for key, _values in rows], [DIGEST_COLUMN])
+    same = {str(key[0]) for key, values in rows
+            if str(key[0]) in digests and digests[str(key[0])].get(DIGEST_COLUMN) == values[-1]}
+    to_diff = [(key, values) for key, values in rows if str(key[0]) not in same]
+    stale_ids = [key[0] for key, _values in to_diff if str(key[0]) in digests]
+    existing_rows = fetch_existing_rows(cursor, table, stale_ids, update_columns) if stale_ids else {}
+    new_rows, changed, unchanged = diff_rows(columns, update_columns, to_diff, existing_rows, column_types)
+    return new_rows, changed, unchanged + len(same)
+
+
+def write_upserts(cursor, table, columns, update_columns, pending, result, label, error_key,
+                  flag_columns=None, success_key="success_count"):
+    """
+    Write the rows queued by a handler and report them in its result dict.
+    pending: list of ((record_id, record_number), values); when an id is queued twice the last version wins.
+    The stored rows are read in one query per chunk and diffed (only their digest when the table
+    has a DIGEST_COLUMN, see diff_by_digest): new rows are inserted with
+    multi-row INSERTs, changed rows only get their changed columns updated (grouped by the
+    set of columns that changed) and unchanged rows are not written at all.
+    Inserted and changed rows count as successes, unchanged rows as skipped.
+    When the table is in the id index, the rows it does not know go straight to the INSERT
+    (which still upserts, should the index be behind) and only the others are read.
+    Returns the ids (as strings) of the rows that were rejected.
+    """
+    latest = {}
+    for key, values in pending:
+        latest[str(key[0])] = (key, values)
+    rows = list(latest.values())
+    result["skipped_count"] += len(pending) - len(rows)
+    if not rows:
+        return set()
+
+    column_types = get_column_types(cursor, table)
+    has_digest = DIGEST_COLUMN in column_types
+    if has_digest:
+        positions = [columns.index(c) for c in update_columns]
+        rows = [(key, tuple(values) + (row_digest(values[i] for i in positions),)) for key, values in rows]
+        columns = list(columns) + [DIGEST_COLUMN]
+        update_columns = list(update_columns) + [DIGEST_COLUMN]
+
+    if _spool is not None:
+        _spool.add(table, columns, update_columns, [values for _key, values in rows], flag_columns)
+        result[success_key] += len(rows)
+        result["inserted_count"] = result.get("inserted_count", 0) + len(rows)
+        log.debug("✔ %s: %d row(s) spooled for bulk load", label, len(rows))
+        return set()
+
+    known_new = []
+    if id_index.indexed(table):
+        present = id_index.existing_ids(cursor, table, latest.keys())
+        known_new = [(key, values) for key, values in rows if str(key[0]) not in present]
+        rows = [(key, values) for key, values in rows if str(key[0]) in present]
+
+    if not rows:
+        new_rows, changed, unchanged = [], {}, 0
+    elif has_digest:
+        new_rows, changed, unchanged = diff_by_digest(cursor, table, columns, update_columns, rows, column_types)
+    else:
+        existing_rows = fetch_existing_rows(cursor, table, [key[0] for key, _values in rows], update_columns)
+        new_rows, changed, unchanged = diff_rows(columns, update_columns, rows, existing_rows, column_types)
+    new_rows = known_new + new_rows
+
+    counts, failures = upsert_rows(cursor, table, columns, update_columns, new_rows, flag_columns=flag_columns)
+    rejected = {str(record_id) for (record_id, _n), _err in failures}
+    id_index.add(table, [key[0] for key, _values in new_rows if str(key[0]) not in rejected])
+    counts["unchanged"] += unchanged
+    for changed_columns, changed_rows in changed.items():
+        # Only the digest is new (row written before the digest existed): no data changed
+        digest_only = changed_columns == (DIGEST_COLUMN,)
+        updated, update_failures = update_rows(cursor, table, changed_columns, changed_rows,
+                                               flag_columns=None if digest_only else flag_columns)
+        counts["unchanged" if digest_only else "updated"] += updated
+        failures += update_failures
+
+    result[success_key] += counts["inserted"] + counts["updated"]
+    result["skipped_count"] += counts["unchanged"]
+    result["inserted_count"] = result.get("inserted_count", 0) + counts["inserted"]
+    result["updated_count"] = result.get("updated_count", 0) + counts["updated"]
+    log.debug("✔ %s: %d inserted, %d updated (%d column set(s)), %d unchanged",
+              label, counts["inserted"], counts["updated"], len(changed), counts["unchanged"])
+    log_rejected(label, "upserting", [(record_id, err) for (record_id, _n), err in failures])
+    for (record_id, record_number), err in failures:
+        result["error_count"] += 1
+        result["errors"].append({
+            error_key: record_id,
+            "error": str(err),
+            "record_number": record_number
+        })
+    return {str(record_id) for (record_id, _n), _err in failures}
+
+
+def log_rejected(label, stage, rejected):
+    """One warning per batch for the records rejected at `stage` ((id, error) pairs), one line each at DEBUG"""
+    if not rejected:
+        return
+    if log.isEnabledFor(logging.DEBUG):
+        for record_id, err in rejected:
+            log.debug("❌ Error %s %s ID %s: %s", stage, label, record_id, err)
+    ids = ", ".join(str(record_id) for record_id, _err in rejected[:5]) + (", ..." if len(rejected) > 5 else "")
+    log.warning("❌ %s: %d record(s) rejected while %s (IDs %s), first error: %s",
+                label, len(rejected), stage, ids, rejected[0][1])
+
+
+def log_summary(label, result):
+    """The per-batch line of a handler; the counts also go to the `batch` field of JSON logs"""
+    counts = {k: v for k, v in result.items() if k.endswith("_count") or k.startswith("total_")}
+    log.info("✅ %s: upserted %d, ⏭️ unchanged %d, ⏸️ missing parents %d, ⚠️ errors %d, total %d",
+             label, result.get("success_count", 0), result.get("skipped_count", 0), result.get("parked_count", 0),
+             result.get("error_count", 0), result.get("total_processed", 0),
+             extra={"entity": label, "batch": counts})
+
+
+def upsert_records(conn, records, table, columns, update_columns, map_row, label, error_key,
+                   id_field="id", flag_columns=None, dry_run=False, orphans=None):
+    """
+    Insert or update the remote records of one entity, whether the API listed them as
+    created or updated.
+    - map_row(record) returns the values in `columns` order (raise to reject the record)
+    - update_columns are the columns a remote change may overwrite on an existing row
+    - orphans: OrphanHold of the entity, queuing the records whose parents are missing
+    """
+    result = {
+        "success_count": 0,
+        "skipped_count": 0,
+        "error_count": 0,
+        "errors": [],
+        "total_processed": 0
+    }
+
+    cursor = None
+    savepoint = None
+    try:
+        # Prepared once per connection, reused by every batch
+        cursor = statement_cache(conn)
+        result["total_processed"] = len(records)
+
+        if not records:
+            log.debug("No %s records to process", label)
+            return result
+
+        log.debug("Processing %d %s record(s)...", len(records), label)
+
+        pending = []
+        rejected = []
+        for i, rec in enumerate(records, 1):
+            try:
+                record_id = rec.get(id_field)
+                if not record_id:
+                    raise ValueError(f"Missing required field: {id_field}")
+                pending.append(((record_id, i), map_row(rec)))
+            except Exception as err:
+                rejected.append((rec.get(id_field, "unknown"), err))
+                result["error_count"] += 1
+                result["errors"].append({
+                    error_key: rec.get(id_field, "unknown"),
+                    "error": str(err),
+                    "record_number": i
+                })
+        log_rejected(label, "mapping", rejected)
+
+        if dry_run:
+            result["success_count"] += len(pending)
+            log.info("✔ %d %s record(s) would be upserted (dry run)", len(pending), label)
+            return result
+
+        savepoint = begin_write(conn)
+        if orphans is not None:
+            pending = orphans.hold(cursor, columns, pending, records, result)
+        failed = write_upserts(cursor, table, columns, update_columns, pending, result, label, error_key,
+                               flag_columns=flag_columns)
+        if orphans is not None:
+            orphans.written(cursor, table, {str(key[0]) for key, _values in pending} - failed)
+        end_write(conn, savepoint, len(pending))
+        log_summary(label, result)
+
+    except Exception as err:
+        log.error("💥 Database error while writing %s records: %s", label, err)
+        result["error_count"] += 1
+        result["errors"].append({"type": "Database Error", "error": str(err)})
+        abort_write(conn, savepoint)
+        id_index.invalidate(table)
+    finally:
+        if cursor:
+            cursor.close()
+
+    return result
@@ -0,0 +1,135 @@
+import logging
+import os
+import tempfile
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from batch_writer import upsert_assignments
+
+log = logging.getLogger(__name__)
+
+
+def tsv_field(value):
+    """One field in the default LOAD DATA format (tab separated, backslash escaped, \\N for NULL)"""
+    if value is None:
+        return "\\N"
+    if isinstance(value, bool):
+        return "1" if value else "0"
+    if isinstance(value, (int, float, Decimal, datetime, date, timedelta)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8", "replace")
+    return (str(value).replace("\\", "\\\\").replace("\t", "\\t").replace("\n", "\\n")
+            .replace("\r", "\\r").replace("\0", "\\0"))
+
+
+class SpooledTable:
+    """Rows of one table written to a TSV spool file, waiting to be loaded"""
+
+    def __init__(self, table, columns, update_columns, flag_columns, spool_dir):
+        self.table = table
+        self.columns = list(columns)
+        self.update_columns = list(update_columns)
+        self.flag_columns = flag_columns
+        fd, self.file_path = tempfile.mkstemp(prefix=f"{table}_", suffix=".tsv", dir=spool_dir)
+        self.file = os.fdopen(fd, "w", encoding="utf-8", newline="\n")
+        self.row_count = 0
+
+    def write(self, rows):
+        for values in rows:
+            self.file.write("\t".join(tsv_field(v) for v in values) + "\n")
+        self.row_count += len(rows)
+
+
+class BulkLoader:
+    """
+    Bulk-load mode used for the first (full) sync of a new SLC box.
+
+    While it is active (see batch_writer.spool_to) the push_data handlers map records as
+    usual but their rows are appended to one TSV spool file per table instead of being
+    written. merge() then, per table and in the order they were first spooled:
+    - LOAD DATA LOCAL INFILE the spool into an index-less temporary staging table
+    - merge it into the real table with one INSERT ... SELECT ... ON DUPLICATE KEY UPDATE
+      (the staging rows are merged in spool order, so the last version of a record wins)
+    Foreign-key checks are off for the merge: the rows come from the server, which already
+    enforced them, and the tables are filled in an order that would not always satisfy the
+    foreign keys. Unique checks stay on: the spool holds several versions of a record on
+    purpose and ON DUPLICATE KEY has to see every unique key (e.g. attendance
+    (user_id, calander_id)) for the last version to win. The attendance triggers only fire on UPDATE/DELETE,
+    so the INSERTs of an empty table do not produce audit rows.
+    The connection must be opened with allow_local_infile=True.
+    """
+
+    def __init__(self, conn, spool_dir=None):
+        self.conn = conn
+        if spool_dir:
+            os.makedirs(spool_dir, exist_ok=True)
+        self.spool_dir = spool_dir
+        self.tables = {}
+
+    def add(self, table, columns, update_columns, rows, flag_columns=None):
+        spooled = self.tables.get(table)
+        if spooled is None:
+            spooled = self.tables[table] = SpooledTable(table, columns, update_columns, flag_columns,
+                                                        self.spool_dir)
+        elif list(columns) != spooled.columns:
+            raise ValueError(f"Columns of {table} changed while spooling")
+        spooled.write(rows)
+
+    def merge(self):
+        """Load and merge every spooled table; returns {table: rows merged}"""
+        merged = {}
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute("SET SESSION foreign_key_checks = 0")
+            for table, spooled in self.tables.items():
+                spooled.file.close()
+                if spooled.row_count:
+                    merged[table] = self._merge_table(cursor, spooled)
+            self.conn.commit()
+        except Exception:
+            try:
+                self.conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            try:
+                cursor.execute("SET SESSION foreign_key_checks = 1")
+            except Exception:
+                pass
+            cursor.close()
+            self.discard()
+        return merged
+
+    def _merge_table(self, cursor, spooled):
+        table, columns = spooled.table, spooled.columns
+        stage = f"_stage_{table}"
+        column_list = ", ".join(f"`{c}`" for c in columns)
+        log.info("Bulk loading %d %s row(s)...", spooled.row_count, table)
+
+        cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS `{stage}`")
+        # Same column types as the real table, but no keys to maintain while loading
+        cursor.execute(f"CREATE TEMPORARY TABLE `{stage}` SELECT {column_list} FROM `{table}` LIMIT 0")
+        cursor.execute(f"ALTER TABLE `{stage}` ADD COLUMN `_seq` INT UNSIGNED NOT NULL AUTO_INCREMENT PRIMARY KEY")
+        try:
+            cursor.execute(
+                f"LOAD DATA LOCAL INFILE %s INTO TABLE `{stage}` CHARACTER SET utf8mb4 "
+                f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' LINES TERMINATED BY '\\n' ({column_list})",
+                (spooled.file_path,))
+            cursor.execute(
+                f"INSERT INTO `{table}` ({column_list}) SELECT {column_list} FROM `{stage}` ORDER BY `_seq` "
+                f"ON DUPLICATE KEY UPDATE {upsert_assignments(spooled.update_columns, spooled.flag_columns)}")
+        finally:
+            cursor.execute(f"DROP TEMPORARY TABLE IF EXISTS `{stage}`")
+        return spooled.row_count
+
+    def discard(self):
+        """Close and delete the spool files"""
+        for spooled in self.tables.values():
+            try:
+                spooled.file.close()
+                os.remove(spooled.file_path)
+            except OSError:
+                pass
+        self.tables = {}
@@ -0,0 +1,205 @@
+import json
+import logging
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal, InvalidOperation
+
+# Column types of each table, read once per process from information_schema
+_column_types = {}
+
+log = logging.getLogger(__name__)
+
+INTEGER_TYPES = {"tinyint", "smallint", "mediumint", "int", "integer", "bigint", "bit", "year"}
+DECIMAL_TYPES = {"decimal", "numeric"}
+FLOAT_TYPES = {"float", "double", "real"}
+DATETIME_TYPES = {"datetime", "timestamp"}
+
+
+class ColumnType:
+    """What the diff needs to know about a column: its kind and, for numbers and datetimes, its scale"""
+
+    def __init__(self, kind, scale=None):
+        self.kind = kind
+        self.scale = scale
+
+    def __repr__(self):
+        return f"ColumnType({self.kind!r}, {self.scale!r})"
+
+
+def _kind(data_type, comment, is_json):
+    data_type = (data_type or "").lower()
+    if data_type in INTEGER_TYPES:
+        return "int"
+    if data_type in DECIMAL_TYPES:
+        return "decimal"
+    if data_type in FLOAT_TYPES:
+        return "float"
+    if data_type in DATETIME_TYPES:
+        return "datetime"
+    if data_type in ("date", "time"):
+        return data_type
+    # MariaDB stores JSON as LONGTEXT with a json_valid() check (Doctrine also tags it in the comment)
+    if data_type == "json" or is_json or "dc2type:json" in (comment or "").lower():
+        return "json"
+    return "text"
+
+
+def _value(row, key, index):
+    return row[key] if isinstance(row, dict) else row[index]
+
+
+def get_column_types(cursor, table):
+    """
+    Return {column: ColumnType} for `table`, from information_schema (cached per table).
+    If the schema cannot be read an empty dict is returned and values are compared by
+    the type of the stored value instead.
+    """
+    if table in _column_types:
+        return _column_types[table]
+
+    types = {}
+    try:
+        json_columns = set()
+        try:
+            cursor.execute(
+                "SELECT CHECK_CLAUSE FROM information_schema.CHECK_CONSTRAINTS "
+                "WHERE CONSTRAINT_SCHEMA = DATABASE() AND TABLE_NAME = %s", (table,))
+            for row in cursor.fetchall():
+                clause = str(_value(row, "CHECK_CLAUSE", 0))
+                if clause.lower().startswith("json_valid("):
+                    json_columns.add(clause[len("json_valid("):].strip("`) "))
+        except Exception:
+            # MySQL < 8.0.16 has no CHECK_CONSTRAINTS (and a real JSON type instead)
+            pass
+
+        cursor.execute(
+            "SELECT COLUMN_NAME, DATA_TYPE, NUMERIC_SCALE, DATETIME_PRECISION, COLUMN_COMMENT "
+            "FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            (table,))
+        for row in cursor.fetchall():
+            name = _value(row, "COLUMN_NAME", 0)
+            kind = _kind(_value(row, "DATA_TYPE", 1), _value(row, "COLUMN_COMMENT", 4), name in json_columns)
+            if kind == "decimal":
+                scale = _value(row, "NUMERIC_SCALE", 2)
+            elif kind in ("datetime", "time"):
+                scale = _value(row, "DATETIME_PRECISION", 3)
+            else:
+                scale = None
+            types[name] = ColumnType(kind, int(scale) if scale is not None else None)
+    except Exception as err:
+        log.warning("⚠️ Could not read column types of %s, comparing by stored value type: %s", table, err)
+        types = {}
+
+    _column_types[table] = types
+    return types
+
+
+def _kind_of_value(value):
+    """Column kind guessed from a value read from the database"""
+    if isinstance(value, int):
+        return "int"
+    if isinstance(value, Decimal):
+        return "decimal"
+    if isinstance(value, float):
+        return "float"
+    if isinstance(value, datetime):
+        return "datetime"
+    if isinstance(value, date):
+        return "date"
+    if isinstance(value, timedelta):
+        return "time"
+    return "text"
+
+
+def _parse_datetime(value):
+    if isinstance(value, datetime):
+        return value
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day)
+    text = str(value).strip()
+    if text.endswith("Z"):
+        text = text[:-1] + "+00:00"
+    return datetime.fromisoformat(text.replace(" ", "T", 1))
+
+
+def _to_int(value):
+    if isinstance(value, (bool, int)):
+        return int(value)
+    if isinstance(value, (float, Decimal)):
+        return int(value) if value == int(value) else value
+    text = str(value).strip()
+    if text.lower() in ("true", "false"):
+        return 1 if text.lower() == "true" else 0
+    number = Decimal(text)
+    return int(number) if number == int(number) else number
+
+
+def _to_decimal(value, scale):
+    if isinstance(value, float):
+        value = repr(value)
+    number = Decimal(str(value).strip()) if not isinstance(value, bool) else Decimal(int(value))
+    if scale is not None:
+        number = number.quantize(Decimal(1).scaleb(-scale))
+    return number
+
+
+def _to_time(value, scale):
+    if isinstance(value, timedelta):
+        delta = value
+    elif isinstance(value, time):
+        delta = timedelta(hours=value.hour, minutes=value.minute, seconds=value.second,
+                          microseconds=value.microsecond)
+    else:
+        text = str(value).strip()
+        negative = text.startswith("-")
+        parts = text.lstrip("-").split(":")
+        hours, minutes = int(parts[0]), int(parts[1]) if len(parts) > 1 else 0
+        seconds = float(parts[2]) if len(parts) > 2 else 0
+        delta = timedelta(hours=hours, minutes=minutes, seconds=seconds)
+        if negative:
+            delta = -delta
+    if not scale:
+        delta = timedelta(seconds=int(delta.total_seconds()))
+    return delta
+
+
+def normalize(column_type, value, stored=None):
+    """
+    Value in the form the column would store it, so an incoming value and a stored one
+    can be compared with ==. `stored` (the value read back) is used to guess the column
+    kind when the schema is unknown. Values that cannot be converted are returned as text.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8", "replace")
+    kind = column_type.kind if column_type else _kind_of_value(stored)
+    scale = column_type.scale if column_type else None
+    try:
+        if kind == "int":
+            return _to_int(value)
+        if kind == "decimal":
+            return _to_decimal(value, scale)
+        if kind == "float":
+            return float(value)
+        if kind == "datetime":
+            parsed = _parse_datetime(value).replace(tzinfo=None)
+            return parsed if scale else parsed.replace(microsecond=0)
+        if kind == "date":
+            parsed = value if isinstance(value, date) and not isinstance(value, datetime) \
+                else _parse_datetime(value).date()
+            return parsed
+        if kind == "time":
+            return _to_time(value, scale)
+        if kind == "json":
+            decoded = json.loads(value) if isinstance(value, str) else value
+            return json.dumps(decoded, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    except (ValueError, TypeError, ArithmeticError, InvalidOperation):
+        pass
+    return str(value)
+
+
+def values_differ(column_type, stored, incoming):
+    """True when writing `incoming` would really change the `stored` value"""
+    if stored is None or incoming is None:
+        return stored is not incoming
+    return normalize(column_type, stored, stored) != normalize(column_type, incoming, stored)
@@ -1,12 +1,27 @@
+import logging
+import re
 from datetime import datetime,timedelta
+from functools import lru_cache
 
+# Distinct date strings remembered by format_date (createdAt/timestamp values repeat a lot in a batch)
+DATE_CACHE_SIZE = 4096
+MYSQL_DATETIME = re.compile(r"\d{4}-\d\d-\d\d \d\d:\d\d:\d\d")
+ISO_DATETIME = re.compile(r"\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d(?:\.\d{1,6})?(?:Z|[+-]\d\d:\d\d)?")
 
+# Smallest padded length of an IN list / CASE (see bucket_size)
+MIN_BUCKET = 8
 
-def format_date(date_str):
-    """Format date string to MySQL datetime format"""
-    if not date_str:
-        return None  # Let MySQL handle default values
+log = logging.getLogger(__name__)
+
+
+def _parse_date(date_str):
+    """Format date string to MySQL datetime format (uncached)"""
     try:
+        if MYSQL_DATETIME.fullmatch(date_str) or ISO_DATETIME.fullmatch(date_str):
+            # Fixed layouts: slice the fields out, datetime() only checks their ranges
+            datetime(int(date_str[0:4]), int(date_str[5:7]), int(date_str[8:10]),
+                     int(date_str[11:13]), int(date_str[14:16]), int(date_str[17:19]))
+            return f"{date_str[:10]} {date_str[11:19]}"
         if 'T' in date_str:
             # Handle ISO format with timezone
             return datetime.fromisoformat(date_str.replace('Z', '+00:00')).strftime("%Y-%m-%d %H:%M:%S")
@@ -14,10 +29,96 @@ def format_date(date_str):
             # Handle already formatted datetime
             return datetime.strptime(date_str, "%Y-%m-%d %H:%M:%S").strftime("%Y-%m-%d %H:%M:%S")
     except (ValueError, TypeError) as e:
-        print(f"Warning: Invalid date format '{date_str}', using NULL: {e}")
+        log.warning("Invalid date format '%s', using NULL: %s", date_str, e)
         return None
 
 
+_cached_parse_date = lru_cache(maxsize=DATE_CACHE_SIZE)(_parse_date)
+
+
+def format_date(date_str):
+    """Format date string to MySQL datetime format"""
+    if not date_str:
+        return None  # Let MySQL handle default values
+    if isinstance(date_str, str):
+        return _cached_parse_date(date_str)
+    return _parse_date(date_str)
+
+
+def format_dates(values):
+    """format_date of a whole column (e.g. the createdAt of a chunk): each distinct value is converted once"""
+    converted = {}
+    result = []
+    for value in values:
+        if not isinstance(value, str):
+            result.append(format_date(value))
+            continue
+        formatted = converted.get(value, converted)
+        if formatted is converted:
+            formatted = converted[value] = format_date(value)
+        result.append(formatted)
+    return result
+
+
+def bucket_size(count):
+    """
+    Length to pad a list of `count` parameters to (next power of two, at least MIN_BUCKET):
+    statements built for variable-length batches then only take a few texts, which stay prepared
+    (see statement_cache).
+    """
+    if count <= 1:
+        return count
+    size = MIN_BUCKET
+    while size < count:
+        size *= 2
+    return size
+
+
+def padded(values, size=None):
+    """values repeated from its last item up to bucket_size (for IN lists, where duplicates do not matter)"""
+    values = list(values)
+    size = size or bucket_size(len(values))
+    return values + values[-1:] * (size - len(values)) if values else values
+
+
+def fetch_existing_ids(cursor, table, ids, column="id", batch_size=1000):
+    """
+    Return the set of ids (as strings) that already exist in `table`.
+    One `WHERE id IN (...)` query per batch_size ids instead of one SELECT per record.
+    """
+    wanted = list(dict.fromkeys(str(i) for i in ids if i is not None and i != ""))
+    existing = set()
+    for start in range(0, len(wanted), batch_size):
+        # Padded to a few lengths so the statement stays prepared (statement_cache)
+        batch = padded(wanted[start:start + batch_size])
+        placeholders = ", ".join(["%s"] * len(batch))
+        cursor.execute(f"SELECT `{column}` FROM `{table}` WHERE `{column}` IN ({placeholders})", batch)
+        for row in cursor.fetchall():
+            value = row[column] if isinstance(row, dict) else row[0]
+            existing.add(str(value))
+    return existing
+
+
+def fetch_existing_rows(cursor, table, ids, columns, column="id", batch_size=1000):
+    """
+    Return {id (as string): {column: value}} for the rows of `table` that already exist,
+    reading only `columns`, with one `WHERE id IN (...)` query per batch_size ids.
+    """
+    wanted = list(dict.fromkeys(str(i) for i in ids if i is not None and i != ""))
+    selected = [column] + [c for c in columns if c != column]
+    column_list = ", ".join(f"`{c}`" for c in selected)
+    existing = {}
+    for start in range(0, len(wanted), batch_size):
+        batch = padded(wanted[start:start + batch_size])
+        placeholders = ", ".join(["%s"] * len(batch))
+        cursor.execute(f"SELECT {column_list} FROM `{table}` WHERE `{column}` IN ({placeholders})", batch)
+        for row in cursor.fetchall():
+            if not isinstance(row, dict):
+                row = dict(zip(selected, row))
+            existing[str(row[column])] = row
+    return existing
+
+
 def get_slc_mac(conn,account_id):
     try:
         cursor = conn.cursor(dictionary=True)
@@ -34,5 +135,5 @@ def get_slc_mac(conn,account_id):
         cursor.close()
         return result
     except Exception as err:
-        print(f"DEBUG: error is coming from get_slc_mac {err}")
+        log.warning("Error while reading the SLC mac of account %s: %s", account_id, err)
         return None
\ No newline at end of file
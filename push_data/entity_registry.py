@@ -0,0 +1,438 @@
+import importlib
+import json
+import logging
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from common_function import format_date
+from batch_writer import upsert_records
+from statement_cache import statement_cache
+from orphan_queue import OrphanHold, take_parked
+
+log = logging.getLogger(__name__)
+
+
+def to_flag(value):
+    """1/0 for a boolean-ish API value"""
+    return 1 if value else 0
+
+
+def optional_flag(value):
+    """1/0 for a boolean flag, None when the API did not send it"""
+    return None if value is None else (1 if value else 0)
+
+
+def json_list(value):
+    """JSON text of a list field (an empty list when missing)"""
+    return json.dumps(value) if value else json.dumps([])
+
+
+# Converters the row compiler writes inline instead of calling
+INLINE_CONVERTERS = {
+    to_flag: "(1 if {} else 0)",
+}
+
+_MISSING = object()
+
+
+class Field:
+    """
+    One column of an entity.
+    - source: API key the value is read from (None for a constant column)
+    - default: value used when the API did not send the key
+    - convert: callable applied to the value (e.g. format_date, to_flag)
+    - value: constant written for a column the API does not provide
+    """
+
+    def __init__(self, column, source=None, default=None, convert=None, value=_MISSING):
+        self.column = column
+        self.source = source
+        self.default = default
+        self.convert = convert
+        self.value = None if value is _MISSING else value
+
+    @property
+    def is_constant(self):
+        return self.source is None
+
+
+def const(column, value=None):
+    """Column the API does not send, always written as `value` on insert"""
+    return Field(column, value=value)
+
+
+class Entity:
+    """
+    Declarative description of a synced entity and its compiled writer.
+    - fields: Field list in table column order, the first one being the primary key
+    - update_columns: columns a remote change overwrites (default: every column but the key)
+    - id_field: API key of the record id
+    - references: {column: parent entity} of the foreign keys; a record whose parent row is
+      missing is written and queued, to be written again once the parent arrives (see orphan_queue.py)
+    - parents: entities whose rows this one references (written first), the referenced ones by default
+    - flag_columns: {column: int} set when a remote change really modifies the row (e.g. is_sync)
+    - section: key of the get-whats-news section the records come from
+    - writer: (module, function) of the handler writing the records of this entity when they
+      carry more than its own row (e.g. a local and its rooms); used to reapply queued records
+    """
+
+    def __init__(self, name, table, fields, label, error_key, update_columns=None, id_field="id",
+                 references=None, parents=None, flag_columns=None, section=None, writer=None):
+        self.name = name
+        self.section = section
+        self.table = table
+        self.fields = fields
+        self.label = label
+        self.error_key = error_key
+        self.columns = tuple(f.column for f in fields)
+        self.update_columns = tuple(update_columns) if update_columns is not None else self.columns[1:]
+        self.id_field = id_field
+        self.references = dict(references or {})
+        self.parents = tuple(parents) if parents is not None else tuple(dict.fromkeys(self.references.values()))
+        self.flag_columns = flag_columns
+        self.writer = writer
+        self.row_source, self.build_row = self._compile()
+
+    def _compile(self):
+        """
+        Generate the row builder of this entity: one function returning the column tuple
+        straight from record lookups, without a per-field loop or per-field lookups of
+        the mapping at run time.
+        """
+        namespace = {}
+        parts = []
+        for i, field in enumerate(self.fields):
+            if field.is_constant:
+                namespace[f"_k{i}"] = field.value
+                parts.append(f"_k{i}")
+                continue
+            if field.default is None:
+                expr = f"rec.get({field.source!r})"
+            else:
+                namespace[f"_d{i}"] = field.default
+                expr = f"rec.get({field.source!r}, _d{i})"
+            if field.convert in INLINE_CONVERTERS:
+                expr = INLINE_CONVERTERS[field.convert].format(expr)
+            elif field.convert is not None:
+                namespace[f"_c{i}"] = field.convert
+                expr = f"_c{i}({expr})"
+            parts.append(expr)
+        source = (f"def build_{self.name}(rec):\n    return (\n"
+                  + "".join(f"        {p},\n" for p in parts) + "    )\n")
+        exec(compile(source, f"<entity {self.name}>", "exec"), namespace)
+        return source, namespace[f"build_{self.name}"]
+
+    def records(self, data):
+        """Created and updated records of an API section alike"""
+        return (data.get("created", []) or []) + (data.get("updated", []) or [])
+
+    def reference_tables(self):
+        """{column: parent table} of the references"""
+        return {column: ENTITIES[parent].table for column, parent in self.references.items()}
+
+    def write(self, conn, records, hold_orphans=True):
+        """Write raw records of this entity through its writer (its own upsert by default)"""
+        if self.writer is None:
+            return self.upsert(conn, records, hold_orphans=hold_orphans)
+        module, function = self.writer
+        return getattr(importlib.import_module(module), function)(conn, {"updated": records},
+                                                                   hold_orphans=hold_orphans)
+
+    def upsert(self, conn, records, dry_run=False, hold_orphans=True):
+        orphans = OrphanHold(self.name, self.reference_tables() if hold_orphans else {})
+        return upsert_records(conn, records, self.table, self.columns, self.update_columns, self.build_row,
+                              self.label, self.error_key, id_field=self.id_field,
+                              flag_columns=self.flag_columns, dry_run=dry_run, orphans=orphans)
+
+
+def date_field(column, source):
+    return Field(column, source, convert=format_date)
+
+
+def flag_field(column, source, default=False):
+    return Field(column, source, default=default, convert=to_flag)
+
+
+CREATED_AT = date_field("created_at", "createdAt")
+UPDATED_AT = date_field("updated_at", "updatedAt")
+TIMESTAMP = date_field("timestamp", "timestamp")
+
+
+def tokens():
+    return [flag_field("releaseToken", "releaseToken"), Field("useToken", "useToken")]
+
+
+ENTITIES = {}
+
+
+def register(entity):
+    ENTITIES[entity.name] = entity
+    return entity
+
+
+def get_entity(name):
+    return ENTITIES[name]
+
+
+def dependency_order():
+    """Entity names with every entity after its parents"""
+    ordered, seen = [], set()
+
+    def visit(name):
+        if name in seen:
+            return
+        seen.add(name)
+        for parent in ENTITIES[name].parents:
+            if parent in ENTITIES:
+                visit(parent)
+        ordered.append(name)
+
+    for name in ENTITIES:
+        visit(name)
+    return ordered
+
+
+def section_dependencies():
+    """{payload section: sections holding the parents of its entities} (a section never depends on itself)"""
+    dependencies = {}
+    for entity in ENTITIES.values():
+        parents = dependencies.setdefault(entity.section, set())
+        for parent in entity.parents:
+            section = ENTITIES[parent].section if parent in ENTITIES else None
+            if section and section != entity.section:
+                parents.add(section)
+    return dependencies
+
+
+def reapply_orphans(conn):
+    """
+    Write again the queued records whose parents landed since the last call, parents before
+    children, in bulk through their entity (records still missing a parent stay queued).
+    Records queued for more than ORPHAN_MAX_AGE_HOURS are written a last time and dropped.
+    Returns {entity name: [upsert results]}.
+    """
+    results = {}
+    entity_tables = {name: set(e.reference_tables().values()) for name, e in ENTITIES.items() if e.references}
+    # A parent written from the queue can release its own children: retry until nothing lands
+    for _round in range(len(ENTITIES)):
+        parked = take_parked(statement_cache(conn), entity_tables)
+        if not parked:
+            break
+        written = 0
+        for name in dependency_order():
+            if name not in parked:
+                continue
+            records, expired = parked[name]
+            log.info("--- Reapplying %d queued %s record(s) ---", len(records) + len(expired), ENTITIES[name].label)
+            for batch, hold in ((records, True), (expired, False)):
+                if batch:
+                    result = ENTITIES[name].write(conn, batch, hold_orphans=hold)
+                    written += sum(v for k, v in result.items() if k.endswith("success_count"))
+                    written += result["skipped_count"]
+                    results.setdefault(name, []).append(result)
+        if not written:
+            break
+    return results
+
+
+register(Entity("account", "account", [
+    Field("id", "id"), Field("name", "name", ""), Field("file_link", "image", ""),
+    Field("status", "status", True),
+    CREATED_AT, UPDATED_AT, TIMESTAMP,
+], "Account", "account_id", section="account"))
+
+register(Entity("user", "user", [
+    Field("id", "userId"),
+    const("account_id"),
+    Field("username", "username", ""), Field("email", "email", ""), Field("full_name", "fullName"),
+    Field("roles", "roles", convert=json_list),
+    Field("img_link", "image"),
+    const("reset_token"),
+    flag_field("status", "status"),
+    const("created_by", 0),
+    const("password", "TEMP_PASSWORD_NEEDS_RESET"),
+    const("birth_date"), const("birth_place"),
+    Field("phone", "phone"), Field("address", "address"), Field("grand", "grand"),
+    const("access_type"), const("access_type_date"),
+    flag_field("enabled", "enabled", True),
+    CREATED_AT, TIMESTAMP, UPDATED_AT,
+    Field("uuid", "uuid"),
+    const("facebook_id"), const("google_id"), const("mastodon_access_token"),
+    const("general_notification", 1), const("message_notification", 1), const("calendar_notification", 1),
+    const("sms_notification", 1), const("login_notification", 1),
+    const("horsline", 0),
+    const("ref_slc"), const("apple_id"), const("open_source_user_name"), const("rocket_chat_user_id"),
+    const("fcm_web"), const("fcm_android"), const("fcm_ios"),
+    *tokens(),
+], "User", "user_id", section="user", id_field="userId",
+    # Only the profile fields come from the API; local fields (password, notifications...) are kept
+    update_columns=["uuid", "username", "full_name", "email", "phone", "address", "roles"]))
+
+register(Entity("slc", "slc", [
+    Field("id", "id"), Field("uuid", "uuid"), Field("username", "username"),
+    Field("slc_username", "slc_username"), Field("slc_password", "slc_password"),
+    # The SLC endpoint already sends MySQL datetimes
+    Field("timestamp", "timestamp"), Field("created_at", "createdAt"), Field("updated_at", "updatedAt"),
+], "SLC", "slc_id", section="slc"))
+
+register(Entity("tablet", "tablet", [
+    Field("id", "id"), Field("slc_id", "slcId"), Field("room_id", "roomId"), Field("name", "name", ""),
+    Field("mac_id", "mac_id", ""), Field("password", "password", ""), Field("status", "status", "Active"),
+    flag_field("enabled", "enabled", True),
+    TIMESTAMP, CREATED_AT, UPDATED_AT,
+], "Tablet", "tablet_id", section="slcTablet",
+    references={"slc_id": "slc", "room_id": "room"}, flag_columns={"is_sync": 1}))
+
+register(Entity("camera", "camera", [
+    Field("id", "id"), Field("slc_id", "slcId"), Field("room_id", "roomId"), Field("name", "name", ""),
+    Field("mac_id", "mac_id", ""), Field("username", "username", ""), Field("password", "password", ""),
+    Field("type", "type", "webcam"), Field("status", "status", "Active"),
+    flag_field("enabled", "enabled", True),
+    TIMESTAMP, CREATED_AT, UPDATED_AT,
+], "Camera", "camera_id", section="slcCamera",
+    references={"slc_id": "slc", "room_id": "room"}, flag_columns={"is_sync": 1}))
+
+register(Entity("subject", "subject_config", [
+    Field("id", "id"), Field("name", "name", ""),
+    flag_field("status", "status", True),
+    Field("description", "description", ""),
+    flag_field("enabled", "enabled", True),
+    CREATED_AT, UPDATED_AT, TIMESTAMP,
+    *tokens(),
+], "Subject", "subject_id", section="subject",
+    # created_at is only written when the subject is inserted
+    update_columns=["name", "status", "description", "enabled", "releaseToken", "useToken", "timestamp",
+                    "updated_at"]))
+
+register(Entity("account_subject", "account_subject", [
+    Field("id", "id"), Field("account_id", "accountId"), Field("subject_config_id", "subjectConfigId"),
+    Field("other_subject", "otherSubject"),
+    flag_field("status", "status", True),
+    Field("description", "description", ""),
+    flag_field("enabled", "enabled", True),
+    CREATED_AT, UPDATED_AT, TIMESTAMP,
+    *tokens(),
+], "account_subject", "account_subject_id", section="accountSubject",
+    references={"account_id": "account", "subject_config_id": "subject"},
+    # created_at is only written when the record is inserted
+    update_columns=["account_id", "subject_config_id", "other_subject", "status", "description", "enabled",
+                    "releaseToken", "useToken", "updated_at", "timestamp"]))
+
+register(Entity("local", "local", [
+    Field("id", "id"), Field("account_id", "accountId"), Field("name", "name", ""),
+    Field("address", "address", ""), Field("gps", "gps", ""),
+    flag_field("status", "status", True),
+    flag_field("enabled", "enabled", True),
+    flag_field("default_local", "default"),
+    CREATED_AT, UPDATED_AT,
+], "Local", "local_id", section="local_with_room",
+    references={"account_id": "account"}, writer=("handle_room_data", "upsert_room_data"),
+    update_columns=["account_id", "name", "address", "gps", "status", "enabled", "default_local", "updated_at"]))
+
+register(Entity("room", "room", [
+    Field("id", "id"), Field("local_id", "localId"), Field("name", "name", ""), Field("capacity", "capacity", ""),
+    CREATED_AT, UPDATED_AT,
+], "Room", "room_id", section="local_with_room",
+    references={"local_id": "local"},
+    update_columns=["local_id", "name", "capacity", "updated_at"]))
+
+register(Entity("slc_local", "slc_local", [
+    Field("id", "id"), Field("slc_id", "slcId"), Field("account_id", "accountId"), Field("local_id", "localId"),
+    flag_field("enabled", "enabled"),
+    TIMESTAMP, CREATED_AT, UPDATED_AT,
+], "slc_local", "slc_local_id", section="slcLocal",
+    references={"slc_id": "slc", "account_id": "account", "local_id": "local"}))
+
+register(Entity("session", "session", [
+    Field("id", "id"), Field("account_id", "accountId"), Field("formation_id", "formationId"),
+    Field("name", "name", ""), Field("description", "description"),
+    flag_field("status", "status", True),
+    Field("img_link", "image"),
+    date_field("start_date", "startDate"), date_field("end_date", "endDate"),
+    Field("capacity", "capacity", 0), Field("price", "price", 0), Field("currency", "currency"),
+    Field("type_pay", "typePay"),
+    flag_field("request_change_group", "requestChangeGroup"),
+    Field("max_group_change", "maxGroupChange", 0),
+    const("payment_methode"), const("number_session_for_pay"), const("price_student_absent"),
+    const("user_register_after_start", 1),
+    const("public_resource"),
+    flag_field("enabled", "enabled", True),
+    CREATED_AT, TIMESTAMP, UPDATED_AT,
+    Field("uuid", "uuid"),
+    const("price_presence"), const("price_online"),
+    flag_field("special_group", "specialGroup"),
+    const("passage"), const("season_id"),
+    *tokens(),
+], "Session", "session_id", section="session",
+    references={"account_id": "account"}))
+
+register(Entity("group", "relation_group_local_session", [
+    Field("id", "id"), Field("session_id", "sessionId"), Field("local_id", "localId"),
+    Field("account_id", "accountId"), Field("name", "name", ""), Field("capacity", "capacity"),
+    flag_field("status", "status", True),
+    flag_field("enabled", "enabled", True),
+    Field("special_group", "special_group", convert=optional_flag),
+    Field("access_type", "access_type", convert=optional_flag),
+    *tokens(),
+    CREATED_AT, UPDATED_AT, TIMESTAMP,
+], "Group", "group_id", section="group",
+    references={"session_id": "session", "local_id": "local", "account_id": "account"},
+    flag_columns={"is_sync": 1}))
+
+register(Entity("relation_user_session", "relation_user_session", [
+    Field("id", "id"), Field("user_id", "userId"), Field("session_id", "sessionId"),
+    Field("relation_group_local_session_id", "relationGroup"), Field("ref", "ref"),
+    flag_field("enabled", "enabled", True),
+    CREATED_AT, TIMESTAMP, UPDATED_AT,
+    *tokens(),
+], "Relation_user_session", "relation_id", section="relationUserSession",
+    references={"user_id": "user", "session_id": "session", "relation_group_local_session_id": "group"}))
+
+register(Entity("relation_teacher_subject", "relation_teacher_to_subject_group", [
+    Field("id", "id"), Field("relation_group_local_session_id", "groupId"), Field("subject_id", "subjectId"),
+    Field("user_id", "teacherId"),
+    flag_field("enabled", "enabled", True),
+    CREATED_AT, TIMESTAMP, UPDATED_AT,
+    *tokens(),
+], "teacher-subject relation", "relation_id", section="relationTeacherAndSubjectData",
+    references={"relation_group_local_session_id": "group", "subject_id": "subject", "user_id": "user"}))
+
+register(Entity("calendar", "relation_calander_group_session", [
+    Field("id", "id"), Field("session_id", "sessionId"), Field("account_id", "accountId"),
+    Field("local_id", "localId"), Field("group_session_id", "groupId"), Field("room_id", "roomId"),
+    Field("teacher_id", "teacherId"), Field("subject_id", "subjectId"), Field("color", "color"),
+    flag_field("status", "status", True),
+    Field("description", "description"),
+    date_field("start_time", "start_time"), date_field("end_time", "end_time"),
+    Field("ref", "ref"), date_field("date", "date"),
+    flag_field("refresh", "refresh"),
+    Field("title", "title", ""),
+    flag_field("enabled", "enabled", True),
+    CREATED_AT, TIMESTAMP, UPDATED_AT,
+    Field("type", "type"),
+    flag_field("teacher_present", "teacher_present"),
+    flag_field("force_teacher_present", "force_teacher_present"),
+    *tokens(),
+], "Calendar", "calendar_id", section="calendar",
+    references={"session_id": "session", "account_id": "account", "local_id": "local", "group_session_id": "group",
+                "room_id": "room", "teacher_id": "user", "subject_id": "subject"}))
+
+register(Entity("attendance", "attendance", [
+    Field("id", "id"), Field("user_id", "userId"), Field("account_id", "accountId"),
+    Field("session_id", "sessionId"), Field("group_session_id", "groupId"),
+    flag_field("is_present", "present"),
+    date_field("day", "day"), Field("note", "note"),
+    flag_field("is_editable", "editable", True),
+    flag_field("enabled", "enabled", True),
+    CREATED_AT, UPDATED_AT, TIMESTAMP,
+    *tokens(),
+    Field("calander_id", "calenderId"),
+    const("slc_edit", 0),
+], "Attendance", "attendance_id", section="attendance",
+    references={"user_id": "user", "account_id": "account", "session_id": "session", "group_session_id": "group",
+                "calander_id": "calendar"},
+    writer=("handle_attendance_data", "upsert_attendance"),
+    # created_at, tokens and calendar are only written when the attendance is inserted; a remote
+    # change clears slc_edit so the audit trigger does not send it back as a tablet edit
+    update_columns=["user_id", "account_id", "session_id", "group_session_id", "is_present", "day", "note",
+                    "is_editable", "enabled", "updated_at", "timestamp", "slc_edit"]))
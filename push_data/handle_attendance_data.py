@@ -1,193 +1,233 @@
+import json
+import logging
 import os
 import sys
+from datetime import datetime
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from common_function import format_date  # Ensure this exists
+from batch_writer import spooling
+from common_function import format_date
+from statement_cache import statement_cache
+from transactions import abort_write, begin_write, end_write
+from entity_registry import get_entity
+import id_index
 
+#file of the configuration
+with open("config.json", "r") as f:
+    config = json.load(f)
 
-def insert_attendance(conn, attendance_data):
-    """
-    Insert attendance records into the 'attendance' table.
-    - Skips insert if ID already exists locally.
-    """
-    result = {"success_count":0, "skipped_count":0, "error_count":0, "errors":[], "total_processed":0}
-    cursor = None
-    try:
-        cursor = conn.cursor(dictionary=True)
-        created_attendance = attendance_data.get("created", []) or []
-        result["total_processed"] = len(created_attendance)
-
-        if not created_attendance:
-            print("No attendance records to insert")
-            return result
-
-        print(f"Processing {len(created_attendance)} attendance record(s)...")
-
-        for i, rec in enumerate(created_attendance, 1):
-            try:
-                attendance_id = rec.get("id")
-                if not attendance_id:
-                    raise ValueError("Missing required field: id")
-
-                # Skip if attendance already exists
-                # cursor.execute("SELECT id FROM attendance WHERE id=%s", (attendance_id,))
-                # if cursor.fetchone():
-                #     print(f"⏭️ Attendance ID {attendance_id} already exists — skipping insert.")
-                #     result["skipped_count"] += 1
-                #     continue
-
-                # Map fields safely
-                data = {
-                    "user_id": rec.get("userId"),
-                    "account_id": rec.get("accountId"),
-                    "calander_id": rec.get("calenderId"),
-                    "session_id": rec.get("sessionId"),
-                    "group_session_id": rec.get("groupId"),
-                    "is_present": 1 if rec.get("present", False) else 0,
-                    "day": format_date(rec.get("day")),
-                    "note": rec.get("note"),
-                    "is_editable": 1 if rec.get("editable", True) else 0,
-                    "enabled": 1 if rec.get("enabled", True) else 0,
-                    "releaseToken": 1 if rec.get("releaseToken", False) else 0,
-                    "useToken": rec.get("useToken"),
-                    "created_at": format_date(rec.get("createdAt")),
-                    "updated_at": format_date(rec.get("updatedAt")),
-                    "timestamp": format_date(rec.get("timestamp")),
-                    "slc_edit":0
-                }
-
-                cursor.execute("""
-                    INSERT INTO attendance (
-                        id, user_id, account_id, session_id, group_session_id, is_present,
-                        day, note, is_editable, enabled, created_at, updated_at,
-                        timestamp, releaseToken, useToken,calander_id,slc_edit
-                    ) VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,%s,0)
-                """, (
-                    attendance_id, data["user_id"], data["account_id"], data["session_id"],
-                    data["group_session_id"], data["is_present"], data["day"], data["note"],
-                    data["is_editable"], data["enabled"], data["created_at"], data["updated_at"],
-                    data["timestamp"], data["releaseToken"], data["useToken"],data["calander_id"]
-                ))
-
-                result["success_count"] += 1
-                print(f"✔ Attendance ID {attendance_id} inserted successfully")
-
-            except Exception as e:
-                print(f"❌ Error inserting attendance ID {rec.get('id', 'unknown')}: {e}")
-                result["error_count"] += 1
-                result["errors"].append({"attendance_id": rec.get("id", "unknown"), "error": str(e), "record_number": i})
-                continue
-
-        conn.commit()
-        print(f"\n✅ Inserted: {result['success_count']}, Skipped: {result['skipped_count']}, Errors: {result['error_count']}")
-
-    except Exception as e:
-        print(f"💥 Database error: {e}")
-        conn.rollback()
-    finally:
-        if cursor:
-            cursor.close()
-    return result
+push_config = config.get("pushConfig", {})
+# Who wins when a remote change meets a tablet edit (slc_edit = 1) not pushed yet:
+# "local" (the tablet edit is kept until it is pushed), "remote" (the remote change overwrites it),
+# "newest" (the most recent updated_at wins, the remote change when the local row has none)
+ATTENDANCE_CONFLICT_POLICY = push_config.get("ATTENDANCE_CONFLICT_POLICY", "newest")
+RECONCILE_CHUNK_SIZE = 500
+# attendance_audit.is_synced of a tablet edit overwritten by a newer remote change (never pushed)
+AUDIT_SUPERSEDED = 2
 
+# Fields, keys and converters are declared in entity_registry
+ATTENDANCE = get_entity("attendance")
 
-def update_attendance_data(conn, attendance_data, mac_address=None):
+log = logging.getLogger(__name__)
+
+
+def _stored_rows(cursor, records):
+    """
+    Stored attendance rows matching the records by id or by (user_id, calander_id),
+    as {"ids": {id: row}, "keys": {(user_id, calander_id): row}}; one query per chunk,
+    each half of the UNION reading one unique index.
     """
-    Update attendance records in the 'attendance' table.
-    - Skips update if data is identical to existing row
-    - Checks releaseToken logic if provided
+    by_id, by_key = {}, {}
+    for start in range(0, len(records), RECONCILE_CHUNK_SIZE):
+        chunk = records[start:start + RECONCILE_CHUNK_SIZE]
+        ids = [rec["id"] for rec in chunk]
+        keys = [(rec.get("userId"), rec.get("calenderId")) for rec in chunk
+                if rec.get("userId") is not None and rec.get("calenderId") is not None]
+        sql = ("SELECT `id`, `user_id`, `calander_id`, `slc_edit`, `updated_at` FROM `attendance` "
+               "WHERE `id` IN (" + ", ".join(["%s"] * len(ids)) + ")")
+        params = list(ids)
+        if keys:
+            sql += (" UNION SELECT `id`, `user_id`, `calander_id`, `slc_edit`, `updated_at` FROM `attendance` "
+                    "WHERE (`user_id`, `calander_id`) IN (" + ", ".join(["(%s, %s)"] * len(keys)) + ")")
+            params += [v for key in keys for v in key]
+        cursor.execute(sql, params)
+        for row in cursor.fetchall():
+            if not isinstance(row, dict):
+                row = dict(zip(("id", "user_id", "calander_id", "slc_edit", "updated_at"), row))
+            by_id[str(row["id"])] = row
+            by_key[(str(row["user_id"]), str(row["calander_id"]))] = row
+    return {"ids": by_id, "keys": by_key}
+
+
+def _pending_edits(cursor, ids):
+    """Ids of the attendances with a tablet edit still waiting in attendance_audit"""
+    pending = set()
+    for start in range(0, len(ids), RECONCILE_CHUNK_SIZE):
+        chunk = ids[start:start + RECONCILE_CHUNK_SIZE]
+        cursor.execute("SELECT DISTINCT `id_attendance` FROM `attendance_audit` "
+                       "WHERE `is_synced` = 0 AND `id_attendance` IN (" + ", ".join(["%s"] * len(chunk)) + ")",
+                       chunk)
+        pending.update(str(row[0] if not isinstance(row, dict) else row["id_attendance"])
+                       for row in cursor.fetchall())
+    return pending
+
+
+def _remote_wins(stored, record):
+    if ATTENDANCE_CONFLICT_POLICY == "remote":
+        return True
+    if ATTENDANCE_CONFLICT_POLICY == "local":
+        return False
+    local_updated = _as_datetime(stored.get("updated_at"))
+    if local_updated is None:
+        return True
+    remote_updated = _as_datetime(record.get("updatedAt"))
+    return remote_updated is not None and remote_updated >= local_updated
+
+
+def _as_datetime(value):
+    """Naive datetime, to the second, of a stored updated_at or an API timestamp (None if unreadable)"""
+    if isinstance(value, datetime):
+        return value.replace(tzinfo=None, microsecond=0)
+    formatted = format_date(str(value)) if value else None
+    return datetime.strptime(formatted, "%Y-%m-%d %H:%M:%S") if formatted else None
+
+
+def _rekey(cursor, pairs, reset_edit):
+    """Give stored rows the remote id: pairs of (stored id, remote id); reset_edit also sets slc_edit = 0"""
+    if not pairs:
+        return
+    cursor.execute("UPDATE `attendance` SET `id` = CASE `id` "
+                   + " ".join(["WHEN %s THEN %s"] * len(pairs))
+                   + " END" + (", `slc_edit` = 0" if reset_edit else "")
+                   + " WHERE `id` IN (" + ", ".join(["%s"] * len(pairs)) + ")",
+                   [v for pair in pairs for v in pair] + [old for old, _new in pairs])
+
+
+def reconcile_attendance(cursor, records, result):
     """
-    result = {"success_count":0, "skipped_count":0, "error_count":0, "errors":[], "total_processed":0}
-    cursor = None
-    try:
-        cursor = conn.cursor(dictionary=True)
-        updated_attendance = attendance_data.get("updated", []) or []
-        result["total_processed"] = len(updated_attendance)
-
-        if not updated_attendance:
-            print("No attendance records to update")
-            return result
-
-        print(f"🔄 Updating {len(updated_attendance)} attendance record(s)...")
-
-        for i, rec in enumerate(updated_attendance, 1):
-            try:
-                attendance_id = rec.get("id")
-                if not attendance_id:
-                    raise ValueError("Missing required field: id")
-
-                # Map new data
-                new_data = {
-                    "user_id": rec.get("userId"),
-                    "account_id": rec.get("accountId"),
-                    "session_id": rec.get("sessionId"),
-                    "group_session_id": rec.get("groupId"),
-                    "is_present": 1 if rec.get("present", False) else 0,
-                    "day": format_date(rec.get("day")),
-                    "note": rec.get("note"),
-                    "is_editable": 1 if rec.get("editable", True) else 0,
-                    "enabled": 1 if rec.get("enabled", True) else 0,
-                    "releaseToken": rec.get("releaseToken"),
-                    "useToken": rec.get("useToken"),
-                    "updated_at": format_date(rec.get("updatedAt")),
-                    "timestamp": format_date(rec.get("timestamp"))
-                }
-
-                # Special releaseToken logic
-                if new_data["releaseToken"] and mac_address and new_data["useToken"] == mac_address:
-                    print(f"⚠️ Cannot update Attendance ID {attendance_id}: releaseToken active on this machine")
-                    continue
-
-                # Check existing row
-                cursor.execute("SELECT * FROM attendance WHERE id=%s", (attendance_id,))
-                existing = cursor.fetchone()
-                if not existing:
-                    print(f"⚠️ Attendance ID {attendance_id} not found — skipping update.")
-                    result["skipped_count"] += 1
-                    continue
-
-                # Compare existing vs new data
-                same_data = True
-                for key, value in new_data.items():
-                    old_val = str(existing.get(key)) if existing.get(key) is not None else None
-                    new_val = str(value) if value is not None else None
-                    if old_val != new_val:
-                        same_data = False
-                        break
-
-                if same_data:
-                    result["skipped_count"] += 1
-                    print(f"⏭️ Attendance ID {attendance_id} — no changes detected (skipped).")
-                    continue
-
-                # Update only if different
-                cursor.execute("""
-                    UPDATE attendance SET
-                        user_id=%s, account_id=%s, session_id=%s, group_session_id=%s,
-                        is_present=%s, day=%s, note=%s, is_editable=%s, enabled=%s,
-                        updated_at=%s, timestamp=%s
-                    WHERE id=%s
-                """, (
-                    new_data["user_id"], new_data["account_id"], new_data["session_id"],
-                    new_data["group_session_id"], new_data["is_present"], new_data["day"],
-                    new_data["note"], new_data["is_editable"], new_data["enabled"],
-                    new_data["updated_at"], new_data["timestamp"], attendance_id
-                ))
-
-                result["success_count"] += 1
-                print(f"✔ Attendance ID {attendance_id} updated successfully")
-
-            except Exception as e:
-                print(f"❌ Error updating attendance ID {rec.get('id', 'unknown')}: {e}")
-                result["error_count"] += 1
-                result["errors"].append({"attendance_id": rec.get("id", "unknown"), "error": str(e), "record_number": i})
-                continue
-
-        conn.commit()
-        print(f"\n✅ Updated: {result['success_count']}, Skipped: {result['skipped_count']}, Errors: {result['error_count']}")
-
-    except Exception as e:
-        print(f"💥 Database error: {e}")
-        conn.rollback()
-    finally:
-        if cursor:
+    Match the remote records with the stored rows on both unique keys and return the
+    records to upsert:
+    - A stored row holding the same (user_id, calander_id) under another id is the same
+      attendance: it takes the remote id (one grouped UPDATE), so the record then merges
+      on the primary key and the next pull of it is a no-op instead of a key conflict.
+    - A row edited on a tablet (slc_edit = 1) whose edit is still in attendance_audit,
+      matched by id or by (user_id, calander_id), is only overwritten when
+      ATTENDANCE_CONFLICT_POLICY lets the remote change win; its queued audit rows are then
+      marked superseded so the stale edit is not pushed. When the tablet edit wins, a row
+      taking the remote id keeps slc_edit and its queued audit rows move to the remote id,
+      so the edit is pushed under the id the server knows.
+    - When the API sends one (user_id, calander_id) twice, the last record wins.
+    """
+    latest = {}
+    for rec in records:
+        key = (str(rec.get("userId")), str(rec.get("calenderId")))
+        if rec.get("userId") is None or rec.get("calenderId") is None:
+            key = ("id", str(rec["id"]))
+        latest[key] = rec
+    result["skipped_count"] += len(records) - len(latest)
+    records = list(latest.values())
+
+    stored = _stored_rows(cursor, records)
+    # Remote id (as string) -> stored row of the same (user_id, calander_id) under another id
+    matched = {}
+    for rec in records:
+        row = stored["keys"].get((str(rec.get("userId")), str(rec.get("calenderId"))))
+        if str(rec["id"]) not in stored["ids"] and row is not None and str(row["id"]) != str(rec["id"]):
+            matched[str(rec["id"])] = row
+    local = {str(rec["id"]): stored["ids"].get(str(rec["id"])) or matched.get(str(rec["id"])) for rec in records}
+
+    edited = [str(row["id"]) for row in local.values() if row is not None and row.get("slc_edit")]
+    pending = _pending_edits(cursor, edited) if edited else set()
+
+    kept_local, superseded, applied = [], [], []
+    for rec in records:
+        row = local[str(rec["id"])]
+        if row is None or str(row["id"]) not in pending:
+            applied.append(rec)
+        elif _remote_wins(row, rec):
+            superseded.append(str(row["id"]))
+            applied.append(rec)
+        else:
+            kept_local.append(rec)
+
+    # Audit rows still carry the stored id: superseded before the rows take their remote id
+    for start in range(0, len(superseded), RECONCILE_CHUNK_SIZE):
+        chunk = superseded[start:start + RECONCILE_CHUNK_SIZE]
+        cursor.execute(f"UPDATE `attendance_audit` SET `is_synced` = {AUDIT_SUPERSEDED} "
+                       "WHERE `is_synced` = 0 AND `id_attendance` IN (" + ", ".join(["%s"] * len(chunk)) + ")",
+                       chunk)
+
+    kept_ids = {str(rec["id"]) for rec in kept_local}
+    # slc_edit goes back to 0 with the id when the row is now the remote record
+    remote_ids = {str(rec["id"]): rec["id"] for rec in records}
+    rekeyed = [(row["id"], remote_ids[rec_id]) for rec_id, row in matched.items() if rec_id not in kept_ids]
+    kept_rekeyed = [(row["id"], remote_ids[rec_id]) for rec_id, row in matched.items() if rec_id in kept_ids]
+    _rekey(cursor, rekeyed, reset_edit=True)
+    _rekey(cursor, kept_rekeyed, reset_edit=False)
+    if kept_rekeyed:
+        cursor.execute("UPDATE `attendance_audit` SET `id_attendance` = CASE `id_attendance` "
+                       + " ".join(["WHEN %s THEN %s"] * len(kept_rekeyed))
+                       + " END WHERE `is_synced` = 0 AND `id_attendance` IN ("
+                       + ", ".join(["%s"] * len(kept_rekeyed)) + ")",
+                       [v for pair in kept_rekeyed for v in pair] + [old for old, _new in kept_rekeyed])
+    if matched:
+        id_index.add(ATTENDANCE.table, [remote_ids[rec_id] for rec_id in matched])
+        log.info("🔗 Attendance: %d local row(s) matched on (user_id, calander_id) took their remote id", len(matched))
+
+    if superseded:
+        log.warning("⚠️ Attendance: remote changes overwrote %d tablet edit(s) not pushed yet (policy %s)",
+                    len(superseded), ATTENDANCE_CONFLICT_POLICY)
+    if kept_local:
+        log.info("⏭️ Attendance: %d record(s) kept their tablet edit until it is pushed (policy %s)",
+                 len(kept_local), ATTENDANCE_CONFLICT_POLICY)
+        result["kept_local_count"] = len(kept_local)
+    result["skipped_count"] += len(kept_local)
+    return applied
+
+
+def upsert_attendance(conn, attendance_data, mac_address=None, hold_orphans=True):
+    """
+    Insert or update attendance records in the 'attendance' table (created and updated alike)
+    through the entity registry.
+    - Records are merged on both unique keys, the primary key and (user_id, calander_id),
+      and tablet edits follow ATTENDANCE_CONFLICT_POLICY (see reconcile_attendance), so a
+      re-pulled record is never an error.
+    - Unchanged rows are left untouched and counted as skipped.
+    - Records whose releaseToken is held by this machine (useToken == mac_address) are not applied.
+    """
+    records = ATTENDANCE.records(attendance_data)
+    if mac_address:
+        held = [rec for rec in records if rec.get("releaseToken") and rec.get("useToken") == mac_address]
+        for rec in held:
+            log.warning("⚠️ Cannot update Attendance ID %s: releaseToken active on this machine", rec.get("id"))
+        records = [rec for rec in records if not (rec.get("releaseToken") and rec.get("useToken") == mac_address)]
+
+    reconciled = {"skipped_count": 0}
+    mapped = [rec for rec in records if rec.get("id")]
+    if mapped and not spooling():
+        cursor = statement_cache(conn)
+        savepoint = None
+        try:
+            savepoint = begin_write(conn)
+            mapped = reconcile_attendance(cursor, mapped, reconciled)
+            end_write(conn, savepoint, 0)
+            # Records without an id go through the upsert to be reported as errors
+            records = mapped + [rec for rec in records if not rec.get("id")]
+        except Exception as err:
+            log.warning("⚠️ Attendance keys not reconciled, upserting on the primary key only: %s", err)
+            abort_write(conn, savepoint)
+            id_index.invalidate(ATTENDANCE.table)
+            reconciled = {"skipped_count": 0}
+        finally:
             cursor.close()
+
+    result = ATTENDANCE.upsert(conn, records, hold_orphans=hold_orphans)
+    result["skipped_count"] += reconciled["skipped_count"]
+    result["total_processed"] += reconciled["skipped_count"]
+    if "kept_local_count" in reconciled:
+        result["kept_local_count"] = reconciled["kept_local_count"]
     return result
+
+
+# The created/updated split of the API does not matter any more
+insert_attendance = upsert_attendance
+update_attendance_data = upsert_attendance
@@ -1,13 +1,28 @@
+import logging
 import os
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
-from common_function import format_date
+from batch_writer import log_rejected, write_upserts
+import id_index
+from statement_cache import statement_cache
+from transactions import abort_write, begin_write, end_write
+from entity_registry import get_entity
+from orphan_queue import OrphanHold
 
-def insert_room_data(conn, local_with_room_data):
+# Fields, keys and converters are declared in entity_registry
+LOCAL = get_entity("local")
+ROOM = get_entity("room")
+
+log = logging.getLogger(__name__)
+
+
+def upsert_room_data(conn, local_with_room_data, hold_orphans=True):
     """
-    Push local + room data from API.
-    - Inserts only if ID doesn't exist
-    - Skips if record already exists
+    Push local + room data from API (created and updated alike) through the entity
+    registry (each local carries its rooms).
+    - Unchanged rows are left untouched and counted as skipped
+    - Rooms of a local that is rejected are not written
+    - A local whose account has not arrived yet is written with its rooms and queued (orphan queue)
     """
     result = {
         "local_success_count": 0,
@@ -20,47 +35,23 @@ def insert_room_data(conn, local_with_room_data):
     }
 
     cursor = None
+    savepoint = None
     try:
-        cursor = conn.cursor(dictionary=True)
+        cursor = statement_cache(conn)
 
-        all_locals = local_with_room_data.get("created", []) + local_with_room_data.get("updated", [])
+        all_locals = LOCAL.records(local_with_room_data)
         result["total_locals_processed"] = len(all_locals)
-        print(f"Processing {len(all_locals)} local record(s)...")
+        log.debug("Processing %d local record(s)...", len(all_locals))
 
+        pending_locals, pending_rooms = [], []
+        rejected_locals, rejected_rooms = [], []
         for i, local in enumerate(all_locals, 1):
             try:
                 local_id = local.get("id")
                 if not local_id:
                     raise ValueError("Missing required field: id")
+                pending_locals.append(((local_id, i), LOCAL.build_row(local)))
 
-                # Check if local already exists
-                cursor.execute("SELECT * FROM local WHERE id = %s", (local_id,))
-                existing_local = cursor.fetchone()
-                if existing_local:
-                    print(f"⏭️ Local ID {local_id} already exists — skipping insert.")
-                    result["skipped_count"] += 1
-                    continue
-
-                # Prepare local fields
-                account_id = local.get("accountId")
-                name = local.get("name", "")
-                address = local.get("address", "")
-                gps = local.get("gps", "")
-                status = 1 if local.get("status", True) else 0
-                enabled = 1 if local.get("enabled", True) else 0
-                default_local = 1 if local.get("default", False) else 0
-                created_at = format_date(local.get("createdAt"))
-                updated_at = format_date(local.get("updatedAt"))
-
-                # Insert local
-                cursor.execute("""
-                    INSERT INTO local (id, account_id, name, address, gps, status, enabled, default_local, created_at, updated_at)
-                    VALUES (%s,%s,%s,%s,%s,%s,%s,%s,%s,%s)
-                """, (local_id, account_id, name, address, gps, status, enabled, default_local, created_at, updated_at))
-                result["local_success_count"] += 1
-                print(f"✔ Local ID {local_id} inserted successfully")
-
-                # Process rooms
                 rooms = local.get("rooms", [])
                 result["total_rooms_processed"] += len(rooms)
                 for room in rooms:
@@ -68,36 +59,43 @@ def insert_room_data(conn, local_with_room_data):
                         room_id = room.get("id")
                         if not room_id:
                             continue
-
-                        cursor.execute("SELECT * FROM room WHERE id = %s", (room_id,))
-                        if cursor.fetchone():
-                            print(f"⏭️ Room ID {room_id} already exists — skipping insert.")
-                            result["skipped_count"] += 1
-                            continue
-
-                        room_local_id = room.get("localId")
-                        room_name = room.get("name", "")
-                        capacity = room.get("capacity", "")
-                        created_at = format_date(room.get("createdAt"))
-                        updated_at = format_date(room.get("updatedAt"))
-
-                        cursor.execute("""
-                            INSERT INTO room (id, local_id, name, capacity, created_at, updated_at)
-                            VALUES (%s,%s,%s,%s,%s,%s)
-                        """, (room_id, room_local_id, room_name, capacity, created_at, updated_at))
-                        result["room_success_count"] += 1
-                        print(f"✔ Room ID {room_id} inserted successfully")
+                        pending_rooms.append((local_id, ((room_id, i), ROOM.build_row(room))))
                     except Exception as err:
                         result["error_count"] += 1
                         result["errors"].append({"room_id": room.get("id", None), "local_id": local_id, "error": str(err)})
-                        print(f"❌ Error inserting room: {err}")
+                        rejected_rooms.append((room.get("id"), err))
 
             except Exception as err:
                 result["error_count"] += 1
                 result["errors"].append({"local_id": local.get("id", None), "error": str(err)})
-                print(f"❌ Error inserting local: {err}")
-
-        conn.commit()
+                rejected_locals.append((local.get("id"), err))
+        log_rejected(LOCAL.label, "mapping", rejected_locals)
+        log_rejected(ROOM.label, "mapping", rejected_rooms)
+
+        savepoint = begin_write(conn)
+        local_orphans = OrphanHold(LOCAL.name, LOCAL.reference_tables() if hold_orphans else {})
+        pending_locals = local_orphans.hold(cursor, LOCAL.columns, pending_locals, all_locals, result)
+        failed_locals = write_upserts(cursor, LOCAL.table, LOCAL.columns, LOCAL.update_columns, pending_locals,
+                                      result, LOCAL.label, LOCAL.error_key, success_key="local_success_count")
+        written_locals = {str(key[0]) for key, _values in pending_locals} - failed_locals
+        local_orphans.written(cursor, LOCAL.table, written_locals)
+        rooms = [row for local_id, row in pending_rooms if str(local_id) in written_locals]
+        failed_rooms = write_upserts(cursor, ROOM.table, ROOM.columns, ROOM.update_columns, rooms, result,
+                                     ROOM.label, ROOM.error_key, success_key="room_success_count")
+        OrphanHold(ROOM.name, {}).written(cursor, ROOM.table, {str(key[0]) for key, _values in rooms} - failed_rooms)
+        end_write(conn, savepoint, len(pending_locals) + len(rooms))
+        log.info("✅ Local with Room: %d local(s) and %d room(s) upserted, ⏭️ unchanged %d, ⏸️ missing parents %d, "
+                 "⚠️ errors %d", result["local_success_count"], result["room_success_count"],
+                 result["skipped_count"], result.get("parked_count", 0), result["error_count"],
+                 extra={"entity": "local_with_room",
+                        "batch": {k: v for k, v in result.items() if k != "errors"}})
+    except Exception as err:
+        log.error("💥 Database error while writing locals and rooms: %s", err)
+        result["error_count"] += 1
+        result["errors"].append({"type": "Database Error", "error": str(err)})
+        abort_write(conn, savepoint)
+        id_index.invalidate(LOCAL.table)
+        id_index.invalidate(ROOM.table)
     finally:
         if cursor:
             cursor.close()
@@ -105,122 +103,6 @@ def insert_room_data(conn, local_with_room_data):
     return result
 
 
-
-def update_room_data(conn, local_with_room_data):
-    """
-    Update local + room data
-    - Skips update if data is identical
-    """
-    result = {
-        "local_success_count": 0,
-        "room_success_count": 0,
-        "error_count": 0,
-        "skipped_count": 0,
-        "errors": [],
-        "total_locals_processed": 0,
-        "total_rooms_processed": 0
-    }
-
-    cursor = None
-    try:
-        cursor = conn.cursor(dictionary=True)
-        updated_locals = local_with_room_data.get("updated", [])
-        result["total_locals_processed"] = len(updated_locals)
-
-        if not updated_locals:
-            print("No local records to update")
-            return result
-
-        for i, local in enumerate(updated_locals, 1):
-            try:
-                local_id = local.get("id")
-                if not local_id:
-                    raise ValueError("Missing required field: id")
-
-                # New data dict
-                new_local_data = {
-                    "account_id": local.get("accountId"),
-                    "name": local.get("name", ""),
-                    "address": local.get("address", ""),
-                    "gps": local.get("gps", ""),
-                    "status": 1 if local.get("status", True) else 0,
-                    "enabled": 1 if local.get("enabled", True) else 0,
-                    "default_local": 1 if local.get("default", False) else 0,
-                    "updated_at": format_date(local.get("updatedAt"))
-                }
-
-                # Fetch existing record
-                cursor.execute("SELECT * FROM local WHERE id = %s", (local_id,))
-                existing_local = cursor.fetchone()
-                if not existing_local:
-                    print(f"⚠️ Local ID {local_id} not found — skipping update.")
-                    continue
-
-                # Compare data
-                same_data = all(str(existing_local.get(k)) == str(v) for k, v in new_local_data.items())
-                if same_data:
-                    result["skipped_count"] += 1
-                    print(f"⏭️ Local ID {local_id} — no changes detected (skipped).")
-                    continue
-
-                # Update only if different
-                cursor.execute("""
-                    UPDATE local SET
-                        account_id=%s, name=%s, address=%s, gps=%s,
-                        status=%s, enabled=%s, default_local=%s, updated_at=%s
-                    WHERE id=%s
-                """, (*new_local_data.values(), local_id))
-                result["local_success_count"] += 1
-                print(f"✔ Local ID {local_id} updated successfully")
-
-                # Process rooms
-                rooms = local.get("rooms", [])
-                result["total_rooms_processed"] += len(rooms)
-                for room in rooms:
-                    try:
-                        room_id = room.get("id")
-                        if not room_id:
-                            continue
-
-                        new_room_data = {
-                            "local_id": room.get("localId"),
-                            "name": room.get("name", ""),
-                            "capacity": room.get("capacity", ""),
-                            "updated_at": format_date(room.get("updatedAt"))
-                        }
-
-                        cursor.execute("SELECT * FROM room WHERE id = %s", (room_id,))
-                        existing_room = cursor.fetchone()
-                        if not existing_room:
-                            print(f"⚠️ Room ID {room_id} not found — skipping update.")
-                            continue
-
-                        same_data = all(str(existing_room.get(k)) == str(v) for k, v in new_room_data.items())
-                        if same_data:
-                            result["skipped_count"] += 1
-                            print(f"⏭️ Room ID {room_id} — no changes detected (skipped).")
-                            continue
-
-                        cursor.execute("""
-                            UPDATE room SET local_id=%s, name=%s, capacity=%s, updated_at=%s
-                            WHERE id=%s
-                        """, (*new_room_data.values(), room_id))
-                        result["room_success_count"] += 1
-                        print(f"✔ Room ID {room_id} updated successfully")
-
-                    except Exception as err:
-                        result["error_count"] += 1
-                        result["errors"].append({"room_id": room.get("id", None), "local_id": local_id, "error": str(err)})
-                        print(f"❌ Error updating room: {err}")
-
-            except Exception as err:
-                result["error_count"] += 1
-                result["errors"].append({"local_id": local.get("id", None), "error": str(err)})
-                print(f"❌ Error updating local: {err}")
-
-        conn.commit()
-    finally:
-        if cursor:
-            cursor.close()
-
-    return result
\ No newline at end of file
+# The created/updated split of the API does not matter any more
+insert_room_data = upsert_room_data
+update_room_data = upsert_room_data
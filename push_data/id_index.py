@@ -0,0 +1,138 @@
+import json
+import logging
+import threading
+
+from common_function import fetch_existing_ids
+
+#file of the configuration
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+push_config = config.get("pushConfig", {})
+# Keep the ids of the synced tables in memory while the daemon runs (see warm())
+ID_INDEX = push_config.get("ID_INDEX", True)
+# Integer ids up to this value are kept in the bitmap (one bit each), larger or non-integer ids in a set
+MAX_BITMAP_ID = push_config.get("ID_INDEX_MAX_BITMAP_ID", 1 << 27)
+
+log = logging.getLogger(__name__)
+
+
+class IdSet:
+    """Compact set of row ids: a bitmap for the non-negative integer ids, a plain set for the others"""
+
+    def __init__(self):
+        self.bits = bytearray()
+        self.others = set()
+
+    @staticmethod
+    def _position(value):
+        text = str(value)
+        if text.isdigit():
+            number = int(text)
+            if number <= MAX_BITMAP_ID:
+                return number
+        return None
+
+    def add(self, value):
+        number = self._position(value)
+        if number is None:
+            self.others.add(str(value))
+            return
+        byte = number >> 3
+        if byte >= len(self.bits):
+            # Grow by at least the current size so a growing id range is not copied on every insert
+            self.bits.extend(bytes(max(byte + 1 - len(self.bits), len(self.bits))))
+        self.bits[byte] |= 1 << (number & 7)
+
+    def __contains__(self, value):
+        number = self._position(value)
+        if number is None:
+            return str(value) in self.others
+        byte = number >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (1 << (number & 7)))
+
+
+_lock = threading.Lock()
+# table -> IdSet of the ids it holds
+_indexes = {}
+# Tables warmed by warm(): reloaded on next use after an invalidation
+_wanted = set()
+
+
+def _load(cursor, table):
+    cursor.execute(f"SELECT `id` FROM `{table}`")
+    ids = IdSet()
+    for row in cursor.fetchall():
+        ids.add(row["id"] if isinstance(row, dict) else row[0])
+    return ids
+
+
+def warm(conn, tables):
+    """
+    Load the ids of `tables` (one `SELECT id` each). Existence checks on these tables are
+    then answered from memory for as long as the process runs; inserted ids are added by
+    the writers, and a table whose writes were rolled back is reloaded on next use.
+    """
+    if not ID_INDEX:
+        return
+    cursor = conn.cursor()
+    try:
+        for table in tables:
+            try:
+                ids = _load(cursor, table)
+            except Exception as err:
+                log.warning("⚠️ Id index of %s not loaded: %s", table, err)
+                continue
+            with _lock:
+                _indexes[table] = ids
+                _wanted.add(table)
+    finally:
+        cursor.close()
+    log.info("Id index loaded for %d table(s)", len(_indexes))
+
+
+def _index(cursor, table):
+    with _lock:
+        index = _indexes.get(table)
+        if index is not None or table not in _wanted:
+            return index
+    try:
+        index = _load(cursor, table)
+    except Exception as err:
+        log.warning("⚠️ Id index of %s not reloaded: %s", table, err)
+        return None
+    with _lock:
+        if table in _wanted:
+            _indexes[table] = index
+    return index
+
+
+def indexed(table):
+    return table in _wanted
+
+
+def existing_ids(cursor, table, ids):
+    """Same as common_function.fetch_existing_ids, from memory when the table is indexed"""
+    index = _index(cursor, table)
+    if index is None:
+        return fetch_existing_ids(cursor, table, ids)
+    with _lock:
+        return {str(i) for i in ids if i is not None and i != "" and i in index}
+
+
+def add(table, ids):
+    """Rows of these ids were inserted into table"""
+    with _lock:
+        index = _indexes.get(table)
+        if index is not None:
+            for i in ids:
+                index.add(i)
+
+
+def invalidate(table=None):
+    """Writes to table (every table when None) were rolled back: forget its ids until reloaded"""
+    with _lock:
+        if table is None:
+            _indexes.clear()
+        else:
+            _indexes.pop(table, None)
@@ -0,0 +1,181 @@
+import json
+import logging
+import threading
+
+from batch_writer import spooling
+from id_index import existing_ids
+
+#file of the configuration
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+push_config = config.get("pushConfig", {})
+# Table queuing the records written before their parent rows were in the local DB (see sql_code.sql)
+ORPHAN_TABLE = push_config.get("ORPHAN_TABLE", "sync_orphan_queue")
+ORPHAN_QUEUE = push_config.get("ORPHAN_QUEUE", True)
+# A record still queued after this long is written a last time and leaves the queue
+ORPHAN_MAX_AGE_HOURS = push_config.get("ORPHAN_MAX_AGE_HOURS", 48)
+ORPHAN_CHUNK_SIZE = 500
+
+log = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# Entities with parked records (None: not read from the table yet)
+_parked = None
+# Tables that received rows since the last reapply (None: anything may have landed)
+_landed = None
+_disabled = not ORPHAN_QUEUE
+
+
+def _is_reference(value):
+    """A foreign key value that points at a row (0 and empty values mean "no parent")"""
+    return value not in (None, "", 0, "0")
+
+
+def _disable(err):
+    global _disabled
+    _disabled = True
+    log.warning("⚠️ Orphan queue disabled (%s): records are written even when their parents are missing", err)
+
+
+def _parked_entities(cursor):
+    global _parked
+    with _lock:
+        if _parked is None:
+            cursor.execute(f"SELECT DISTINCT `entity` FROM `{ORPHAN_TABLE}`")
+            _parked = {row[0] if not isinstance(row, dict) else row["entity"] for row in cursor.fetchall()}
+        return _parked
+
+
+def missing_parents(cursor, columns, references, pending):
+    """
+    {record key: [(column, parent id), ...]} of the pending rows referencing a parent row
+    that does not exist. references: {column: parent table}; one IN query per parent table
+    (none for the tables of the id index).
+    """
+    positions = [(columns.index(column), column, table) for column, table in references.items()]
+    wanted = {}
+    for _key, values in pending:
+        for position, _column, table in positions:
+            if _is_reference(values[position]):
+                wanted.setdefault(table, set()).add(str(values[position]))
+    absent = {table: ids - existing_ids(cursor, table, ids) for table, ids in wanted.items()}
+
+    orphans = {}
+    for key, values in pending:
+        missing = [(column, values[position]) for position, column, table in positions
+                   if _is_reference(values[position]) and str(values[position]) in absent[table]]
+        if missing:
+            orphans[key] = missing
+    return orphans
+
+
+class OrphanHold:
+    """
+    Parent check of one batch of an entity, passed to upsert_records. The tables have no
+    foreign keys, so every row is written; the rows referencing a parent that has not
+    arrived yet are also queued in ORPHAN_TABLE (in the same transaction as the batch), and
+    reapply_orphans() writes them again once their parents landed. A newer version of a
+    queued record replaces it in the queue; once a version is written with its parents
+    present the queued one is dropped.
+    Nothing is checked while spooling a bulk load: the parents are loaded in the same merge.
+    """
+
+    def __init__(self, entity, references):
+        self.entity = entity
+        self.references = references
+        # Ids of this batch queued by hold(): written() keeps them in the queue
+        self.queued = set()
+
+    def hold(self, cursor, columns, pending, records, result):
+        """Queue the orphan rows of pending and return the rows to write now (all of them)"""
+        if _disabled or not self.references or spooling():
+            return pending
+        try:
+            orphans = missing_parents(cursor, columns, self.references, pending)
+        except Exception as err:
+            _disable(err)
+            return pending
+        if not orphans:
+            return pending
+
+        parked = []
+        for key, missing in orphans.items():
+            record_id, record_number = key
+            parked.append((self.entity, str(record_id),
+                           json.dumps(records[record_number - 1], default=str),
+                           ", ".join(f"{column}={value}" for column, value in missing)))
+        for start in range(0, len(parked), ORPHAN_CHUNK_SIZE):
+            chunk = parked[start:start + ORPHAN_CHUNK_SIZE]
+            cursor.execute(
+                f"INSERT INTO `{ORPHAN_TABLE}` (`entity`, `record_id`, `payload`, `missing`) VALUES "
+                + ", ".join(["(%s, %s, %s, %s)"] * len(chunk))
+                + " ON DUPLICATE KEY UPDATE `payload` = VALUES(`payload`), `missing` = VALUES(`missing`), "
+                  "`attempts` = `attempts` + 1",
+                [v for row in chunk for v in row])
+        with _lock:
+            if _parked is not None:
+                _parked.add(self.entity)
+
+        self.queued.update(str(key[0]) for key in orphans)
+        result["parked_count"] = result.get("parked_count", 0) + len(parked)
+        log.info("⏸️ %s: %d record(s) written before their parents, queued until they arrive",
+                 self.entity, len(parked))
+        return pending
+
+    def written(self, cursor, table, record_ids):
+        """Rows of these ids were written: drop their queued versions and note that table got rows"""
+        if not record_ids or spooling():
+            return
+        with _lock:
+            if _landed is not None:
+                _landed.add(table)
+        if _disabled:
+            return
+        try:
+            if self.entity not in _parked_entities(cursor):
+                return
+        except Exception as err:
+            _disable(err)
+            return
+        ids = [str(i) for i in record_ids if str(i) not in self.queued]
+        for start in range(0, len(ids), ORPHAN_CHUNK_SIZE):
+            chunk = ids[start:start + ORPHAN_CHUNK_SIZE]
+            cursor.execute(f"DELETE FROM `{ORPHAN_TABLE}` WHERE `entity` = %s AND `record_id` IN ("
+                           + ", ".join(["%s"] * len(chunk)) + ")", [self.entity] + chunk)
+
+
+def take_parked(cursor, entity_tables):
+    """
+    Parked records worth retrying: those of the entities whose parent tables received rows
+    since the last call (entity_tables: {entity: set of parent tables}), and those parked
+    for more than ORPHAN_MAX_AGE_HOURS. Returns {entity: (records, expired records)}.
+    """
+    global _landed, _parked
+    if _disabled:
+        return {}
+    try:
+        parked = _parked_entities(cursor)
+    except Exception as err:
+        _disable(err)
+        return {}
+    if not parked:
+        return {}
+    with _lock:
+        landed, _landed = _landed, set()
+
+    retry = [e for e in parked if e in entity_tables and (landed is None or entity_tables[e] & landed)]
+    conditions = [f"`parked_at` < NOW() - INTERVAL {int(ORPHAN_MAX_AGE_HOURS)} HOUR"]
+    if retry:
+        conditions.append("`entity` IN (" + ", ".join(["%s"] * len(retry)) + ")")
+    cursor.execute(f"SELECT `entity`, `payload`, `parked_at` < NOW() - INTERVAL {int(ORPHAN_MAX_AGE_HOURS)} HOUR "
+                   f"FROM `{ORPHAN_TABLE}` WHERE " + " OR ".join(conditions) + " ORDER BY `id`", retry)
+    found = {}
+    for entity, payload, expired in cursor.fetchall():
+        records, expired_records = found.setdefault(entity, ([], []))
+        (expired_records if expired else records).append(json.loads(payload))
+
+    # Re-read once the retries are done: written records leave the queue, orphans stay
+    with _lock:
+        _parked = None
+    return found
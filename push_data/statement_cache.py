@@ -0,0 +1,132 @@
+import json
+from collections import OrderedDict
+
+#file of the configuration
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+push_config = config.get("pushConfig", {})
+# Server-side prepared statements kept open per connection (MariaDB caps them with max_prepared_stmt_count)
+PREPARED_CACHE_SIZE = push_config.get("PREPARED_CACHE_SIZE", 64)
+PREPARED_STATEMENTS = push_config.get("PREPARED_STATEMENTS", True)
+
+
+class StatementCache:
+    """
+    Server-side prepared statements of one connection, keyed by statement text.
+
+    A prepared cursor only keeps the last statement it prepared, so the cache holds one
+    prepared cursor per statement: running the same INSERT/UPDATE/SELECT again only sends
+    the parameters, the server does not parse and plan the text again. The least recently
+    used statements are closed once more than max_size are open.
+
+    Preparing costs a round trip of its own, so a statement is only prepared the second
+    time its text is seen: the one-off shapes of variable-length batches (the last partial
+    chunk, a group of 37 changed rows...) run on the plain cursor and never evict the
+    statements that repeat. Callers pad IN lists and CASE updates to a few lengths
+    (common_function.padded) so those repeat too.
+
+    It is used like a cursor (execute / fetchall / rowcount / close). Rows come back as
+    tuples. A statement the server refuses to prepare is run on a plain cursor.
+    """
+
+    def __init__(self, conn, max_size=None, enabled=None):
+        self.conn = conn
+        self.max_size = max_size or PREPARED_CACHE_SIZE
+        self.enabled = PREPARED_STATEMENTS if enabled is None else enabled
+        self._cursors = OrderedDict()
+        self._plain = None
+        self._unpreparable = set()
+        # Statement texts run once on the plain cursor, prepared if they come again
+        self._seen = OrderedDict()
+        self._last = None
+        self.prepared_count = 0
+
+    def _plain_cursor(self):
+        if self._plain is None:
+            self._plain = self.conn.cursor()
+        return self._plain
+
+    def _prepared_cursor(self, operation):
+        cursor = self._cursors.get(operation)
+        if cursor is not None:
+            self._cursors.move_to_end(operation)
+            return cursor
+        cursor = self.conn.cursor(prepared=True)
+        self._cursors[operation] = cursor
+        self.prepared_count += 1
+        while len(self._cursors) > self.max_size:
+            _operation, evicted = self._cursors.popitem(last=False)
+            try:
+                evicted.close()
+            except Exception:
+                pass
+        return cursor
+
+    def _seen_before(self, operation):
+        if operation in self._cursors or self._seen.pop(operation, None):
+            return True
+        self._seen[operation] = True
+        while len(self._seen) > self.max_size * 4:
+            self._seen.popitem(last=False)
+        return False
+
+    def execute(self, operation, params=()):
+        if not self.enabled or operation in self._unpreparable or not self._seen_before(operation):
+            self._last = self._plain_cursor()
+            self._last.execute(operation, params)
+            return self._last
+
+        cursor = self._prepared_cursor(operation)
+        try:
+            cursor.execute(operation, tuple(params or ()))
+        except Exception as err:
+            # 1295: "This command is not supported in the prepared statement protocol yet"
+            if getattr(err, "errno", None) != 1295:
+                self._last = cursor
+                raise
+            self._cursors.pop(operation, None)
+            self._unpreparable.add(operation)
+            self._last = self._plain_cursor()
+            self._last.execute(operation, params)
+            return self._last
+        self._last = cursor
+        return cursor
+
+    def fetchall(self):
+        return self._last.fetchall() if self._last is not None else []
+
+    def fetchone(self):
+        return self._last.fetchone() if self._last is not None else None
+
+    @property
+    def rowcount(self):
+        return self._last.rowcount if self._last is not None else -1
+
+    def close(self):
+        """Statements stay prepared for the next batch: only close_statements() releases them"""
+        self._last = None
+
+    def close_statements(self):
+        for cursor in list(self._cursors.values()) + ([self._plain] if self._plain else []):
+            try:
+                cursor.close()
+            except Exception:
+                pass
+        self._cursors.clear()
+        self._seen.clear()
+        self._plain = None
+        self._last = None
+
+
+def statement_cache(conn):
+    """Return the StatementCache of a connection (created on first use, lives as long as the connection)"""
+    cache = getattr(conn, "_statement_cache", None)
+    if cache is None:
+        cache = StatementCache(conn)
+        try:
+            conn._statement_cache = cache
+        except AttributeError:
+            # Connection objects that refuse attributes just get a cache per call
+            pass
+    return cache
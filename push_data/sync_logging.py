@@ -0,0 +1,81 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+#file of the configuration
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+logging_config = config.get("loggingConfig", {})
+# DEBUG adds one line per record (mapping errors, rejected rows, downloaded images...)
+LOG_LEVEL = logging_config.get("LEVEL", "INFO")
+# "text" (one readable line per event) or "json" (one JSON object per line, for journald/log shippers)
+LOG_FORMAT = logging_config.get("FORMAT", "text")
+# Format and write the lines on a background thread instead of the ingestion threads
+LOG_QUEUE = logging_config.get("QUEUE", True)
+# Also write to this file (None: standard output only)
+LOG_FILE = logging_config.get("FILE")
+
+TEXT_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+# Attributes every LogRecord has: the others come from the `extra` of the logging call
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+_listener = None
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the `extra` fields of the call"""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record, "%Y-%m-%dT%H:%M:%S"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+def configure(level=None, fmt=None, use_queue=None, log_file=None):
+    """
+    Set up the root logger once per process, from loggingConfig unless overridden.
+    With the queue, the calling threads only enqueue the record; a listener thread
+    formats and writes it (and is flushed at exit).
+    """
+    global _listener
+    if _listener is not None:
+        return
+
+    formatter = JsonFormatter() if (fmt or LOG_FORMAT) == "json" else logging.Formatter(TEXT_FORMAT)
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if log_file or LOG_FILE:
+        handlers.append(logging.FileHandler(log_file or LOG_FILE, encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    root = logging.getLogger()
+    root.setLevel((level or LOG_LEVEL).upper())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    if LOG_QUEUE if use_queue is None else use_queue:
+        records = queue.SimpleQueue()
+        root.addHandler(logging.handlers.QueueHandler(records))
+        _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+    else:
+        for handler in handlers:
+            root.addHandler(handler)
+        _listener = False
+    # Connection and HTTP libraries only report problems
+    for name in ("urllib3", "mysql.connector"):
+        logging.getLogger(name).setLevel(max(root.level, logging.WARNING))
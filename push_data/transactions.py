@@ -0,0 +1,148 @@
+import json
+import logging
+from contextlib import contextmanager
+
+import id_index
+
+#file of the configuration
+with open("config.json", "r") as f:
+    config = json.load(f)
+
+push_config = config.get("pushConfig", {})
+# Records written per transaction while a sync applies its pull (one fsync per group instead of per statement)
+TRANSACTION_RECORDS = push_config.get("TRANSACTION_RECORDS", 5000)
+
+log = logging.getLogger(__name__)
+
+
+class TransactionLost(Exception):
+    """The server rolled back the whole open transaction (deadlock, lock wait timeout...)"""
+
+
+class IngestTransaction:
+    """
+    Groups the writes of the push_data handlers into transactions of about
+    records_per_commit records, on a connection that otherwise autocommits.
+
+    Each handler call runs under its own savepoint (begin_write / end_write /
+    abort_write): a handler that fails rolls back only its own rows, the records
+    written before it in the same transaction are kept. Inside a handler every
+    statement is atomic, so a rejected row (retried alone after its batch failed)
+    leaves nothing behind either. If the server drops the whole transaction the
+    savepoint is gone too: everything since the last commit is lost and
+    TransactionLost is raised at the next commit, so the caller does not record
+    that work as applied.
+    """
+
+    def __init__(self, conn, records_per_commit=None):
+        self.conn = conn
+        self.records_per_commit = records_per_commit or TRANSACTION_RECORDS
+        self.pending = 0
+        self.committed = 0
+        self.lost = False
+        self._savepoints = 0
+
+    def _begin(self):
+        if not self.conn.in_transaction:
+            self.conn.start_transaction()
+
+    def _execute(self, sql):
+        cursor = self.conn.cursor()
+        try:
+            cursor.execute(sql)
+        finally:
+            cursor.close()
+
+    def savepoint(self):
+        self._begin()
+        self._savepoints += 1
+        name = f"sync_sp_{self._savepoints}"
+        self._execute(f"SAVEPOINT {name}")
+        return name
+
+    def release(self, name, records):
+        try:
+            self._execute(f"RELEASE SAVEPOINT {name}")
+        except Exception:
+            # The transaction is gone with its savepoint
+            self.lost = True
+            return
+        self.pending += records
+        if self.pending >= self.records_per_commit:
+            self.commit()
+
+    def rollback_to(self, name):
+        try:
+            self._execute(f"ROLLBACK TO SAVEPOINT {name}")
+        except Exception as err:
+            log.error("💥 Transaction rolled back by the server, %d record(s) since last commit lost: %s",
+                      self.pending, err)
+            self.lost = True
+            id_index.invalidate()
+            try:
+                self.conn.rollback()
+            except Exception:
+                pass
+
+    def commit(self):
+        if self.lost:
+            raise TransactionLost("Writes since the last commit were rolled back by the server")
+        if self.conn.in_transaction:
+            self.conn.commit()
+        self.committed += self.pending
+        self.pending = 0
+
+    def rollback(self):
+        if self.conn.in_transaction:
+            self.conn.rollback()
+            id_index.invalidate()
+        self.pending = 0
+
+
+def current_transaction(conn):
+    return getattr(conn, "_ingest_transaction", None)
+
+
+@contextmanager
+def ingest_transaction(conn, records_per_commit=None):
+    """
+    Apply everything written through conn in this block in grouped transactions.
+    The last group is committed when the block ends, rolled back if it raises.
+    """
+    tx = IngestTransaction(conn, records_per_commit)
+    conn._ingest_transaction = tx
+    try:
+        yield tx
+        tx.commit()
+    except BaseException:
+        tx.rollback()
+        raise
+    finally:
+        conn._ingest_transaction = None
+
+
+def begin_write(conn):
+    """Start the writes of one handler call; returns the token end_write/abort_write need"""
+    tx = current_transaction(conn)
+    return tx.savepoint() if tx else None
+
+
+def end_write(conn, savepoint, records):
+    """The handler call succeeded: keep its rows (committed with its group, or now without a transaction manager)"""
+    tx = current_transaction(conn)
+    if tx is None:
+        conn.commit()
+    elif savepoint:
+        tx.release(savepoint, records)
+
+
+def abort_write(conn, savepoint):
+    """The handler call failed: undo its rows only"""
+    tx = current_transaction(conn)
+    try:
+        if tx is None:
+            conn.rollback()
+        elif savepoint:
+            tx.rollback_to(savepoint)
+    except Exception:
+        pass
@@ -1,5 +1,8 @@
 import json
-import requests
+import logging
+import http_client
+
+log = logging.getLogger(__name__)
 
 
 
@@ -28,14 +31,14 @@ def send_attendanceNote_to_remote(attendance_id,note):
     }  # Map fields if needed
     try:
         url=f"{BASE_URL}{API_URL_UPDATE_NOTE}{attendance_id}"
-        print(url)
-        response=requests.post(url, data=payload, headers=headers)
+        log.debug("POST %s", url)
+        response=http_client.post(url, data=payload, headers=headers)
         response.raise_for_status()
-        print(response.status_code)
+        log.debug("Status %s", response.status_code)
 
         return response.status_code == 200
     except Exception as e:
-        print(f"❌ Error from update note sending to remote: {e}")
+        log.warning("❌ Error from update note sending to remote: %s", e)
         return False
 
 
@@ -47,13 +50,13 @@ def send_attendancePresence_to_remote(id_attendance,status):
     try:
 
         url = f"{BASE_URL}{API_URL_UPDATE_STATUS}{id_attendance}"
-        print(url)
-        response = requests.post(url,data=payload,headers=headers)
+        log.debug("POST %s", url)
+        response = http_client.post(url,data=payload,headers=headers)
         response.raise_for_status()
-        print(response.status_code)
+        log.debug("Status %s", response.status_code)
         return response.status_code == 200
     except Exception as e:
-        print(f"❌ Error from update status sending to remote: {e}")
+        log.warning("❌ Error from update status sending to remote: %s", e)
         return False
 
 
@@ -64,13 +67,13 @@ def delete_attendance_to_remote(attendance_id):
     }  # Map fields if needed
     try:
         url=f"{BASE_URL}{API_URL_DELETE_ATTENDANCE}{attendance_id}"
-        print(url)
-        response=requests.delete(url, data=payload, headers=headers)
+        log.debug("DELETE %s", url)
+        response=http_client.delete(url, data=payload, headers=headers)
         response.raise_for_status()
-        print(response.status_code)
+        log.debug("Status %s", response.status_code)
 
         return response.status_code == 200
     except Exception as e:
-        print(f"❌ Error from delete attendance sending to remote: {e}")
+        log.warning("❌ Error from delete attendance sending to remote: %s", e)
         return False
 
@@ -1,3 +1,43 @@
+-- Digest of the last applied remote version of each synced row (see push_data/batch_writer.py).
+-- The push handlers compare it with `SELECT id, sync_digest ... WHERE id IN (...)` and only read
+-- the full row when it differs. NULL (rows written before this column existed) means "diff the row".
+ALTER TABLE `account` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `account_subject` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `attendance` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `camera` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `local` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `relation_calander_group_session` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `relation_group_local_session` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `relation_teacher_to_subject_group` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `relation_user_session` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `room` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `session` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `slc` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `slc_local` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `subject_config` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `tablet` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+ALTER TABLE `user` ADD COLUMN IF NOT EXISTS `sync_digest` CHAR(16) DEFAULT NULL;
+
+-- Remote records written before their parent rows were synced (see push_data/orphan_queue.py).
+-- They are written again once their parents land; `payload` is the record as the API sent it.
+CREATE TABLE IF NOT EXISTS `sync_orphan_queue` (
+  `id` bigint(20) unsigned NOT NULL AUTO_INCREMENT,
+  `entity` varchar(64) NOT NULL,
+  `record_id` varchar(64) NOT NULL,
+  `payload` longtext NOT NULL,
+  `missing` varchar(255) DEFAULT NULL,
+  `attempts` int(11) NOT NULL DEFAULT 0,
+  `parked_at` datetime NOT NULL DEFAULT current_timestamp(),
+  PRIMARY KEY (`id`),
+  UNIQUE KEY `unique_entity_record` (`entity`, `record_id`),
+  KEY `idx_parked_at` (`parked_at`)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+
+
+-- The outbound pusher (sync_remote_local.py) reads the unsynced audit rows in audit_id order:
+-- `WHERE is_synced = 0 AND audit_id > ? ORDER BY audit_id LIMIT ?` is a range read of this index.
+ALTER TABLE `attendance_audit` ADD INDEX IF NOT EXISTS `idx_is_synced_audit_id` (`is_synced`, `audit_id`);
 
 DELIMITER $$
 
@@ -0,0 +1,115 @@
+import json
+import os
+from datetime import datetime
+
+
+class SyncJournal:
+    """
+    Append-only JSONL journal of get-whats-news responses.
+
+    Each line is the response body itself with journal fields added at the front,
+    e.g. {"_fetched_at": "...", "_since": "...", "_cursor": null, "user": {...}, ...}
+    so a line can be fed straight back to json_stream.iter_section_records, which
+    reports the journal fields in its meta dict.
+    """
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+
+    def _header(self, since, cursor):
+        fields = {
+            "_fetched_at": datetime.now().isoformat(),
+            "_since": since.isoformat() if since else None,
+            "_cursor": cursor,
+        }
+        return json.dumps(fields, separators=(",", ":"))[:-1].encode("utf-8")
+
+    def tee(self, chunks, since, cursor=None):
+        """Yield chunks unchanged while appending them as one journal line"""
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        with open(self.file_path, "ab") as f:
+            start = f.tell()
+            complete = False
+            try:
+                # Hold the body back until its first token tells us whether the object is empty
+                opening = b""
+                for chunk in chunks:
+                    if opening is not None:
+                        opening += chunk
+                        stripped = opening.lstrip()
+                        if len(stripped) < 2 or stripped[1:].lstrip() == b"":
+                            yield chunk
+                            continue
+                        rest = stripped[1:].lstrip()
+                        f.write(self._header(since, cursor))
+                        if not rest.startswith(b"}"):
+                            f.write(b",")
+                        f.write(rest.replace(b"\n", b" ").replace(b"\r", b" "))
+                        opening = None
+                    else:
+                        # Newlines can only be whitespace between JSON tokens: flatten the body to one line
+                        f.write(chunk.replace(b"\n", b" ").replace(b"\r", b" "))
+                    yield chunk
+                if opening is not None:
+                    # Empty or "{}" body
+                    f.write(self._header(since, cursor) + b"}")
+                f.write(b"\n")
+                complete = True
+            finally:
+                if not complete:
+                    # Never leave half a line behind
+                    f.truncate(start)
+
+    def append_body(self, body, since, cursor=None):
+        """Journal an already downloaded response body"""
+        for _ in self.tee([body], since, cursor):
+            pass
+
+
+def iter_journal_lines(file_path, chunk_size=64 * 1024):
+    """
+    Yield one byte-chunk iterator per journal line, without loading whole lines in memory.
+    Each iterator must be consumed before asking for the next line.
+    """
+    with open(file_path, "rb") as f:
+        state = {"pending": b"", "eof": False}
+
+        def line_chunks():
+            while True:
+                pending = state["pending"]
+                newline = pending.find(b"\n")
+                if newline >= 0:
+                    state["pending"] = pending[newline + 1:]
+                    if newline:
+                        yield pending[:newline]
+                    return
+                state["pending"] = b""
+                if pending:
+                    yield pending
+                data = f.read(chunk_size)
+                if not data:
+                    state["eof"] = True
+                    return
+                state["pending"] = data
+
+        while True:
+            if state["eof"] and not state["pending"]:
+                return
+            if not state["pending"].strip(b"\r\n \t"):
+                # Skip blank lines
+                if state["pending"] and b"\n" in state["pending"]:
+                    state["pending"] = state["pending"][state["pending"].find(b"\n") + 1:]
+                    continue
+                data = f.read(chunk_size)
+                if not data:
+                    return
+                state["pending"] += data
+                continue
+            line = line_chunks()
+            yield line
+            # Drain whatever the consumer left of the line
+            for _ in line:
+                pass
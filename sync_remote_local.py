@@ -1,8 +1,16 @@
 import mysql.connector
 import requests
 import json
+import logging
 import time
 from send_data_api.send_DataViaApi import *
+import connectivity
+import os
+import sys
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "push_data"))
+from common_function import padded
+from statement_cache import statement_cache
+import sync_logging
 
 # Config
 with open("config.json") as f:
@@ -11,78 +19,158 @@ with open("config.json") as f:
 
 db_config = config["databaseConfig"]
 
-import json
-import mysql.connector
+audit_config = config.get("auditConfig", {})
+# Unsynced audit rows read, pushed and acknowledged per query
+AUDIT_BATCH_SIZE = audit_config.get("BATCH_SIZE", 200)
+# Polls between two scans from the first unsynced row
+AUDIT_RESCAN_POLLS = audit_config.get("RESCAN_POLLS", 30)
+AUDIT_POLL_SECONDS = audit_config.get("POLL_SECONDS", 20)
+
+log = logging.getLogger("sync_remote_local")
+
+# Columns of attendance_audit the pusher reads
+AUDIT_COLUMNS = "audit_id, action_type, old_data, new_data, changed_at, is_synced, id_attendance"
+AUDIT_COLUMN_NAMES = [column.strip() for column in AUDIT_COLUMNS.split(",")]
+
+# Pusher connection, kept across polls with its prepared statements (statement_cache)
+_conn = None
+
+# Highest audit_id handled so far: the next poll only reads the rows after it
+_high_water = 0
+_polls = 0
+# Attendances with an audit row whose push failed: their later rows wait for the next full
+# scan, so an older note or presence is never sent over a newer one
+_blocked = set()
+
+
+def push_audit_row(row):
+    """Send the change of one audit row to the server; True once there is nothing left to send"""
+    attendance_id = row['id_attendance']
+    old_data = json.loads(row['old_data']) if row['old_data'] else {}
+    new_data = json.loads(row['new_data']) if row['new_data'] else {}
+
+    note_changed = old_data.get('note') != new_data.get('note')
+    present_changed = old_data.get('is_present') != new_data.get('is_present')
+    enabled_changed = old_data.get('enabled') != new_data.get('enabled')
+
+    if note_changed:
+        note = new_data.get('note')
+        log.info("📝 Note changed for attendance %s: %s", attendance_id, note)
+        return send_attendanceNote_to_remote(attendance_id, note)
+
+    elif present_changed:
+        is_present = new_data.get('is_present')
+        log.info("✅ is_present changed for attendance %s: %s", attendance_id, is_present)
+        return send_attendancePresence_to_remote(attendance_id, is_present)
+
+    elif enabled_changed:
+        enabled = new_data.get('enabled')
+        log.info("✅ enabled changed for attendance %s: %s", attendance_id, enabled)
+        return delete_attendance_to_remote(attendance_id)
+
+    # Nothing the server needs: acknowledged so it is not read again
+    log.warning("⚠️ No relevant field changed for attendance %s", attendance_id)
+    return True
+
+
+def pusher_connection():
+    """The pusher connection, opened on first use and again after it was lost"""
+    global _conn
+    if _conn is None or not _conn.is_connected():
+        close_pusher_connection()
+        _conn = mysql.connector.connect(**db_config)
+    return _conn
+
+
+def close_pusher_connection():
+    global _conn
+    if _conn is None:
+        return
+    try:
+        statement_cache(_conn).close_statements()
+        _conn.close()
+    except Exception:
+        pass
+    _conn = None
+
 
 def process_audit():
-    try:
-        conn = mysql.connector.connect(**db_config)
-        cursor = conn.cursor(dictionary=True)
-
-        cursor.execute("""
-            SELECT audit_id, action_type, old_data, new_data, changed_at, is_synced, id_attendance
-            FROM attendance_audit
-            WHERE is_synced = 0
-        """)
-        rows = cursor.fetchall()
-
-        if not rows:
-            print("No rows to process")
-            return
-
-        for row in rows:
-            attendance_id = row['id_attendance']
-            try:
-                old_data = json.loads(row['old_data']) if row['old_data'] else {}
-                new_data = json.loads(row['new_data']) if row['new_data'] else {}
-
-                note_changed = old_data.get('note') != new_data.get('note')
-                present_changed = old_data.get('is_present') != new_data.get('is_present')
-                enabled_changed = old_data.get('enabled') != new_data.get('enabled')
-
-                if note_changed:
-                    note = new_data.get('note')
-                    print(f"📝 Note changed for attendance {attendance_id}: {note}")
-                    success = send_attendanceNote_to_remote(attendance_id, note)
-
-                elif present_changed:
-                    is_present = new_data.get('is_present')
-                    print(is_present)
-                    print(f"✅ is_present changed for attendance {attendance_id}: {is_present}")
-                    success = send_attendancePresence_to_remote(attendance_id, is_present)
-
-                elif enabled_changed:
-                    enabled = new_data.get('enabled')
-                    print(f"✅ enabled changed for attendance {attendance_id}: {enabled}")
-                    success = delete_attendance_to_remote(attendance_id)
-
-                else:
-                    print(f"⚠️ No relevant field changed for attendance {attendance_id}")
-
-
-                if success:
-                    cursor.execute("""
-                        UPDATE attendance_audit 
-                        SET is_synced = 1
-                        WHERE audit_id = %s
-                    """, (row['audit_id'],))
-                else:
-                    print(f"❌ Error sending data for attendance {attendance_id}")
-
-            except Exception as inner_e:
-                print(f"💥 Error processing audit {row['audit_id']}: {inner_e}")
+    """
+    Push the unsynced audit rows in audit_id order, AUDIT_BATCH_SIZE at a time
+    (keyset pagination on the (is_synced, audit_id) index, see sql_code.sql), and
+    acknowledge each batch with one UPDATE. Rows whose push failed stay unsynced and
+    are retried by the next full scan, every AUDIT_RESCAN_POLLS polls, which also picks
+    up rows committed after a higher audit_id was read. Until then the later rows of the
+    same attendance are not pushed either: the rescan sends them all in audit_id order.
+    """
+    global _high_water, _polls
+    if _polls % AUDIT_RESCAN_POLLS == 0:
+        _high_water = 0
+        _blocked.clear()
+    _polls += 1
 
+    try:
+        conn = pusher_connection()
+        # The keyset SELECT and the acknowledgement UPDATE (its IN list padded to a few
+        # lengths) are prepared once they repeat, and stay prepared for the next polls
+        statements = statement_cache(conn)
+
+        pushed = failed = held = 0
+        while True:
+            statements.execute(f"""
+                SELECT {AUDIT_COLUMNS}
+                FROM attendance_audit
+                WHERE is_synced = 0 AND audit_id > %s
+                ORDER BY audit_id
+                LIMIT %s
+            """, (_high_water, AUDIT_BATCH_SIZE))
+            rows = [dict(zip(AUDIT_COLUMN_NAMES, row)) for row in statements.fetchall()]
+            if not rows:
+                break
+
+            acknowledged = []
+            for row in rows:
+                if row['id_attendance'] in _blocked:
+                    held += 1
+                    continue
+                try:
+                    if push_audit_row(row):
+                        acknowledged.append(row['audit_id'])
+                        continue
+                    log.warning("❌ Error sending data for attendance %s", row['id_attendance'])
+                except Exception as inner_e:
+                    log.error("💥 Error processing audit %s: %s", row['audit_id'], inner_e)
+                failed += 1
+                _blocked.add(row['id_attendance'])
+
+            if acknowledged:
+                ids = padded(acknowledged)
+                statements.execute(
+                    "UPDATE attendance_audit SET is_synced = 1 WHERE audit_id IN ("
+                    + ", ".join(["%s"] * len(ids)) + ")", ids)
+                conn.commit()
+            pushed += len(acknowledged)
+            _high_water = rows[-1]['audit_id']
+            if len(rows) < AUDIT_BATCH_SIZE:
+                break
+        # Ends the read snapshot of the connection, so the next poll sees the new rows
         conn.commit()
 
-    except Exception as e:
-        print(f"💥 Database error: {e}")
-
-    finally:
-        if 'cursor' in locals():
-            cursor.close()
-        if 'conn' in locals() and conn.is_connected():
-            conn.close()
+        if pushed or failed or held:
+            log.info("Audit rows pushed: %d, failed: %d, held behind a failed row of their attendance: %d "
+                     "(retried at the next full scan)", pushed, failed, held)
+        else:
+            log.debug("No rows to process")
 
-while True:
-    process_audit()
-    time.sleep(20)
\ No newline at end of file
+    except Exception as e:
+        log.error("💥 Database error: %s", e)
+        # Opened again at the next poll
+        close_pusher_connection()
+
+if __name__ == "__main__":
+    sync_logging.configure()
+    while True:
+        # Audit rows stay pending while the server is unreachable: no point sending them
+        if connectivity.tracker.is_online():
+            process_audit()
+        time.sleep(AUDIT_POLL_SECONDS)
\ No newline at end of file
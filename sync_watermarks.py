@@ -0,0 +1,120 @@
+import logging
+from datetime import datetime, timedelta
+
+from push_data.common_function import format_date, format_dates
+
+
+WATERMARK_FORMAT = "%Y-%m-%d %H:%M:%S"
+# Record fields tried, in order, to find when a remote record last changed
+RECORD_TIME_FIELDS = ("updatedAt", "timestamp", "createdAt")
+
+log = logging.getLogger(__name__)
+
+
+def record_timestamp(record):
+    """Return the last-change time of a remote record as 'YYYY-MM-DD HH:MM:SS', or None"""
+    if not isinstance(record, dict):
+        return None
+    for field in RECORD_TIME_FIELDS:
+        value = record.get(field)
+        if value:
+            formatted = format_date(value)
+            if formatted:
+                return formatted
+    return None
+
+
+def record_timestamps(records):
+    """record_timestamp of every record, converting one time field of the whole list at a time"""
+    stamps = [None] * len(records)
+    missing = [i for i, record in enumerate(records) if isinstance(record, dict)]
+    for field in RECORD_TIME_FIELDS:
+        if not missing:
+            break
+        values = [records[i].get(field) for i in missing]
+        for i, formatted in zip(missing, format_dates(values)):
+            stamps[i] = formatted
+        missing = [i for i in missing if not stamps[i]]
+    return stamps
+
+
+class WatermarkTracker:
+    """
+    Per-section sync watermarks.
+
+    A section's watermark is the newest updatedAt/timestamp that was applied locally
+    without error. The pull asks for everything since the oldest watermark minus a small
+    overlap, and records older than their own section's watermark (minus the same
+    overlap) are dropped before they reach the handlers.
+    """
+
+    def __init__(self, watermarks, overlap_seconds):
+        self.watermarks = dict(watermarks or {})
+        self.overlap = timedelta(seconds=overlap_seconds)
+        self._cutoffs = {}
+        for section, mark in self.watermarks.items():
+            try:
+                cutoff = datetime.strptime(mark, WATERMARK_FORMAT) - self.overlap
+                self._cutoffs[section] = cutoff.strftime(WATERMARK_FORMAT)
+            except (TypeError, ValueError):
+                log.warning("Ignoring invalid watermark for %s: %s", section, mark)
+        self._applied = {}
+        self._failed = set()
+        self.skipped = {}
+
+    def pull_since(self, sections):
+        """Date to send to get-whats-news, or None when no section has a watermark yet"""
+        cutoffs = [self._cutoffs[s] for s in sections if s in self._cutoffs]
+        if not cutoffs:
+            return None
+        return datetime.strptime(min(cutoffs), WATERMARK_FORMAT)
+
+    def is_already_applied(self, section, record):
+        cutoff = self._cutoffs.get(section)
+        if cutoff is None:
+            return False
+        stamp = record_timestamp(record)
+        if stamp is None or stamp >= cutoff:
+            return False
+        self.skipped[section] = self.skipped.get(section, 0) + 1
+        return True
+
+    def observe(self, section, records):
+        """Remember the newest timestamp of records that were applied without error"""
+        newest = self._applied.get(section)
+        for stamp in record_timestamps(records):
+            if stamp and (newest is None or stamp > newest):
+                newest = stamp
+        if newest:
+            self._applied[section] = newest
+
+    def mark_failed(self, section):
+        """Keep the section's watermark where it is so the failed records are pulled again"""
+        self._failed.add(section)
+
+    def state(self):
+        """Progress of the current pull, saved in page checkpoints"""
+        return {"applied": dict(self._applied), "failed": sorted(self._failed)}
+
+    def restore(self, state):
+        """Resume the progress saved by state() after a restart"""
+        if not state:
+            return
+        self._applied.update(state.get("applied") or {})
+        self._failed.update(state.get("failed") or [])
+
+    def advanced(self, sections):
+        """
+        Watermarks to persist after a successful cycle.
+        Sections that received nothing are moved up to the newest change seen in the
+        whole pull, otherwise one quiet section would pin the pull date forever.
+        """
+        newest_overall = max(self._applied.values(), default=None)
+        result = dict(self.watermarks)
+        for section in sections:
+            if section in self._failed:
+                continue
+            candidate = self._applied.get(section, newest_overall)
+            if candidate and (result.get(section) is None or candidate > result[section]):
+                result[section] = candidate
+        return result
@@ -0,0 +1,10 @@
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# The modules read config.json from the working directory when they are imported
+os.chdir(ROOT)
+for path in (ROOT, os.path.join(ROOT, "push_data"), os.path.join(ROOT, "tools")):
+    if path not in sys.path:
+        sys.path.insert(0, path)
@@ -0,0 +1,82 @@
+"""
+reconcile_attendance on a stored row matched on (user_id, calander_id) under another id whose
+tablet edit is still queued in attendance_audit: the conflict policy decides, and the queued
+audit rows never keep pointing at the local id.
+"""
+from datetime import datetime
+
+import pytest
+
+import handle_attendance_data
+
+
+class ReconcileCursor:
+    """Answers the two SELECTs of reconcile_attendance and records the UPDATEs"""
+
+    def __init__(self, stored, pending):
+        self.stored = stored
+        self.pending = pending
+        self.updates = []
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        if sql.startswith("SELECT `id`, `user_id`"):
+            self.rows = [dict(row) for row in self.stored]
+        elif sql.startswith("SELECT DISTINCT `id_attendance`"):
+            self.rows = [(i,) for i in params if str(i) in self.pending]
+        else:
+            self.updates.append((sql, list(params)))
+            self.rows = []
+
+    def fetchall(self):
+        return self.rows
+
+
+LOCAL_ROW = {"id": 7, "user_id": 3, "calander_id": 9, "slc_edit": 1, "updated_at": "2025-01-01 10:00:00"}
+REMOTE = {"id": 500, "userId": 3, "calenderId": 9, "updatedAt": "2025-01-01T09:00:00+00:00"}
+
+
+def reconcile(monkeypatch, policy):
+    monkeypatch.setattr(handle_attendance_data, "ATTENDANCE_CONFLICT_POLICY", policy)
+    cursor = ReconcileCursor([LOCAL_ROW], pending={"7"})
+    result = {"skipped_count": 0}
+    applied = handle_attendance_data.reconcile_attendance(cursor, [dict(REMOTE)], result)
+    return cursor.updates, applied, result
+
+
+def test_tablet_edit_kept_moves_its_audit_rows_to_the_remote_id(monkeypatch):
+    updates, applied, result = reconcile(monkeypatch, "local")
+
+    assert applied == [] and result["kept_local_count"] == 1
+    rekey = [(sql, params) for sql, params in updates if sql.startswith("UPDATE `attendance` ")]
+    assert len(rekey) == 1 and "slc_edit" not in rekey[0][0] and rekey[0][1] == [7, 500, 7]
+    moved = [(sql, params) for sql, params in updates if "SET `id_attendance`" in sql]
+    assert len(moved) == 1 and moved[0][1] == [7, 500, 7]
+    assert not any("SET `is_synced`" in sql for sql, _params in updates)
+
+
+@pytest.mark.parametrize("policy", ["remote", "newest"])
+def test_remote_change_winning_supersedes_the_audit_rows_of_the_local_id(monkeypatch, policy):
+    monkeypatch.setitem(LOCAL_ROW, "updated_at", "2025-01-01 08:00:00")
+    updates, applied, result = reconcile(monkeypatch, policy)
+
+    assert [rec["id"] for rec in applied] == [500] and "kept_local_count" not in result
+    superseded = [(sql, params) for sql, params in updates if "SET `is_synced`" in sql]
+    assert len(superseded) == 1 and superseded[0][1] == ["7"]
+    rekey = [sql for sql, _params in updates if sql.startswith("UPDATE `attendance` ")]
+    assert len(rekey) == 1 and "`slc_edit` = 0" in rekey[0]
+    # Superseded under the local id before the row takes the remote id
+    assert updates.index(superseded[0]) < [sql for sql, _params in updates].index(rekey[0])
+
+
+@pytest.mark.parametrize("local_updated, remote_wins", [
+    (datetime(2025, 1, 1, 9, 0, 0, 500000), True),
+    (datetime(2025, 1, 1, 9, 0, 1), False),
+    ("2025-01-01T08:59:59Z", True),
+    (None, True),
+])
+def test_newest_compares_the_timestamps_as_datetimes(monkeypatch, local_updated, remote_wins):
+    monkeypatch.setattr(handle_attendance_data, "ATTENDANCE_CONFLICT_POLICY", "newest")
+    stored = dict(LOCAL_ROW, updated_at=local_updated)
+
+    assert handle_attendance_data._remote_wins(stored, REMOTE) is remote_wins
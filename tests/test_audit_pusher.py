@@ -0,0 +1,110 @@
+"""
+sync_remote_local.process_audit: once a push fails, the later audit rows of the same
+attendance wait for the rescan, which sends them all again in audit_id order, and the
+polls share one connection.
+"""
+import json
+
+import pytest
+
+import sync_remote_local
+
+
+class AuditTable:
+    """attendance_audit rows behind the keyset SELECT and the acknowledgement UPDATE"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.connections = 0
+
+    def connect(self, **_config):
+        self.connections += 1
+        return AuditConnection(self)
+
+
+class AuditConnection:
+    def __init__(self, table):
+        self.table = table
+
+    def cursor(self, **_kwargs):
+        return AuditCursor(self.table)
+
+    def commit(self):
+        pass
+
+    def is_connected(self):
+        return True
+
+    def close(self):
+        pass
+
+
+class AuditCursor:
+    def __init__(self, table):
+        self.table = table
+        self.result = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=()):
+        if sql.lstrip().startswith("SELECT"):
+            after, limit = params
+            pending = [row for row in self.table.rows if not row["is_synced"] and row["audit_id"] > after]
+            self.result = [tuple(row[c] for c in sync_remote_local.AUDIT_COLUMN_NAMES) for row in pending[:limit]]
+            return
+        acknowledged = set(params)
+        for row in self.table.rows:
+            if row["audit_id"] in acknowledged:
+                row["is_synced"] = 1
+
+    def fetchall(self):
+        return self.result
+
+    def close(self):
+        pass
+
+
+def note_change(audit_id, attendance_id, note):
+    return {"audit_id": audit_id, "action_type": "UPDATE", "old_data": json.dumps({"note": None}),
+            "new_data": json.dumps({"note": note}), "changed_at": None, "is_synced": 0,
+            "id_attendance": attendance_id}
+
+
+@pytest.fixture
+def pusher(monkeypatch):
+    table = AuditTable([note_change(1, 10, "first"), note_change(2, 20, "other"), note_change(3, 10, "second")])
+    monkeypatch.setattr(sync_remote_local.mysql.connector, "connect", table.connect)
+    monkeypatch.setattr(sync_remote_local, "_conn", None)
+    monkeypatch.setattr(sync_remote_local, "_high_water", 0)
+    monkeypatch.setattr(sync_remote_local, "_polls", 0)
+    monkeypatch.setattr(sync_remote_local, "_blocked", set())
+    monkeypatch.setattr(sync_remote_local, "AUDIT_BATCH_SIZE", 2)
+    return table
+
+
+def test_later_rows_of_a_failed_attendance_wait_for_the_rescan(monkeypatch, pusher):
+    sent = []
+    server_down_for = {"first"}
+
+    def send_note(attendance_id, note):
+        if note in server_down_for:
+            return False
+        sent.append((attendance_id, note))
+        return True
+
+    monkeypatch.setattr(sync_remote_local, "send_attendanceNote_to_remote", send_note)
+
+    sync_remote_local.process_audit()
+    assert sent == [(20, "other")]
+    assert [row["is_synced"] for row in pusher.rows] == [0, 1, 0]
+
+    # The next polls only read after the high-water mark: nothing is sent for attendance 10
+    sync_remote_local.process_audit()
+    assert sent == [(20, "other")]
+
+    server_down_for.clear()
+    monkeypatch.setattr(sync_remote_local, "_polls", sync_remote_local.AUDIT_RESCAN_POLLS)
+    sync_remote_local.process_audit()
+    assert sent == [(20, "other"), (10, "first"), (10, "second")]
+    assert [row["is_synced"] for row in pusher.rows] == [1, 1, 1]
+    # One connection for every poll: its statements stay prepared
+    assert pusher.connections == 1
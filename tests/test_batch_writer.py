@@ -0,0 +1,36 @@
+"""upsert_rows counts the rows it expected to be new from the affected-row count of the server."""
+import pytest
+
+from batch_writer import upsert_rows
+
+
+class AffectedRowsCursor:
+    """Reports the affected rows a MariaDB INSERT ... ON DUPLICATE KEY UPDATE would"""
+
+    def __init__(self, stored):
+        self.stored = stored
+        self.rowcount = -1
+
+    def execute(self, sql, params):
+        rows = [tuple(params[i:i + 2]) for i in range(0, len(params), 2)]
+        self.rowcount = 0
+        for record_id, name in rows:
+            if record_id not in self.stored:
+                self.rowcount += 1
+            elif self.stored[record_id] != name:
+                self.rowcount += 2
+            self.stored[record_id] = name
+
+
+@pytest.mark.parametrize("stored, expected", [
+    ({}, {"inserted": 3, "updated": 0, "unchanged": 0}),
+    # The id index was behind: two rows existed and changed
+    ({1: "old", 2: "old"}, {"inserted": 1, "updated": 2, "unchanged": 0}),
+    ({1: "a"}, {"inserted": 2, "updated": 0, "unchanged": 1}),
+])
+def test_rows_found_to_exist_are_not_counted_as_inserted(stored, expected):
+    rows = [((1, 1), (1, "a")), ((2, 2), (2, "b")), ((3, 3), (3, "c"))]
+
+    counts, failures = upsert_rows(AffectedRowsCursor(dict(stored)), "user", ["id", "name"], ["name"], rows)
+
+    assert counts == expected and failures == []
@@ -0,0 +1,45 @@
+"""FingerprintStore stays bounded: records below the watermark window and past the per-section cap leave it."""
+import json
+
+from fingerprints import FingerprintStore
+
+
+def applied(store, section, records):
+    entries = []
+    for record in records:
+        unchanged, key, entry = store.check(section, record)
+        assert not unchanged
+        entries.append((key, entry))
+    store.remember(section, entries)
+
+
+def test_prune_drops_records_below_the_watermark_window(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fingerprints.json"))
+    applied(store, "user", [
+        {"id": 1, "updatedAt": "2025-01-01 08:00:00"},
+        {"id": 2, "updatedAt": "2025-01-01 09:59:00"},
+        {"id": 3},
+    ])
+
+    store.prune({"user": "2025-01-01 10:00:00"}, 120)
+
+    assert sorted(store.records["user"]) == ["2", "3"]
+    assert store.check("user", {"id": 2, "updatedAt": "2025-01-01 09:59:00"})[0]
+
+
+def test_cap_evicts_the_least_recently_applied(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fingerprints.json"), max_per_section=2)
+    applied(store, "user", [{"id": 1}, {"id": 2}])
+    applied(store, "user", [{"id": 1, "name": "changed"}])
+    applied(store, "user", [{"id": 3}])
+
+    assert list(store.records["user"]) == ["1", "3"]
+
+
+def test_reads_the_previous_file_format(tmp_path):
+    path = tmp_path / "fingerprints.json"
+    store = FingerprintStore(str(path))
+    _unchanged, _key, (digest, _stamp) = store.check("user", {"id": 1})
+    path.write_text(json.dumps({"records": {"user": {"1": digest}}, "sections": {}}))
+
+    assert FingerprintStore(str(path)).check("user", {"id": 1})[0]
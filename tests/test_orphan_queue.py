@@ -0,0 +1,35 @@
+"""OrphanHold: rows missing a parent are written like the others and stay queued for the repair."""
+import orphan_queue
+from orphan_queue import OrphanHold
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql.split()[0], list(params)))
+
+    def fetchall(self):
+        return [("calendar",)]
+
+
+def test_orphan_rows_are_written_and_only_their_repair_is_queued(monkeypatch):
+    monkeypatch.setattr(orphan_queue, "_disabled", False)
+    monkeypatch.setattr(orphan_queue, "_parked", None)
+    monkeypatch.setattr(orphan_queue, "_landed", set())
+    # Teacher 7 is not in the local user table
+    monkeypatch.setattr(orphan_queue, "existing_ids", lambda cursor, table, ids: ids - {"7"})
+    cursor = RecordingCursor()
+    hold = OrphanHold("calendar", {"teacher_id": "user"})
+    pending = [((1, 1), (1, 5)), ((2, 2), (2, 7))]
+    result = {}
+
+    written = hold.hold(cursor, ["id", "teacher_id"], pending, [{"id": 1}, {"id": 2}], result)
+    hold.written(cursor, "relation_calander_group_session", {"1", "2"})
+
+    assert written == pending and result["parked_count"] == 1
+    queued, deleted = [params for verb, params in cursor.statements if verb in ("INSERT", "DELETE")]
+    assert queued[:2] == ["calendar", "2"]
+    # Record 1 was written with its parents: a queued version of it is dropped, record 2 stays queued
+    assert deleted == ["calendar", "1"]
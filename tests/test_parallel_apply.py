@@ -0,0 +1,75 @@
+"""
+main_system.apply_events with a connection pool: pages larger than PARALLEL_MAX_RECORDS are
+applied while they stream, and a section whose parent section failed is not applied.
+"""
+from contextlib import contextmanager
+
+import pytest
+
+import main_system
+from sync_watermarks import WatermarkTracker
+
+
+class FakeConnection:
+    in_transaction = False
+
+
+class FakePool:
+    @contextmanager
+    def connection(self):
+        yield FakeConnection()
+
+
+def record(i):
+    return {"id": i, "updatedAt": "2025-01-01T10:00:00+00:00"}
+
+
+@pytest.fixture
+def handled(monkeypatch):
+    """(section, ids) of every chunk handed to a handler; sections in `failing` report errors"""
+    seen = []
+    failing = set()
+
+    def get_section_handler(section, kind):
+        def handler(conn, records):
+            seen.append((section, [r["id"] for r in records]))
+            return {"error_count": len(records) if section in failing else 0}
+        return handler
+
+    monkeypatch.setattr(main_system, "get_section_handler", get_section_handler)
+    return seen, failing
+
+
+def test_page_over_the_cap_is_applied_while_it_streams(monkeypatch, handled):
+    seen, _failing = handled
+    monkeypatch.setattr(main_system, "PARALLEL_MAX_RECORDS", 3)
+    monkeypatch.setattr(main_system, "apply_sections_parallel",
+                        lambda *args, **kwargs: pytest.fail("an unbounded page was buffered"))
+    read = []
+
+    def events():
+        for i in range(1, 11):
+            read.append(i)
+            yield "attendance", "updated", record(i)
+
+    def handler(conn, records):
+        seen.append((len(read), [r["id"] for r in records]))
+        return {"error_count": 0}
+
+    monkeypatch.setattr(main_system, "get_section_handler", lambda section, kind: handler)
+    main_system.apply_events(FakeConnection(), FakePool(), events(), 2)
+
+    # (records read so far, chunk): the first chunks were applied before the page was read
+    assert seen == [(4, [1, 2]), (4, [3, 4]), (6, [5, 6]), (8, [7, 8]), (10, [9, 10])]
+
+
+def test_children_of_a_failed_section_are_marked_failed_not_applied(handled):
+    seen, failing = handled
+    failing.add("account")
+    events = [("account", None, record(1)), ("session", None, record(2)), ("user", "created", record(3))]
+    tracker = WatermarkTracker({}, 0)
+
+    main_system.apply_events(FakeConnection(), FakePool(), events, 10, tracker)
+
+    assert sorted(section for section, _ids in seen) == ["account", "user"]
+    assert tracker.state()["failed"] == ["account", "session"]
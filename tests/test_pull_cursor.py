@@ -0,0 +1,193 @@
+"""
+pull_and_apply against tools/mock_whats_news_server.py: paging, checkpoint resume after a
+page cut off mid-body (reported to the connectivity tracker), a rejected cursor dropping
+the checkpoint, and the page cache (snapshot_cache) only read back by the attempt that
+downloaded it, including after a section failed to apply.
+"""
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+import connectivity
+import main_system
+from mock_whats_news_server import flatten_payload, make_handler
+from snapshot_cache import SnapshotCache
+from sync_watermarks import WatermarkTracker
+
+PAYLOAD = {
+    "user": {"created": [{"id": i, "updatedAt": "2025-01-01T10:00:00+00:00"} for i in range(1, 8)]},
+    "calendar": [{"id": i, "updatedAt": "2025-01-01T10:00:00+00:00"} for i in range(1, 5)],
+    "attendance": {"updated": [{"id": i, "updatedAt": "2025-01-01T10:00:00+00:00"} for i in range(1, 10)]},
+}
+PAGE_SIZE = 4
+
+
+class FakeConnection:
+    """pull_and_apply only hands the connection to the handlers and the orphan queue"""
+
+
+@pytest.fixture
+def mock_server():
+    servers = []
+
+    def start(fail_page=0, reject_status=410, payload=PAYLOAD, requests_seen=None):
+        handler = make_handler(flatten_payload(payload), PAGE_SIZE, fail_page, reject_status)
+        if requests_seen is not None:
+            class CountingHandler(handler):
+                def do_POST(self):
+                    requests_seen.append(self.path)
+                    super().do_POST()
+            handler = CountingHandler
+        server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}/slc/get-whats-news"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def applied(monkeypatch, tmp_path):
+    """Records handed to the section handlers, as (section, id); sync state kept in tmp_path"""
+    seen = []
+
+    def get_section_handler(section, kind):
+        def handler(conn, records):
+            seen.extend((section, record["id"]) for record in records)
+            return {"error_count": 0}
+        return handler
+
+    monkeypatch.setattr(main_system, "SYNC_STATUS_FILE", str(tmp_path / "sync_status.json"))
+    monkeypatch.setattr(main_system, "SNAPSHOTS", SnapshotCache(str(tmp_path / "snapshots")))
+    monkeypatch.setattr(main_system, "JOURNAL", None)
+    monkeypatch.setattr(main_system, "PULL_PAGE_SIZE", PAGE_SIZE)
+    monkeypatch.setattr(main_system, "get_section_handler", get_section_handler)
+    monkeypatch.setattr(main_system, "reapply_orphans", lambda conn: {})
+    return seen
+
+
+def expected_records():
+    return sorted((section, record["id"]) for section, _kind, record in flatten_payload(PAYLOAD))
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_pull_walks_every_page(monkeypatch, mock_server, applied, stream):
+    monkeypatch.setattr(main_system, "WHATS_NEWS_URL", mock_server())
+    monkeypatch.setattr(main_system, "STREAM_SYNC", stream)
+
+    main_system.pull_and_apply(FakeConnection(), WatermarkTracker({}, 0), None)
+
+    assert sorted(applied) == expected_records()
+    # 20 records in pages of 4: the checkpoint of the last page points at its cursor
+    assert main_system.get_pull_checkpoint()["page"] == 4
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_pull_resumes_from_checkpoint_after_cut_off_page(monkeypatch, mock_server, applied, stream):
+    monkeypatch.setattr(main_system, "WHATS_NEWS_URL", mock_server(fail_page=3))
+    monkeypatch.setattr(main_system, "STREAM_SYNC", stream)
+
+    with pytest.raises(requests.RequestException):
+        main_system.pull_and_apply(FakeConnection(), WatermarkTracker({}, 0), None)
+    checkpoint = main_system.get_pull_checkpoint()
+    assert checkpoint["page"] == 2 and checkpoint["cursor"] == str(2 * PAGE_SIZE)
+    before_failure = len(applied)
+
+    main_system.pull_and_apply(FakeConnection(), WatermarkTracker({}, 0), None)
+
+    assert sorted(set(applied)) == expected_records()
+    # The two applied pages are not requested again
+    assert len(applied) - before_failure <= len(expected_records()) - 2 * PAGE_SIZE
+
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_page_cut_off_mid_body_is_reported_to_connectivity_tracker(monkeypatch, mock_server, applied, stream):
+    tracker = connectivity.ConnectivityTracker("http://127.0.0.1:9/", 1, 30, 600)
+    monkeypatch.setattr(connectivity, "tracker", tracker)
+    monkeypatch.setattr(main_system, "WHATS_NEWS_URL", mock_server(fail_page=1))
+    monkeypatch.setattr(main_system, "STREAM_SYNC", stream)
+
+    with pytest.raises(requests.RequestException):
+        main_system.pull_and_apply(FakeConnection(), WatermarkTracker({}, 0), None)
+
+    assert tracker.online is False
+
+
+@pytest.mark.parametrize("status", [400, 404, 410])
+def test_rejected_cursor_drops_checkpoint(monkeypatch, mock_server, applied, status):
+    monkeypatch.setattr(main_system, "WHATS_NEWS_URL", mock_server(reject_status=status))
+    main_system.save_pull_checkpoint(None, "expired-cursor", 3, WatermarkTracker({}, 0))
+
+    with pytest.raises(requests.HTTPError):
+        main_system.pull_and_apply(FakeConnection(), WatermarkTracker({}, 0), None)
+
+    assert main_system.get_pull_checkpoint() is None
+    assert applied == []
+
+
+def test_fresh_pull_never_reads_pages_of_an_earlier_attempt(monkeypatch, mock_server, applied):
+    monkeypatch.setattr(main_system, "WHATS_NEWS_URL", mock_server())
+    main_system.pull_and_apply(FakeConnection(), WatermarkTracker({}, 0), None)
+    # The pull is over but its pages are still on disk (e.g. a section failed)
+    main_system.clear_pull_checkpoint()
+    applied.clear()
+
+    newer = {"user": {"updated": [{"id": 100, "updatedAt": "2025-01-02T10:00:00+00:00"}]}}
+    monkeypatch.setattr(main_system, "WHATS_NEWS_URL", mock_server(payload=newer))
+    main_system.pull_and_apply(FakeConnection(), WatermarkTracker({}, 0), None)
+
+    assert applied == [("user", 100)]
+
+
+def test_resumed_attempt_reads_the_page_it_stopped_at_from_cache(monkeypatch, mock_server, applied):
+    requests_seen = []
+    monkeypatch.setattr(main_system, "WHATS_NEWS_URL", mock_server(requests_seen=requests_seen))
+    pages = []
+
+    def crash_after_second_page(conn):
+        pages.append(len(pages) + 1)
+        if len(pages) == 2:
+            raise RuntimeError("crash after page 2 was downloaded")
+        return {}
+
+    monkeypatch.setattr(main_system, "reapply_orphans", crash_after_second_page)
+    with pytest.raises(RuntimeError):
+        main_system.pull_and_apply(FakeConnection(), WatermarkTracker({}, 0), None)
+    assert main_system.get_pull_checkpoint()["page"] == 1
+
+    main_system.pull_and_apply(FakeConnection(), WatermarkTracker({}, 0), None)
+
+    assert sorted(set(applied)) == expected_records()
+    # 5 pages: page 2 came from the cache when the attempt resumed
+    assert len(requests_seen) == 5
+
+
+def test_attempt_with_a_failed_section_is_reapplied_from_cache(monkeypatch, mock_server, applied):
+    requests_seen = []
+    single_page = {"user": {"created": [{"id": 1, "updatedAt": "2025-01-01T10:00:00+00:00"}]}}
+    monkeypatch.setattr(main_system, "WHATS_NEWS_URL", mock_server(payload=single_page, requests_seen=requests_seen))
+    monkeypatch.setattr(main_system, "get_section_handler",
+                        lambda section, kind: lambda conn, records: {"error_count": len(records)})
+    tracker = WatermarkTracker({}, 0)
+    main_system.pull_and_apply(FakeConnection(), tracker, None)
+    assert tracker.state()["failed"] == ["user"]
+
+    def get_section_handler(section, kind):
+        def handler(conn, records):
+            applied.extend((section, record["id"]) for record in records)
+            return {"error_count": 0}
+        return handler
+
+    monkeypatch.setattr(main_system, "get_section_handler", get_section_handler)
+    tracker = WatermarkTracker({}, 0)
+    main_system.pull_and_apply(FakeConnection(), tracker, None)
+
+    assert applied == [("user", 1)]
+    assert tracker.state()["failed"] == []
+    # The second run read the page from the cache
+    assert len(requests_seen) == 1
@@ -0,0 +1,51 @@
+"""StatementCache only prepares statements that repeat; padded IN lists take a few lengths."""
+from common_function import fetch_existing_ids, padded
+from statement_cache import StatementCache
+
+
+class RecordingCursor:
+    def __init__(self, executed, prepared):
+        self.executed = executed
+        self.prepared = prepared
+        self.rows = []
+
+    def execute(self, sql, params=()):
+        self.executed.append(("prepared" if self.prepared else "plain", sql))
+        self.rows = [(value,) for value in dict.fromkeys(params)]
+
+    def fetchall(self):
+        return self.rows
+
+    def close(self):
+        pass
+
+
+class RecordingConnection:
+    def __init__(self):
+        self.executed = []
+
+    def cursor(self, prepared=False, **_kwargs):
+        return RecordingCursor(self.executed, prepared)
+
+
+def test_statement_is_prepared_the_second_time_it_is_seen():
+    conn = RecordingConnection()
+    cache = StatementCache(conn, enabled=True)
+
+    for sql in ("SELECT 1", "SELECT 2", "SELECT 1", "SELECT 1"):
+        cache.execute(sql)
+
+    assert [kind for kind, _sql in conn.executed] == ["plain", "plain", "prepared", "prepared"]
+    assert cache.prepared_count == 1
+
+
+def test_in_lists_of_different_lengths_share_a_statement():
+    conn = RecordingConnection()
+    cache = StatementCache(conn, enabled=True)
+
+    for count in (9, 12, 16):
+        assert fetch_existing_ids(cache, "user", range(count)) == {str(i) for i in range(count)}
+
+    assert len({sql for _kind, sql in conn.executed}) == 1
+    assert cache.prepared_count == 1
+    assert padded([1, 2, 3]) == [1, 2, 3, 3, 3, 3, 3, 3]
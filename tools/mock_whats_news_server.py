@@ -0,0 +1,101 @@
+"""
+Local stand-in for /slc/get-whats-news that speaks the cursor protocol.
+
+Serves a recorded payload (a JSON file shaped like the real response) in pages of
+`limit` records, with "nextCursor" pointing at the next page. Point WHATS_NEWS_URL
+in config.json at it to exercise paginated pulls and checkpoint resume offline:
+
+    python tools/mock_whats_news_server.py payload.json --port 8765 --fail-page 3
+
+--fail-page N closes the connection in the middle of page N once, to simulate a
+crash/timeout; the next request for that page succeeds. A cursor the server does
+not know is answered with --reject-status (410 by default).
+"""
+import argparse
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+def flatten_payload(payload):
+    """Return the payload as an ordered list of (section, kind, record)"""
+    events = []
+    for section, value in payload.items():
+        if isinstance(value, list):
+            events.extend((section, None, record) for record in value)
+        elif isinstance(value, dict):
+            for kind, records in value.items():
+                if isinstance(records, list):
+                    events.extend((section, kind, record) for record in records)
+    return events
+
+
+def build_page(events, offset, limit):
+    page = {}
+    for section, kind, record in events[offset:offset + limit]:
+        if kind is None:
+            page.setdefault(section, []).append(record)
+        else:
+            page.setdefault(section, {}).setdefault(kind, []).append(record)
+    end = offset + limit
+    page["nextCursor"] = str(end) if end < len(events) else None
+    return page
+
+
+def make_handler(events, default_limit, fail_page, reject_status=410):
+    state = {"failed": False}
+
+    class WhatsNewsHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            form = parse_qs(self.rfile.read(length).decode())
+            limit = int(form.get("limit", [default_limit])[0] or default_limit)
+            cursor = form.get("cursor", ["0"])[0]
+            try:
+                offset = int(cursor)
+            except ValueError:
+                self.send_error(reject_status, "Unknown cursor")
+                return
+
+            body = json.dumps(build_page(events, offset, limit), indent=2).encode()
+            page_number = offset // limit + 1
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+
+            if page_number == fail_page and not state["failed"]:
+                state["failed"] = True
+                self.wfile.write(body[:len(body) // 2])
+                self.close_connection = True
+                print(f"Simulated failure in the middle of page {page_number}")
+                return
+            self.wfile.write(body)
+
+    return WhatsNewsHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("payload", help="JSON file with a get-whats-news response")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--limit", type=int, default=1000, help="page size when the client sends none")
+    parser.add_argument("--fail-page", type=int, default=0, help="page number to cut off once")
+    parser.add_argument("--reject-status", type=int, default=410, help="status answered to an unknown cursor")
+    args = parser.parse_args()
+
+    with open(args.payload, "r") as f:
+        events = flatten_payload(json.load(f))
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(events, args.limit, args.fail_page, args.reject_status))
+    print(f"Serving {len(events)} record(s) on http://127.0.0.1:{args.port}/slc/get-whats-news")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()